@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+Vectorized animation keyframe reduction for GLB files
+Drops channels that only restate a node's rest pose, shrinks other
+constant channels to their end keys, removes keyframes that interpolation
+reproduces within a tolerance and optionally stores rotations as
+normalized int16
+"""
+
+import os
+
+import numpy as np
+
+from glb_reader import GLBFile
+from gltf_arrays import GLBRepacker, TYPE_SIZES, COMPONENT_DTYPES, read_accessor_float
+
+# Largest error allowed when removing keys: scene units for translations,
+# absolute for scales and morph weights, radians for rotations
+DEFAULT_TOLERANCE = 1e-4
+DEFAULT_ROTATION_TOLERANCE = 1e-3
+
+# Value of each transform path when no channel drives it
+REST_VALUES = {
+    "translation": [0.0, 0.0, 0.0],
+    "rotation": [0.0, 0.0, 0.0, 1.0],
+    "scale": [1.0, 1.0, 1.0]
+}
+
+
+def slerp(q0, q1, t):
+    """Row-wise spherical interpolation of unit quaternions along the shortest arc"""
+    dot = np.sum(q0 * q1, axis=1, keepdims=True)
+    q1 = np.where(dot < 0, -q1, q1)
+    theta = np.arccos(np.clip(np.abs(dot), 0.0, 1.0))
+    sin_theta = np.sin(theta)
+    # Nearly identical quaternions fall back to a normalized lerp
+    near = sin_theta < 1e-6
+    safe = np.where(near, 1.0, sin_theta)
+    w0 = np.where(near, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    w1 = np.where(near, t, np.sin(t * theta) / safe)
+    result = w0 * q0 + w1 * q1
+    return result / np.maximum(np.linalg.norm(result, axis=1, keepdims=True), 1e-12)
+
+
+def key_errors(values, approximations, path):
+    """Per-key error of approximations: rotation angle for rotations, largest component difference otherwise"""
+    if path == "rotation":
+        dot = np.abs(np.sum(values * approximations, axis=1))
+        return 2.0 * np.arccos(np.clip(dot, 0.0, 1.0))
+    return np.abs(values - approximations).max(axis=1)
+
+
+def _segment_errors(times, values, kept, candidates, path):
+    """
+    Largest error over the original keys between each candidate's kept
+    neighbours when the candidate is removed. Candidates must not be
+    neighbours in kept, so no two of them share a segment
+    """
+    position = np.searchsorted(kept, candidates)
+    starts, ends = kept[position - 1], kept[position + 1]
+    lengths = ends - starts + 1
+    first = np.cumsum(lengths) - lengths
+    owner = np.repeat(np.arange(len(candidates)), lengths)
+    keys = starts[owner] + np.arange(lengths.sum()) - first[owner]
+
+    t0, t1 = times[starts[owner]], times[ends[owner]]
+    t = ((times[keys] - t0) / np.maximum(t1 - t0, 1e-12))[:, None]
+    v0, v1 = values[starts[owner]], values[ends[owner]]
+    approximations = slerp(v0, v1, t) if path == "rotation" else v0 + (v1 - v0) * t
+    return np.maximum.reduceat(key_errors(values[keys], approximations, path), first)
+
+
+def reduce_linear(times, values, tolerance, path):
+    """
+    Indices of the LINEAR keys to keep so interpolating them stays within
+    tolerance of every original key. Each pass tests every other interior
+    key at once, then the keys in between, until nothing more can go
+    """
+    kept = np.arange(len(times))
+    changed = True
+    while changed and len(kept) > 2:
+        changed = False
+        for parity in (1, 2):
+            candidates = kept[parity:-1:2]
+            if not len(candidates):
+                continue
+            removable = candidates[_segment_errors(times, values, kept, candidates, path) <= tolerance]
+            if len(removable):
+                kept = np.setdiff1d(kept, removable, assume_unique=True)
+                changed = True
+    return kept
+
+
+def reduce_step(values, tolerance, path):
+    """Indices of the STEP keys that change the held value, plus the last key"""
+    changes = key_errors(values[1:], values[:-1], path) > tolerance
+    kept = np.flatnonzero(np.concatenate([[True], changes]))
+    if kept[-1] != len(values) - 1:
+        kept = np.append(kept, len(values) - 1)
+    return kept
+
+
+def rest_value(gltf, node_index, path, width):
+    """Value a node's path has when no channel drives it, or None if it cannot be told apart"""
+    node = gltf['nodes'][node_index]
+    if path == "weights":
+        weights = node.get('weights')
+        if weights is None and 'mesh' in node:
+            weights = gltf['meshes'][node['mesh']].get('weights')
+        return np.array(weights if weights is not None else [0.0] * width, dtype=np.float64)
+    if 'matrix' in node:
+        return None
+    return np.array(node.get(path, REST_VALUES[path]), dtype=np.float64)
+
+
+def _clip_bytes(gltf, animation):
+    """Bytes of the distinct accessors an animation's samplers use"""
+    total = 0
+    for index in {i for sampler in animation.get('samplers', []) for i in (sampler['input'], sampler['output'])}:
+        accessor = gltf['accessors'][index]
+        itemsize = np.dtype(COMPONENT_DTYPES[accessor['componentType']]).itemsize
+        total += accessor['count'] * TYPE_SIZES[accessor['type']] * itemsize
+    return total
+
+
+def _sampler_targets(animation):
+    """Sampler index -> {(path, node)} of the channels it drives"""
+    targets = {}
+    for channel in animation.get('channels', []):
+        target = channel.get('target', {})
+        targets.setdefault(channel['sampler'], set()).add((target.get('path'), target.get('node')))
+    return targets
+
+
+def optimize_animations(input_path, output_path, tolerance=DEFAULT_TOLERANCE,
+                        rotation_tolerance=DEFAULT_ROTATION_TOLERANCE, quantize_rotations=False):
+    """
+    Reduce the animation keyframes of a GLB file and write the result to output_path
+
+    LINEAR samplers (slerp for rotations) and STEP samplers keep only the
+    keys needed to stay within tolerance; first and last keys always stay
+    and rest-pose channels are only dropped while the clip keeps its length.
+    CUBICSPLINE samplers are left as they are. Returns a report with
+    before/after byte sizes and per-clip channel, keyframe and byte counts
+    """
+    bytes_before = os.path.getsize(input_path)
+    report = {"bytes_before": bytes_before, "clips": []}
+
+    with GLBFile(input_path) as glb:
+        source = glb.json
+        repacker = GLBRepacker(source, glb.bin)
+        gltf = repacker.gltf
+        # Reduced samplers often end up with the same key times; store each set once
+        input_accessors = {}
+
+        def time_accessor(times):
+            data = np.ascontiguousarray(times, dtype=np.float32)
+            if data.tobytes() not in input_accessors:
+                input_accessors[data.tobytes()] = repacker.add_accessor(data)
+            return input_accessors[data.tobytes()]
+
+        for animation_index, animation in enumerate(gltf.get('animations', [])):
+            samplers = animation.get('samplers', [])
+            targets = _sampler_targets(animation)
+            clip = {
+                "name": animation.get('name', f"animation_{animation_index}"),
+                "channels_before": len(animation.get('channels', [])),
+                "keyframes_before": 0,
+                "keyframes_after": 0,
+                "bytes_before": _clip_bytes(source, animation)
+            }
+
+            reduced = {}
+            droppable = set()
+            spans = []
+            for sampler_index, sampler in enumerate(samplers):
+                times = read_accessor_float(source, glb.bin, sampler['input'])[:, 0].astype(np.float64)
+                clip["keyframes_before"] += len(times)
+                if len(times):
+                    spans.append((sampler_index, times[0], times[-1]))
+                paths = {path for path, _ in targets.get(sampler_index, ())}
+                if (sampler.get('interpolation', 'LINEAR') == 'CUBICSPLINE' or len(paths) != 1 or len(times) < 2
+                        or not paths <= set(REST_VALUES) | {"weights"}):
+                    reduced[sampler_index] = None
+                    continue
+                path = paths.pop()
+
+                # Morph weight outputs hold one row of target weights per key
+                values = read_accessor_float(source, glb.bin, sampler['output']).astype(np.float64)
+                values = values.reshape(len(times), -1)
+                limit = rotation_tolerance if path == "rotation" else tolerance
+
+                if np.all(key_errors(values, values[:1], path) <= limit):
+                    kept = np.array([0, len(times) - 1])
+                    rests = [rest_value(gltf, node, path, values.shape[1]) for _, node in targets[sampler_index]]
+                    if all(rest is not None and rest.shape == values[0].shape
+                           and key_errors(values[:1], rest[None, :], path)[0] <= limit for rest in rests):
+                        droppable.add(sampler_index)
+                elif sampler.get('interpolation', 'LINEAR') == 'STEP':
+                    kept = reduce_step(values, limit, path)
+                else:
+                    kept = reduce_linear(times, values, limit, path)
+                reduced[sampler_index] = (path, times, values, kept)
+
+            # Rest-pose channels may go, but the remaining ones must still span the clip
+            if spans:
+                clip_start = min(start for _, start, _ in spans)
+                clip_end = max(end for _, _, end in spans)
+                dropped = set(droppable)
+                for bound in (1, 2):
+                    value = clip_start if bound == 1 else clip_end
+                    if not any(span[bound] == value for span in spans if span[0] not in dropped):
+                        dropped.discard(next(span[0] for span in spans if span[bound] == value))
+            else:
+                dropped = set()
+
+            for sampler_index, sampler in enumerate(samplers):
+                if sampler_index in dropped:
+                    continue
+                if reduced[sampler_index] is None:
+                    clip["keyframes_after"] += gltf['accessors'][sampler['input']]['count']
+                    continue
+                path, times, values, kept = reduced[sampler_index]
+                clip["keyframes_after"] += len(kept)
+                output = values[kept]
+                quantize = path == "rotation" and quantize_rotations
+                if len(kept) == len(times) and not quantize:
+                    continue
+                if len(kept) != len(times):
+                    sampler['input'] = time_accessor(times[kept])
+                if quantize:
+                    output = output / np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
+                    output = np.round(np.clip(output, -1.0, 1.0) * 32767).astype(np.int16)
+                    sampler['output'] = repacker.add_accessor(output, normalized=True)
+                elif path == "weights":
+                    sampler['output'] = repacker.add_accessor(output.astype(np.float32).reshape(-1, 1))
+                else:
+                    sampler['output'] = repacker.add_accessor(output.astype(np.float32))
+
+            remap = {}
+            for sampler_index in range(len(samplers)):
+                if sampler_index not in dropped:
+                    remap[sampler_index] = len(remap)
+            animation['samplers'] = [samplers[i] for i in remap]
+            animation['channels'] = [
+                dict(channel, sampler=remap[channel['sampler']])
+                for channel in animation.get('channels', []) if channel['sampler'] in remap
+            ]
+            clip["channels_after"] = len(animation['channels'])
+            report["clips"].append(clip)
+
+        repacker.write(output_path)
+
+    with GLBFile(output_path) as glb:
+        for clip, animation in zip(report["clips"], glb.json.get('animations', [])):
+            clip["bytes_after"] = _clip_bytes(glb.json, animation)
+            clip["bytes_saved"] = clip["bytes_before"] - clip["bytes_after"]
+
+    report["bytes_after"] = os.path.getsize(output_path)
+    report["bytes_saved"] = bytes_before - report["bytes_after"]
+    return report
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Batch model conversion across parallel Blender sessions
+A batch (a JSON manifest or a directory of models) is split into shards,
+each converted by one Blender process running convert_model.py in batch
+mode, so Blender starts once per shard instead of once per file. A file
+that fails is recorded and the batch carries on; if a file takes its
+Blender process down, the rest of that shard continues in a fresh one
+
+    python batch_convert.py library/ static/models --jobs 4 --results results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+SUPPORTED_FORMATS = ('.glb', '.gltf', '.fbx', '.obj', '.stl', '.dae', '.blend')
+
+CONVERT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'convert_model.py')
+
+# Lines of Blender output kept to explain a crashed session
+LOG_TAIL_LINES = 20
+
+
+def load_batch(source, output_dir=None):
+    """
+    Conversion entries [{"input", "output"}] from a manifest or a directory
+
+    A manifest is a JSON list of input paths or {"input", "output"} objects
+    (relative paths are resolved against the manifest's directory). A
+    directory contributes every supported model file directly inside it.
+    Missing outputs default to <output_dir>/<input name>.glb, or
+    <input name>_<extension>.glb when that would overwrite an input or
+    another entry's output (car.fbx and car.obj); explicit outputs that
+    collide are a ValueError. All paths are made absolute so shard
+    manifests can live anywhere.
+    """
+    if os.path.isdir(source):
+        base_dir = source
+        items = [
+            name for name in sorted(os.listdir(source))
+            if os.path.splitext(name)[1].lower() in SUPPORTED_FORMATS and os.path.isfile(os.path.join(source, name))
+        ]
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            items = json.load(f)
+        if not isinstance(items, list):
+            raise ValueError("A batch manifest must be a JSON list")
+
+    entries = []
+    for item in items:
+        entry = dict(item) if isinstance(item, dict) else {"input": item}
+        if "input" not in entry:
+            raise ValueError(f"Batch entry without an input: {item}")
+        entry["input"] = os.path.abspath(os.path.join(base_dir, entry["input"]))
+        if "output" in entry:
+            entry["output"] = os.path.abspath(os.path.join(base_dir, entry["output"]))
+        entries.append(entry)
+
+    # Outputs must be distinct and never an input, since shards run at once
+    inputs = {os.path.normcase(entry["input"]) for entry in entries}
+    taken = set()
+    for entry in entries:
+        if "output" in entry:
+            key = os.path.normcase(entry["output"])
+            if key in taken or key in inputs:
+                raise ValueError(f"Batch output is used twice or overwrites an input: {entry['output']}")
+            taken.add(key)
+    for entry in entries:
+        if "output" in entry:
+            continue
+        stem, extension = os.path.splitext(os.path.basename(entry["input"]))
+        directory = output_dir or os.path.dirname(entry["input"])
+        candidates = [f"{stem}.glb", f"{stem}_{extension.lstrip('.').lower()}.glb"]
+        candidates += (f"{stem}_{extension.lstrip('.').lower()}_{n}.glb" for n in range(2, len(entries) + 2))
+        for name in candidates:
+            output = os.path.abspath(os.path.join(directory, name))
+            if os.path.normcase(output) not in taken and os.path.normcase(output) not in inputs:
+                break
+        entry["output"] = output
+        taken.add(os.path.normcase(output))
+    return entries
+
+
+def shard_entries(entries, shards):
+    """Split entries into up to `shards` lists of similar total input size, largest files first"""
+    def size(entry):
+        try:
+            return os.path.getsize(entry["input"])
+        except OSError:
+            return 0
+
+    buckets = [[] for _ in range(max(1, min(shards, len(entries))))]
+    totals = [0] * len(buckets)
+    for entry in sorted(entries, key=size, reverse=True):
+        smallest = totals.index(min(totals))
+        buckets[smallest].append(entry)
+        totals[smallest] += size(entry)
+    return [bucket for bucket in buckets if bucket]
+
+
+def read_results(path):
+    """Results appended by a batch session (one JSON object per line; a torn last line is ignored)"""
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                break
+    return results
+
+
+def run_shard(entries, work_dir, blender_path='blender', preserve_animations=True, timeout=None):
+    """
+    Convert a shard's entries in as few Blender sessions as possible
+    Returns one result per entry, in order. A session that exits or times
+    out mid-file fails that file and the remaining files go to a new session
+    """
+    remaining = list(entries)
+    results = []
+    while remaining:
+        fd, manifest_path = tempfile.mkstemp(suffix='_batch.json', dir=work_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(remaining, f)
+        results_path = f"{manifest_path}.results"
+        command = [blender_path, '--background', '--python', CONVERT_SCRIPT, '--',
+                   '--batch', manifest_path, '--results', results_path]
+        if not preserve_animations:
+            command.append('--no-animations')
+
+        log = deque(maxlen=LOG_TAIL_LINES)
+        try:
+            process = subprocess.run(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                timeout=timeout * len(remaining) if timeout else None
+            )
+            log.extend(process.stdout.splitlines())
+            failure = f"Blender exited with code {process.returncode}"
+        except subprocess.TimeoutExpired as e:
+            output = e.output.decode(errors='replace') if isinstance(e.output, bytes) else (e.output or '')
+            log.extend(output.splitlines())
+            failure = f"Blender timed out after {e.timeout:.0f}s"
+        except OSError as e:
+            # Blender could not be started at all: nothing in this shard can convert
+            return results + [
+                {"input": entry["input"], "output": entry["output"], "ok": False,
+                 "error": f"Cannot start Blender: {str(e)}"}
+                for entry in remaining
+            ]
+
+        done = read_results(results_path)[:len(remaining)]
+        results.extend(done)
+        remaining = remaining[len(done):]
+        for path in (manifest_path, results_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        if remaining:
+            # Results are written in order, so the next entry is the one the session died on
+            entry = remaining.pop(0)
+            results.append({
+                "input": entry["input"],
+                "output": entry["output"],
+                "ok": False,
+                "error": f"{failure} while converting this file: " + " | ".join(log)
+            })
+    return results
+
+
+def convert_batch(entries, jobs=None, blender_path='blender', preserve_animations=True, timeout=None):
+    """
+    Convert entries on up to `jobs` parallel Blender sessions (bounded by the core count)
+    Returns {"results", "succeeded", "failed", "shards", "seconds"} with
+    results in entry order
+    """
+    start = time.time()
+    cores = os.cpu_count() or 1
+    jobs = max(1, min(jobs or cores, cores))
+    shards = shard_entries(entries, jobs)
+
+    with tempfile.TemporaryDirectory(prefix='batch_convert_') as work_dir:
+        with ThreadPoolExecutor(max_workers=max(1, len(shards))) as executor:
+            shard_results = list(executor.map(
+                lambda shard: run_shard(shard, work_dir, blender_path, preserve_animations, timeout), shards
+            ))
+
+    by_entry = {(result["input"], result["output"]): result for results in shard_results for result in results}
+    results = [by_entry[entry["input"], entry["output"]] for entry in entries]
+    succeeded = sum(1 for result in results if result["ok"])
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "shards": len(shards),
+        "seconds": round(time.time() - start, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert many models to GLB on parallel Blender sessions")
+    parser.add_argument('source', help="Directory of models, or a JSON manifest of inputs")
+    parser.add_argument('output_dir', nargs='?', help="Directory for outputs without an explicit path")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help="Parallel Blender sessions (default and maximum: the number of cores)")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER_PATH', 'blender'), help="Blender executable")
+    parser.add_argument('--no-animations', action='store_true', help="Do not export animations")
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds allowed per file")
+    parser.add_argument('--results', help="Write the result manifest here instead of stdout")
+    args = parser.parse_args()
+
+    entries = load_batch(args.source, args.output_dir)
+    if not entries:
+        print(f"No models to convert in {args.source}")
+        return 1
+    summary = convert_batch(entries, args.jobs, args.blender, not args.no_animations, args.timeout)
+    if args.results:
+        with open(args.results, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Converted {summary['succeeded']} of {len(entries)} models "
+              f"on {summary['shards']} Blender sessions in {summary['seconds']}s")
+    else:
+        print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
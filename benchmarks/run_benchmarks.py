@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the server and the asset pipeline
+Measures GLB parse/stats/merge/optimize/LOD throughput, entity store and
+ingest throughput, and per-endpoint latency and throughput through an
+in-process ASGI client. Inputs are synthetic and seeded, results are JSON,
+and a run can be compared against a stored baseline with regression
+thresholds (exit status 1 on regression)
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline benchmarks/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from synthetic import synthetic_entities, synthetic_glb
+from entity_ingest import ingest_ndjson
+from entity_store import EntityStore
+from glb_combine import combine_glbs
+from glb_reader import GLBFile
+from gltf_arrays import read_accessor
+from lod import generate_lod
+from mesh_optimize import optimize_glb
+from model_stats import geometry_stats
+
+# Input sizes per profile
+PROFILES = {
+    "quick": {
+        "meshes": 4, "triangles": 20000, "animations": 1, "textures": 1, "texture_size": 256,
+        "merge_inputs": 4, "entities": 20000, "requests": 50, "concurrency": 8, "repeats": 3
+    },
+    "full": {
+        "meshes": 16, "triangles": 50000, "animations": 4, "textures": 4, "texture_size": 1024,
+        "merge_inputs": 8, "entities": 200000, "requests": 300, "concurrency": 16, "repeats": 5
+    }
+}
+
+# Allowed relative change of a benchmark's primary metric before it counts
+# as a regression; HTTP latency is noisier than the pure compute benchmarks
+DEFAULT_THRESHOLD = 0.15
+THRESHOLDS = {"http_": 0.30}
+
+MIN_MEASURE_SECONDS = 0.5
+
+BENCHMARKS = {}
+
+
+def benchmark(name, metric, higher_is_better=True):
+    """Register a benchmark function returning a dict that includes `metric`"""
+    def register(fn):
+        BENCHMARKS[name] = (fn, metric, higher_is_better)
+        return fn
+    return register
+
+
+def timed(fn, repeats, warmup=1):
+    """
+    Median wall time of fn() after `warmup` unmeasured runs, over at least
+    `repeats` runs and MIN_MEASURE_SECONDS of samples (fast benchmarks get
+    more samples, which keeps their median stable)
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    while len(times) < repeats or sum(times) < MIN_MEASURE_SECONDS:
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _mb(num_bytes):
+    return num_bytes / (1024 * 1024)
+
+
+class Workspace:
+    """Temporary directory holding the synthetic inputs and the server's working tree"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.root = tempfile.mkdtemp(prefix="holoviewer-bench-")
+        self.models_dir = os.path.join(self.root, 'static', 'models')
+        os.makedirs(self.models_dir)
+        self.model_path = os.path.join(self.models_dir, 'synthetic.glb')
+        synthetic_glb(self.model_path, profile["meshes"], profile["triangles"], profile["animations"],
+                      profile["textures"], profile["texture_size"])
+        self.merge_inputs = []
+        for i in range(profile["merge_inputs"]):
+            path = os.path.join(self.models_dir, f'part_{i}.glb')
+            synthetic_glb(path, max(1, profile["meshes"] // 2), profile["triangles"] // 2, 1, 1,
+                          profile["texture_size"], seed=i + 1)
+            self.merge_inputs.append(path)
+        self.entities = synthetic_entities(profile["entities"])
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def output(self, name):
+        """
+        A fresh output path per call; replacing an existing file adds the
+        filesystem's unlink cost to the measurement
+        """
+        self._outputs = getattr(self, '_outputs', 0) + 1
+        stem, ext = os.path.splitext(name)
+        return self.path(f"{stem}_{self._outputs}{ext}")
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+@benchmark("glb_parse", "mb_per_second")
+def bench_glb_parse(ws):
+    """Map the file and read every accessor into NumPy"""
+    def run():
+        with GLBFile(ws.model_path) as glb:
+            for index in range(len(glb.json.get('accessors', []))):
+                np.asarray(read_accessor(glb.json, glb.bin, index)).sum()
+    seconds = timed(run, ws.profile["repeats"])
+    size = os.path.getsize(ws.model_path)
+    return {"seconds": seconds, "bytes": size, "mb_per_second": _mb(size) / seconds}
+
+
+@benchmark("glb_stats", "models_per_second")
+def bench_glb_stats(ws):
+    seconds = timed(lambda: geometry_stats(ws.model_path), ws.profile["repeats"])
+    return {"seconds": seconds, "models_per_second": 1 / seconds}
+
+
+@benchmark("glb_merge", "mb_per_second")
+def bench_glb_merge(ws):
+    seconds = timed(lambda: combine_glbs(ws.merge_inputs, ws.output('merged.glb')), ws.profile["repeats"])
+    size = sum(os.path.getsize(path) for path in ws.merge_inputs)
+    return {"seconds": seconds, "inputs": len(ws.merge_inputs), "bytes": size, "mb_per_second": _mb(size) / seconds}
+
+
+@benchmark("glb_optimize", "triangles_per_second")
+def bench_glb_optimize(ws):
+    seconds = timed(lambda: optimize_glb(ws.model_path, ws.output('optimized.glb')), ws.profile["repeats"])
+    triangles = geometry_stats(ws.model_path)["triangles"]
+    return {"seconds": seconds, "triangles": triangles, "triangles_per_second": triangles / seconds}
+
+
+@benchmark("glb_lod", "triangles_per_second")
+def bench_glb_lod(ws):
+    seconds = timed(lambda: generate_lod(ws.model_path, ws.output('lod.glb'), 0.25), ws.profile["repeats"], warmup=0)
+    triangles = geometry_stats(ws.model_path)["triangles"]
+    return {"seconds": seconds, "triangles": triangles, "triangles_per_second": triangles / seconds}
+
+
+@benchmark("entity_upsert", "entities_per_second")
+def bench_entity_upsert(ws):
+    def run():
+        store = EntityStore()
+        for entity in ws.entities:
+            store.upsert(entity)
+    seconds = timed(run, ws.profile["repeats"], warmup=0)
+    return {"seconds": seconds, "entities": len(ws.entities), "entities_per_second": len(ws.entities) / seconds}
+
+
+@benchmark("entity_ingest_ndjson", "records_per_second")
+def bench_entity_ingest(ws):
+    store = EntityStore()
+    store.apply_batch(ws.entities)
+    # Position updates for every entity, the common case for track feeds
+    moved = [
+        {"entity_id": entity["entity_id"], "location": {"position": {
+            "latitude_degrees": entity["location"]["position"]["latitude_degrees"] + 0.001,
+            "longitude_degrees": entity["location"]["position"]["longitude_degrees"]
+        }}}
+        for entity in ws.entities
+    ]
+    data = "\n".join(json.dumps(entity) for entity in moved)
+    seconds = timed(lambda: ingest_ndjson(store, data), ws.profile["repeats"], warmup=0)
+    return {"seconds": seconds, "records": len(moved), "records_per_second": len(moved) / seconds}
+
+
+@benchmark("entity_query", "queries_per_second")
+def bench_entity_query(ws):
+    store = EntityStore()
+    store.apply_batch(ws.entities)
+    rng = np.random.default_rng(0)
+    centers = rng.uniform((-60, -170), (60, 170), (200, 2))
+
+    def run():
+        for lat, lon in centers:
+            store.query(limit=100, bbox=(lon - 5, lat - 5, lon + 5, lat + 5), platform_types=['UAV'])
+    seconds = timed(run, ws.profile["repeats"])
+    return {"seconds": seconds, "queries": len(centers), "queries_per_second": len(centers) / seconds}
+
+
+def _latency_report(latencies, wall_seconds, requests):
+    latencies = sorted(latencies)
+    return {
+        "requests": requests,
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "p99_ms": 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "mean_ms": 1000 * statistics.fmean(latencies),
+        "requests_per_second": requests / wall_seconds
+    }
+
+
+def http_benchmarks(ws, selected):
+    """
+    Endpoint latency (sequential requests) and throughput (concurrent
+    requests) through httpx's in-process ASGI transport
+    """
+    import httpx
+
+    # The server resolves static/, templates/ and cache/ relative to the cwd
+    os.symlink(os.path.join(REPO_DIR, 'templates'), ws.path('templates'))
+    os.environ.setdefault('BLENDER_WORKER', 'fake')
+    cwd = os.getcwd()
+    os.chdir(ws.root)
+    try:
+        import server
+        server.model_catalog.scan()
+        server.entity_store.apply_batch(ws.entities)
+        part_names = [os.path.basename(path) for path in ws.merge_inputs[:2]]
+
+        async def combine(client):
+            response = await client.post('/combine_models', json={"models": part_names, "output_name": "combined"})
+            job_url = response.json()["status_url"]
+            while True:
+                job = (await client.get(job_url)).json()
+                if job["status"] in ('succeeded', 'failed'):
+                    return job
+                await asyncio.sleep(0.002)
+
+        endpoints = {
+            "http_models": lambda client: client.get('/models'),
+            "http_model_info": lambda client: client.get('/model_info/synthetic.glb'),
+            "http_entities_page": lambda client: client.get('/entities', params={"limit": 100}),
+            "http_entities_bbox": lambda client: client.get('/entities/bbox', params={"bbox": "-10,30,10,50"}),
+            "http_entities_radius": lambda client: client.get(
+                '/entities/radius', params={"lat": 40, "lon": 0, "radius_meters": 500000}),
+            "http_entities_nearest": lambda client: client.get(
+                '/entities/nearest', params={"lat": 40, "lon": 0, "k": 20}),
+            "http_combine_models": combine
+        }
+
+        async def run_endpoint(request, count, concurrency):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await request(client)
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(count):
+                    t = time.perf_counter()
+                    await request(client)
+                    latencies.append(time.perf_counter() - t)
+                sequential = time.perf_counter() - started
+
+                async def worker(n):
+                    for _ in range(n):
+                        await request(client)
+                started = time.perf_counter()
+                await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+                concurrent = time.perf_counter() - started
+
+            report = _latency_report(latencies, sequential, count)
+            report["concurrency"] = concurrency
+            report["concurrent_requests_per_second"] = (count // concurrency) * concurrency / concurrent
+            return report
+
+        results = {}
+        for name, request in endpoints.items():
+            if name not in selected:
+                continue
+            count = ws.profile["requests"]
+            if name == "http_combine_models":
+                count = max(ws.profile["concurrency"], count // 5)
+            results[name] = asyncio.run(run_endpoint(request, count, ws.profile["concurrency"]))
+        server.shutdown_workers()
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+HTTP_BENCHMARKS = ("http_models", "http_model_info", "http_entities_page", "http_entities_bbox",
+                   "http_entities_radius", "http_entities_nearest", "http_combine_models")
+for _name in HTTP_BENCHMARKS:
+    BENCHMARKS[_name] = (None, "p50_ms", False)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(profile_name, selected):
+    profile = PROFILES[profile_name]
+    ws = Workspace(profile)
+    results = {}
+    try:
+        for name in selected:
+            fn, metric, higher_is_better = BENCHMARKS[name]
+            if fn is None:
+                continue
+            print(f"{name}...", file=sys.stderr)
+            results[name] = dict(fn(ws), metric=metric, higher_is_better=higher_is_better)
+        http_selected = [name for name in selected if name in HTTP_BENCHMARKS]
+        if http_selected:
+            print(f"{', '.join(http_selected)}...", file=sys.stderr)
+            for name, report in http_benchmarks(ws, http_selected).items():
+                _, metric, higher_is_better = BENCHMARKS[name]
+                results[name] = dict(report, metric=metric, higher_is_better=higher_is_better)
+    finally:
+        ws.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "profile": profile_name,
+            "config": profile,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "benchmarks": results
+    }
+
+
+def threshold_for(name, default):
+    for prefix, threshold in THRESHOLDS.items():
+        if name.startswith(prefix):
+            return max(threshold, default)
+    return default
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare primary metrics against a baseline run
+    Returns a list of rows: (name, metric, baseline, current, change, regressed)
+    """
+    rows = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        metric = current["metric"]
+        before, after = previous[metric], current[metric]
+        change = (after - before) / before if before else 0.0
+        limit = threshold_for(name, threshold)
+        regressed = change < -limit if current["higher_is_better"] else change > limit
+        rows.append((name, metric, before, after, change, regressed))
+    return rows
+
+
+def print_comparison(rows, baseline):
+    print(f"Compared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp')}):", file=sys.stderr)
+    for name, metric, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"  {name:24} {metric:22} {before:12.2f} -> {after:12.2f} {change:+7.1%} {flag}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server and asset pipeline benchmarks")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--only', help="Comma-separated benchmark names (default: all)")
+    parser.add_argument('--list', action='store_true', help="List benchmark names and exit")
+    parser.add_argument('--output', help="Write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative change of a primary metric before it is a regression")
+    parser.add_argument('--update-baseline', metavar='PATH', help="Also store the results as the baseline")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, metric, higher_is_better) in BENCHMARKS.items():
+            print(f"{name:24} {metric} ({'higher' if higher_is_better else 'lower'} is better)")
+        return 0
+
+    selected = list(BENCHMARKS)
+    if args.only:
+        selected = [name.strip() for name in args.only.split(',')]
+        unknown = [name for name in selected if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_suite(args.profile, selected)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.update_baseline:
+        with open(args.update_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("profile") != results["meta"]["profile"]:
+            print("Baseline was recorded with a different profile; sizes differ", file=sys.stderr)
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, baseline)
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Synthetic benchmark inputs
+Deterministic GLB models (meshes, triangles, animations and textures are
+all configurable) and entity batches shaped like the /entities payload
+"""
+
+import os
+import sys
+import zlib
+import struct
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glb_writer import BinaryBuilder, write_glb
+from gltf_arrays import DTYPE_COMPONENTS, SIZE_TYPES, TARGET_ARRAY_BUFFER, TARGET_ELEMENT_ARRAY_BUFFER
+
+PLATFORM_TYPES = ('UAV', 'Aircraft', 'Ground Vehicle', 'Ship', 'Sensor')
+SPECIFIC_TYPES = ('Surveillance', 'Transport', 'Fighter', 'Patrol', 'Radar')
+KEYFRAMES = 60
+
+
+def png_bytes(pixels):
+    """Encode an (height, width, 3) uint8 array as PNG"""
+    height, width, _ = pixels.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def _texture(rng, size):
+    """Smooth gradients plus noise, so the image compresses like a real texture"""
+    y, x = np.mgrid[0:size, 0:size] / size
+    base = np.stack([x, y, (x + y) / 2], axis=2) * 200
+    noise = rng.normal(0, 12, (size, size, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def _sphere(rng, triangles):
+    """Noisy UV sphere with about `triangles` triangles: positions, normals, uvs, indices"""
+    rows = max(2, int(round(np.sqrt(triangles / 4))))
+    cols = max(3, int(round(triangles / (2 * rows))))
+    theta = np.linspace(0, np.pi, rows + 1)[:, None]
+    phi = np.linspace(0, 2 * np.pi, cols + 1)[None, :]
+    normals = np.stack([
+        np.sin(theta) * np.cos(phi),
+        np.cos(theta) * np.ones_like(phi),
+        np.sin(theta) * np.sin(phi)
+    ], axis=2).reshape(-1, 3)
+    radius = 1 + rng.normal(0, 0.02, (len(normals), 1))
+    positions = normals * radius
+    uvs = np.stack(np.meshgrid(np.linspace(0, 1, cols + 1), np.linspace(0, 1, rows + 1)), axis=2).reshape(-1, 2)
+
+    r, c = np.mgrid[0:rows, 0:cols]
+    a = (r * (cols + 1) + c).ravel()
+    b, d = a + 1, a + cols + 1
+    indices = np.stack([np.stack([a, d, b], axis=1), np.stack([b, d, d + 1], axis=1)], axis=1).reshape(-1)
+    dtype = np.uint16 if len(positions) <= 0xFFFF else np.uint32
+    return (positions.astype(np.float32), normals.astype(np.float32),
+            uvs.astype(np.float32), indices.astype(dtype))
+
+
+def synthetic_glb(path, meshes=4, triangles=10000, animations=1, textures=1, texture_size=512, seed=0):
+    """
+    Write a GLB with `meshes` noisy spheres of about `triangles` triangles
+    each, `animations` clips rotating and translating every mesh node and
+    `textures` embedded PNG textures. Returns the path
+    """
+    rng = np.random.default_rng(seed)
+    builder = BinaryBuilder()
+    gltf = {
+        "asset": {"version": "2.0", "generator": "HolographicViewer benchmarks"},
+        "scene": 0,
+        "scenes": [{"nodes": list(range(meshes))}],
+        "nodes": [],
+        "meshes": [],
+        "accessors": [],
+        "bufferViews": []
+    }
+
+    def add_accessor(data, target=None, bounds=False):
+        data = np.ascontiguousarray(data)
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        view = {"buffer": 0, "byteOffset": builder.add(data), "byteLength": data.nbytes}
+        if target:
+            view["target"] = target
+        gltf["bufferViews"].append(view)
+        accessor = {
+            "bufferView": len(gltf["bufferViews"]) - 1,
+            "componentType": DTYPE_COMPONENTS[data.dtype],
+            "count": data.shape[0],
+            "type": SIZE_TYPES[data.shape[1]]
+        }
+        if bounds:
+            accessor["min"] = data.min(axis=0).tolist()
+            accessor["max"] = data.max(axis=0).tolist()
+        gltf["accessors"].append(accessor)
+        return len(gltf["accessors"]) - 1
+
+    if textures:
+        gltf["images"], gltf["textures"], gltf["materials"] = [], [], []
+        gltf["samplers"] = [{"magFilter": 9729, "minFilter": 9987, "wrapS": 10497, "wrapT": 10497}]
+        for i in range(textures):
+            data = png_bytes(_texture(rng, texture_size))
+            gltf["bufferViews"].append({"buffer": 0, "byteOffset": builder.add(data), "byteLength": len(data)})
+            gltf["images"].append({"bufferView": len(gltf["bufferViews"]) - 1, "mimeType": "image/png"})
+            gltf["textures"].append({"sampler": 0, "source": i})
+            gltf["materials"].append({"name": f"material_{i}", "pbrMetallicRoughness": {"baseColorTexture": {"index": i}}})
+
+    for i in range(meshes):
+        positions, normals, uvs, indices = _sphere(rng, triangles)
+        primitive = {
+            "attributes": {
+                "POSITION": add_accessor(positions, TARGET_ARRAY_BUFFER, bounds=True),
+                "NORMAL": add_accessor(normals, TARGET_ARRAY_BUFFER),
+                "TEXCOORD_0": add_accessor(uvs, TARGET_ARRAY_BUFFER)
+            },
+            "indices": add_accessor(indices, TARGET_ELEMENT_ARRAY_BUFFER)
+        }
+        if textures:
+            primitive["material"] = i % textures
+        gltf["meshes"].append({"name": f"mesh_{i}", "primitives": [primitive]})
+        gltf["nodes"].append({"name": f"node_{i}", "mesh": i, "translation": [3.0 * i, 0.0, 0.0]})
+
+    if animations:
+        gltf["animations"] = []
+        times = np.linspace(0, 2, KEYFRAMES, dtype=np.float32)
+        angles = np.linspace(0, np.pi, KEYFRAMES)
+        for a in range(animations):
+            input_index = add_accessor(times, bounds=True)
+            samplers, channels = [], []
+            for node in range(meshes):
+                rotation = np.stack([np.zeros_like(angles), np.sin(angles / 2), np.zeros_like(angles),
+                                     np.cos(angles / 2)], axis=1).astype(np.float32)
+                translation = np.stack([np.full_like(angles, 3.0 * node), np.sin(angles + a), np.zeros_like(angles)],
+                                       axis=1).astype(np.float32)
+                for target_path, values in (("rotation", rotation), ("translation", translation)):
+                    samplers.append({"input": input_index, "output": add_accessor(values), "interpolation": "LINEAR"})
+                    channels.append({"sampler": len(samplers) - 1, "target": {"node": node, "path": target_path}})
+            gltf["animations"].append({"name": f"clip_{a}", "samplers": samplers, "channels": channels})
+
+    gltf["buffers"] = [{"byteLength": builder.length}]
+    write_glb(path, gltf, builder.pieces, builder.length)
+    return path
+
+
+def synthetic_entities(count, seed=0, prefix="bench"):
+    """`count` entities shaped like the /entities payload, spread over the globe"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-70, 70, count)
+    lon = rng.uniform(-180, 180, count)
+    alt = rng.uniform(0, 12000, count)
+    platform = rng.integers(0, len(PLATFORM_TYPES), count)
+    health = rng.integers(0, 4, count)
+    flags = rng.random((count, 3)) < (0.5, 0.3, 0.05)
+    return [
+        {
+            "entity_id": f"{prefix}-{i:07d}",
+            "description": f"Synthetic {PLATFORM_TYPES[platform[i]]} {i}",
+            "is_live": bool(i % 10),
+            "created_time": "2025-01-01T00:00:00Z",
+            "ontology": {"platform_type": PLATFORM_TYPES[platform[i]], "specific_type": SPECIFIC_TYPES[platform[i]]},
+            "health": {"health_status": int(health[i]), "connection_status": 2},
+            "location": {"position": {
+                "latitude_degrees": float(lat[i]),
+                "longitude_degrees": float(lon[i]),
+                "altitude_hae_meters": {"__root__": float(alt[i])}
+            }},
+            "indicators": {"simulated": bool(flags[i, 0]), "exercise": bool(flags[i, 1]), "emergency": bool(flags[i, 2])}
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Pool of long-lived Blender worker processes
+Each worker runs blender_worker.py, which loops over jobs read from stdin,
+so Blender's startup cost is paid once per worker instead of once per job
+"""
+
+import os
+import json
+import time
+import queue
+import shutil
+import itertools
+import threading
+import subprocess
+from collections import deque
+
+from glb_reader import read_model_info
+from glb_combine import combine_glbs
+from metrics import BLENDER_JOBS, BLENDER_JOB_SECONDS, BLENDER_WORKER_EXITS
+from worker_protocol import RESULT_MARKER, encode_job, decode_job, encode_result, decode_result, handle_job
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blender_worker.py')
+
+
+class WorkerError(RuntimeError):
+    """Raised when a worker process dies or stops responding"""
+
+
+def _fake_convert(input_path, output_path, preserve_animations=True):
+    shutil.copy(input_path, output_path)
+    return {"output_path": output_path}
+
+
+def _fake_combine(model_paths, output_path, position_data_path=None):
+    position_data = {}
+    if position_data_path and os.path.exists(position_data_path):
+        with open(position_data_path) as f:
+            position_data = json.load(f)
+    combine_glbs(model_paths, output_path, position_data)
+    return {"output_path": output_path}
+
+
+def _fake_extract(model_path):
+    return read_model_info(model_path)
+
+
+# Handlers used by FakeWorker: they mimic the Blender operations closely
+# enough to exercise the pool, the protocol and the server without Blender
+FAKE_HANDLERS = {
+    "ping": lambda: "pong",
+    "convert": _fake_convert,
+    "combine": _fake_combine,
+    "extract": _fake_extract,
+}
+
+
+class BlenderWorker:
+    """A Blender process running the blender_worker.py job loop"""
+
+    def __init__(self, blender_path='blender', script_path=WORKER_SCRIPT):
+        self.jobs_done = 0
+        self._results = queue.Queue()
+        self._log = deque(maxlen=20)
+        self.process = subprocess.Popen(
+            [blender_path, '--background', '--python', script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        """Split worker output into result lines and log lines"""
+        for line in self.process.stdout:
+            # Blender may leave a partial log line unterminated, so the
+            # marker is not necessarily at the start of the line
+            marker_index = line.find(RESULT_MARKER)
+            if marker_index >= 0:
+                self._results.put(decode_result(line[marker_index:]))
+            else:
+                self._log.append(line.rstrip())
+        # End of output means the process has exited
+        self._results.put(None)
+
+    def run(self, job, timeout=None):
+        """Send a job to the worker and wait for its result"""
+        try:
+            self.process.stdin.write(encode_job(job))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"Blender worker is not accepting jobs: {str(e)}")
+
+        try:
+            result = self._results.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            raise WorkerError(f"Blender worker timed out after {timeout}s")
+
+        if result is None:
+            raise WorkerError("Blender worker exited: " + " | ".join(self._log))
+
+        self.jobs_done += 1
+        return result
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def exit_code(self):
+        """Exit status of the process, or None while it is running"""
+        return self.process.poll()
+
+    def memory_bytes(self):
+        """Resident memory of the worker process, or None if unavailable"""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def close(self):
+        """Stop the worker, killing it if it does not exit promptly"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class FakeWorker:
+    """
+    In-process stand-in for BlenderWorker
+    Jobs still go through the line protocol, so everything except Blender
+    itself is exercised
+    """
+
+    def __init__(self, handlers=None):
+        self.handlers = handlers or FAKE_HANDLERS
+        self.jobs_done = 0
+        self._alive = True
+
+    def run(self, job, timeout=None):
+        if not self._alive:
+            raise WorkerError("Fake worker is closed")
+        result = handle_job(self.handlers, decode_job(encode_job(job)))
+        self.jobs_done += 1
+        return decode_result(encode_result(result))
+
+    def is_alive(self):
+        return self._alive
+
+    def exit_code(self):
+        return None if self._alive else 0
+
+    def memory_bytes(self):
+        return None
+
+    def close(self):
+        self._alive = False
+
+
+class BlenderPool:
+    """
+    Bounded pool of warm workers
+
+    Workers are started lazily and recycled after max_jobs_per_worker jobs
+    or once their resident memory exceeds max_memory_mb.
+    """
+
+    def __init__(self, size=2, max_jobs_per_worker=50, max_memory_mb=2048,
+                 worker_factory=None, job_timeout=600):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.worker_factory = worker_factory or BlenderWorker
+        self.job_timeout = job_timeout
+        self.workers_started = 0
+        self.workers_recycled = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+        self._job_ids = itertools.count(1)
+
+    def _acquire(self):
+        """Take an idle worker, or start one if none is warm"""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            worker = self.worker_factory()
+        except Exception:
+            self._slots.release()
+            raise
+        self.workers_started += 1
+        return worker
+
+    def _should_recycle(self, worker):
+        if self.max_jobs_per_worker and worker.jobs_done >= self.max_jobs_per_worker:
+            return True
+        memory = worker.memory_bytes()
+        if self.max_memory_mb and memory is not None and memory > self.max_memory_mb * 1024 * 1024:
+            return True
+        return False
+
+    def _release(self, worker, op=None):
+        """Return a worker to the pool, or retire it"""
+        if worker is not None:
+            alive = worker.is_alive()
+            if alive and not self._should_recycle(worker):
+                self._idle.put(worker)
+            else:
+                self.workers_recycled += 1
+                worker.close()
+                BLENDER_WORKER_EXITS.inc(operation=op or 'none', exit_code=worker.exit_code(),
+                                         reason='recycled' if alive else 'died')
+        self._slots.release()
+
+    def run(self, op, **args):
+        """
+        Run an operation on a pooled worker and return its result dictionary
+        {"id", "ok", "result"} on success or {"id", "ok": False, "error"} on failure
+        """
+        job = {"id": next(self._job_ids), "op": op, "args": args}
+
+        start = time.perf_counter()
+        try:
+            worker = self._acquire()
+        except Exception as e:
+            BLENDER_JOBS.inc(operation=op, outcome='worker_error')
+            return {"id": job["id"], "ok": False, "error": f"Failed to start worker: {str(e)}"}
+
+        outcome = 'worker_error'
+        try:
+            result = worker.run(job, timeout=self.job_timeout)
+            outcome = 'ok' if result.get('ok') else 'error'
+            return result
+        except WorkerError as e:
+            # A dead or hung worker is retired by _release
+            return {"id": job["id"], "ok": False, "error": str(e)}
+        finally:
+            BLENDER_JOB_SECONDS.observe(time.perf_counter() - start, operation=op)
+            BLENDER_JOBS.inc(operation=op, outcome=outcome)
+            self._release(worker, op)
+
+    def shutdown(self):
+        """Stop all idle workers"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close()
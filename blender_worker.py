@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Blender Python script that runs a long-lived job loop for BlenderPool
+To be called from Blender's Python interpreter:
+    blender --background --python blender_worker.py
+
+Reads one JSON job per line from stdin and writes one marked JSON result
+per line to stdout (see worker_protocol.py)
+"""
+
+import os
+import sys
+
+# Make the sibling scripts importable from inside Blender
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bpy
+
+import convert_model
+import combine_models
+import extract_animations
+from worker_protocol import serve_jobs
+
+def reset_session():
+    """Start every job from an empty scene so no data leaks between jobs"""
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+def convert(input_path, output_path, preserve_animations=True):
+    """Convert a model to GLB"""
+    if not convert_model.convert_to_glb(input_path, output_path, preserve_animations):
+        raise ValueError(f"Unsupported file format: {os.path.splitext(input_path)[1]}")
+    return {"output_path": output_path}
+
+def combine(model_paths, output_path, position_data_path=""):
+    """Combine several models into one GLB"""
+    combine_models.combine_models(model_paths, output_path, position_data_path)
+    return {"output_path": output_path}
+
+def extract(model_path):
+    """Return animation information for a model"""
+    return extract_animations.get_animation_info(model_path)
+
+JOB_HANDLERS = {
+    "ping": lambda: "pong",
+    "convert": convert,
+    "combine": combine,
+    "extract": extract,
+}
+
+if __name__ == "__main__":
+    serve_jobs(JOB_HANDLERS, before_job=reset_session)
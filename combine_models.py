@@ -9,6 +9,7 @@ import sys
 import os
 import json
 import math
+import hashlib
 
 def clear_scene():
     """Clear the current scene"""
@@ -31,6 +32,10 @@ def clear_scene():
     for block in bpy.data.images:
         if block.users == 0:
             bpy.data.images.remove(block)
+            
+    for block in bpy.data.actions:
+        if block.users == 0:
+            bpy.data.actions.remove(block)
 
 def import_model(model_path):
     """Import a model based on its file extension"""
@@ -101,8 +106,42 @@ def apply_transform(obj_idx, position_data):
                     data["scale"]
                 )
 
+def file_hash(path):
+    """SHA-256 of a file, to recognise a model listed more than once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def add_linked_copy(objects):
+    """
+    Copy imported objects without copying their data
+    The copies share mesh (and armature) data with the originals, so the
+    glTF exporter writes the geometry once; parents and modifier targets
+    inside the group point at the copies. objects are (object, original
+    local transform) pairs; the copies are left selected
+    """
+    copies = {}
+    for obj, basis in objects:
+        duplicate = obj.copy()
+        duplicate.matrix_basis = basis
+        bpy.context.collection.objects.link(duplicate)
+        copies[obj] = duplicate
+    
+    for obj, duplicate in copies.items():
+        if obj.parent in copies:
+            duplicate.parent = copies[obj.parent]
+        for modifier in duplicate.modifiers:
+            if getattr(modifier, 'object', None) in copies:
+                modifier.object = copies[modifier.object]
+        duplicate.select_set(True)
+
 def combine_models(model_paths, output_path, position_data_path):
-    """Combine multiple models into a single GLB file"""
+    """
+    Combine multiple models into a single GLB file
+    Returns True once the combined model has been exported
+    """
     # Clear existing scene
     clear_scene()
     
@@ -115,13 +154,21 @@ def combine_models(model_paths, output_path, position_data_path):
         except Exception as e:
             print(f"Error loading position data: {str(e)}")
     
-    # Import each model and apply transformations
+    # Import each model and apply transformations; a model listed again is
+    # added as a linked copy of its first import instead of being re-imported
+    imported = {}
     for i, model_path in enumerate(model_paths):
         # Deselect all objects before importing
         bpy.ops.object.select_all(action='DESELECT')
         
-        # Get current object count to identify new objects
-        prev_obj_count = len(bpy.context.scene.objects)
+        key = file_hash(model_path) if os.path.isfile(model_path) else model_path
+        if key in imported:
+            add_linked_copy(imported[key])
+            apply_transform(i, position_data)
+            continue
+        
+        # Remember the existing objects to identify new ones
+        previous_objects = set(bpy.context.scene.objects)
         
         # Import the model
         success = import_model(model_path)
@@ -130,10 +177,10 @@ def combine_models(model_paths, output_path, position_data_path):
             continue
         
         # Select only the newly added objects
-        for obj in bpy.context.scene.objects:
-            if obj not in bpy.context.selected_objects:
-                if len(bpy.context.scene.objects) > prev_obj_count:
-                    obj.select_set(True)
+        new_objects = [obj for obj in bpy.context.scene.objects if obj not in previous_objects]
+        for obj in new_objects:
+            obj.select_set(True)
+        imported[key] = [(obj, obj.matrix_basis.copy()) for obj in new_objects]
         
         # Apply transformations from position data
         apply_transform(i, position_data)
@@ -149,6 +196,7 @@ def combine_models(model_paths, output_path, position_data_path):
     )
     
     print(f"Successfully combined models into {output_path}")
+    return True
 
 if __name__ == "__main__":
     # Get command line arguments passed after "--"
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Content-addressed cache of converted models
+Outputs are stored under a key built from the source file's content hash
+and the conversion options, so re-uploading the same asset skips Blender
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import record_cache_lookup
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'conversions')
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def conversion_key(source_hash, options):
+    """Build the cache key for a source hash and a dictionary of conversion options"""
+    payload = json.dumps({"source": source_hash, "options": options}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def link_or_copy(source_path, dest_path):
+    """
+    Place source_path at dest_path as a hard link, falling back to a copy
+    The destination is swapped in atomically and never written in place, so
+    a hard-linked cache entry cannot be modified through it
+    """
+    # Already linked; rename() between two links of one inode is a no-op
+    # that would leave the temp link behind
+    if os.path.exists(dest_path) and os.path.samefile(source_path, dest_path):
+        return dest_path
+
+    temp_path = f"{dest_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.link(source_path, temp_path)
+    except OSError:
+        shutil.copy(source_path, temp_path)
+    os.replace(temp_path, dest_path)
+    return dest_path
+
+
+class ConversionCache:
+    """
+    Size-bounded LRU store of converted GLB files
+
+    Entries live as <key>.glb files in cache_dir; the index is rebuilt from
+    the directory at startup, oldest access first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.glb")
+
+    def _scan(self):
+        """Rebuild the index from the files already in the cache directory"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.glb'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            found.append((stat.st_atime, name[:-len('.glb')], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def get(self, source_hash, options):
+        """Return the cached output path for a source and options, or None"""
+        key = conversion_key(source_hash, options)
+        with self._lock:
+            if key not in self._entries or not os.path.exists(self._path(key)):
+                self._entries.pop(key, None)
+                self.misses += 1
+                record_cache_lookup('conversion', False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_cache_lookup('conversion', True)
+            return self._path(key)
+
+    def put(self, source_hash, options, output_path):
+        """
+        Move a freshly converted file into the cache and return its cache path
+        The caller should no longer use output_path afterwards
+        """
+        key = conversion_key(source_hash, options)
+        cache_path = self._path(key)
+        size = os.path.getsize(output_path)
+        with self._lock:
+            os.replace(output_path, cache_path)
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.total_bytes += size
+            self._evict()
+        return cache_path
+
+    def _evict(self):
+        """Remove least recently used entries beyond max_bytes (caller holds the lock)"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
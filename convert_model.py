@@ -1,12 +1,17 @@
 #!/usr/bin/env python
 """
 Blender Python script to convert 3D models to GLB format
-To be called from Blender's Python interpreter
+To be called from Blender's Python interpreter, for one file:
+    blender --background --python convert_model.py -- input_file output_file [preserve_animations]
+or for a batch in one Blender session (see batch_convert.py for parallel sessions):
+    blender --background --python convert_model.py -- --batch manifest_or_dir [output_dir] [--results results.jsonl] [--no-animations]
 """
 
 import bpy
 import sys
 import os
+import json
+import time
 
 def clear_scene():
     """Clear the current scene"""
@@ -29,16 +34,15 @@ def clear_scene():
     for block in bpy.data.images:
         if block.users == 0:
             bpy.data.images.remove(block)
+            
+    for block in bpy.data.actions:
+        if block.users == 0:
+            bpy.data.actions.remove(block)
 
-def convert_to_glb(input_path, output_path):
-    """Convert a 3D model to GLB format"""
-    # Clear existing scene
-    clear_scene()
-    
-    # Get file extension
+def import_model(input_path):
+    """Import a model based on its file extension"""
     file_ext = os.path.splitext(input_path)[1].lower()
     
-    # Import based on file type
     if file_ext == '.obj':
         bpy.ops.import_scene.obj(filepath=input_path)
     elif file_ext == '.fbx':
@@ -49,26 +53,110 @@ def convert_to_glb(input_path, output_path):
         bpy.ops.wm.collada_import(filepath=input_path)
     elif file_ext in ['.glb', '.gltf']:
         bpy.ops.import_scene.gltf(filepath=input_path)
+    elif file_ext == '.blend':
+        # For .blend files, we need to append objects from the file
+        with bpy.data.libraries.load(input_path) as (data_from, data_to):
+            data_to.objects = data_from.objects
+        
+        # Link the objects to the scene
+        for obj in data_to.objects:
+            if obj is not None:
+                bpy.context.collection.objects.link(obj)
     else:
         print(f"Unsupported file format: {file_ext}")
-        sys.exit(1)
+        return False
     
-    # Export as GLB
+    return True
+
+def convert_to_glb(input_path, output_path, preserve_animations=True):
+    """
+    Convert a 3D model to GLB format
+    Returns True on success, False if the input format is not supported
+    """
+    # Clear existing scene
+    clear_scene()
+    
+    # Import based on file type
+    if not import_model(input_path):
+        return False
+    
+    # Export as GLB with the specified options
     bpy.ops.export_scene.gltf(
         filepath=output_path,
         export_format='GLB',
         export_texcoords=True,
         export_normals=True,
-        export_materials=True
+        export_materials=True,
+        export_animations=preserve_animations
     )
     
-    print(f"Successfully converted {input_path} to {output_path}")
+    print(f"Successfully converted {input_path} to {output_path} (preserve_animations={preserve_animations})")
+    return True
+
+def convert_batch(entries, results_path=None, preserve_animations=True):
+    """
+    Convert many models in this Blender session
+    Entries are {"input", "output"} dictionaries (optionally with their own
+    "preserve_animations"). A file that fails is recorded and the batch goes
+    on; convert_to_glb clears the scene before each file. With results_path,
+    each result is appended to it as a JSON line as soon as it is known
+    """
+    results = []
+    for entry in entries:
+        start = time.time()
+        result = {"input": entry["input"], "output": entry["output"]}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(entry["output"])), exist_ok=True)
+            if convert_to_glb(entry["input"], entry["output"], entry.get("preserve_animations", preserve_animations)):
+                result["ok"] = True
+                result["size_bytes"] = os.path.getsize(entry["output"])
+            else:
+                result["ok"] = False
+                result["error"] = f"Unsupported file format: {os.path.splitext(entry['input'])[1]}"
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = f"{type(e).__name__}: {str(e)}"
+        result["seconds"] = round(time.time() - start, 3)
+        results.append(result)
+        
+        if results_path:
+            with open(results_path, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+    return results
+
+def run_batch(argv):
+    """Command line batch mode: --batch manifest_or_dir [output_dir] [--results path] [--no-animations]"""
+    # Make batch_convert importable from inside Blender
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from batch_convert import load_batch
+    
+    results_path = None
+    if "--results" in argv:
+        index = argv.index("--results")
+        results_path = argv[index + 1]
+        del argv[index:index + 2]
+    preserve_animations = "--no-animations" not in argv
+    argv = [arg for arg in argv if arg not in ("--batch", "--no-animations")]
+    if not argv:
+        print("Usage: blender --background --python convert_model.py -- --batch manifest_or_dir [output_dir] [--results results.jsonl] [--no-animations]")
+        sys.exit(1)
+    
+    entries = load_batch(argv[0], argv[1] if len(argv) > 1 else None)
+    results = convert_batch(entries, results_path, preserve_animations)
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"Batch converted {len(results) - failed} of {len(results)} models")
+    if not results_path:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     # Get command line arguments passed after "--"
     argv = sys.argv
     argv = argv[argv.index("--") + 1:]  # Get all args after "--"
     
+    if argv and argv[0] == "--batch":
+        run_batch(argv)
+    
     if len(argv) < 2:
         print("Usage: blender --background --python convert_model.py -- input_file output_file [preserve_animations]")
         sys.exit(1)
@@ -81,47 +169,5 @@ if __name__ == "__main__":
     if len(argv) > 2:
         preserve_animations = argv[2].lower() == 'true'
     
-    # Update export options based on animation preservation flag
-    export_options = {
-        'filepath': output_path,
-        'export_format': 'GLB',
-        'export_texcoords': True,
-        'export_normals': True,
-        'export_materials': True,
-        'export_animations': preserve_animations
-    }
-    
-    # Clear the scene
-    clear_scene()
-    
-    # Get file extension
-    file_ext = os.path.splitext(input_path)[1].lower()
-    
-    # Import based on file type
-    if file_ext == '.obj':
-        bpy.ops.import_scene.obj(filepath=input_path)
-    elif file_ext == '.fbx':
-        bpy.ops.import_scene.fbx(filepath=input_path)
-    elif file_ext == '.stl':
-        bpy.ops.import_mesh.stl(filepath=input_path)
-    elif file_ext == '.dae':
-        bpy.ops.wm.collada_import(filepath=input_path)
-    elif file_ext in ['.glb', '.gltf']:
-        bpy.ops.import_scene.gltf(filepath=input_path)
-    elif file_ext == '.blend':
-        # For .blend files, we need to append objects from the file
-        with bpy.data.libraries.load(input_path) as (data_from, data_to):
-            data_to.objects = data_from.objects
-        
-        # Link the objects to the scene
-        for obj in data_to.objects:
-            if obj is not None:
-                bpy.context.collection.objects.link(obj)
-    else:
-        print(f"Unsupported file format: {file_ext}")
+    if not convert_to_glb(input_path, output_path, preserve_animations):
         sys.exit(1)
-    
-    # Export as GLB with the specified options
-    bpy.ops.export_scene.gltf(**export_options)
-    
-    print(f"Successfully converted {input_path} to {output_path} (preserve_animations={preserve_animations})")
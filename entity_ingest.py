@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+"""
+Bulk entity ingest
+Parses NDJSON or packed binary batches of entity updates, validates them
+against the /entities schema (structure per record, numeric ranges
+vectorized across the batch) and applies the valid ones to the entity store
+in a single pass
+"""
+
+import json
+import math
+import struct
+
+import numpy as np
+
+from entity_store import INDICATOR_FLAGS
+from simulation import check_simulation_config
+
+# Binary position/health update frame: header then packed records
+INGEST_FRAME_MAGIC = b'EING'
+INGEST_FRAME_HEADER = struct.Struct('<4sI')  # magic, record count
+INGEST_RECORD = np.dtype([
+    ('entity_id', 'S32'),          # UTF-8, NUL padded
+    ('latitude', '<f8'),           # NaN = position unchanged
+    ('longitude', '<f8'),
+    ('altitude', '<f4'),           # NaN = altitude unchanged
+    ('health_status', 'i1'),       # -1 = unchanged
+    ('reserved', 'V3'),
+])
+
+# Rejections reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+ENTITY_FIELDS = {'entity_id', 'description', 'is_live', 'created_time', 'ontology',
+                 'health', 'location', 'sensors', 'indicators', 'simulation'}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _optional(value, kind):
+    return value is None or isinstance(value, kind)
+
+
+def check_structure(entity):
+    """
+    Structural validation of one entity update
+    Returns an error message or None. Coordinate ranges are checked per batch
+    """
+    if not isinstance(entity, dict):
+        return "record is not an object"
+    entity_id = entity.get('entity_id')
+    if not isinstance(entity_id, str) or not entity_id:
+        return "entity_id must be a non-empty string"
+    unknown = set(entity) - ENTITY_FIELDS
+    if unknown:
+        return f"unknown fields: {', '.join(sorted(unknown))}"
+    if not _optional(entity.get('description'), str) or not _optional(entity.get('created_time'), str):
+        return "description and created_time must be strings"
+    if 'is_live' in entity and not isinstance(entity['is_live'], bool):
+        return "is_live must be a boolean"
+
+    ontology = entity.get('ontology')
+    if ontology is not None:
+        if not isinstance(ontology, dict) or not all(
+                _optional(ontology.get(key), str) for key in ('platform_type', 'specific_type')):
+            return "ontology.platform_type and specific_type must be strings"
+
+    health = entity.get('health')
+    if health is not None:
+        # Statuses are stored as int8; bounding them here also keeps huge
+        # integers away from the NumPy conversions downstream
+        if not isinstance(health, dict) or not all(
+                health.get(key) is None
+                or (isinstance(health[key], int) and not isinstance(health[key], bool) and 0 <= health[key] <= 127)
+                for key in ('health_status', 'connection_status')):
+            return "health statuses must be integers in 0..127"
+
+    location = entity.get('location')
+    if location is not None:
+        position = location.get('position') if isinstance(location, dict) else None
+        if not isinstance(position, dict):
+            return "location.position must be an object"
+        if not _is_number(position.get('latitude_degrees')) or not _is_number(position.get('longitude_degrees')):
+            return "location.position needs numeric latitude_degrees and longitude_degrees"
+        altitude = position.get('altitude_hae_meters')
+        if isinstance(altitude, dict):
+            altitude = altitude.get('__root__')
+        if altitude is not None and not (_is_number(altitude) and math.isfinite(altitude)):
+            return "altitude_hae_meters must be a finite number"
+
+    sensors = entity.get('sensors')
+    if sensors is not None:
+        if not isinstance(sensors, dict) or not isinstance(sensors.get('sensors', []), list):
+            return "sensors.sensors must be a list"
+        for sensor in sensors.get('sensors', []):
+            if not isinstance(sensor, dict) or not isinstance(sensor.get('sensor_id'), str):
+                return "each sensor needs a string sensor_id"
+
+    indicators = entity.get('indicators')
+    if indicators is not None:
+        if not isinstance(indicators, dict) or not all(
+                isinstance(value, bool) and key in INDICATOR_FLAGS for key, value in indicators.items()):
+            return f"indicators must map {', '.join(INDICATOR_FLAGS)} to booleans"
+
+    if entity.get('simulation') is not None:
+        return check_simulation_config(entity['simulation'])
+    return None
+
+
+def check_ranges(entities):
+    """
+    Vectorized numeric range checks over structurally valid entities
+    Returns a list with an error message or None per entity
+    """
+    errors = [None] * len(entities)
+    located = [i for i, entity in enumerate(entities) if entity.get('location')]
+    if located:
+        positions = [entities[i]['location']['position'] for i in located]
+        lat = np.array([p['latitude_degrees'] for p in positions], dtype=np.float64)
+        lon = np.array([p['longitude_degrees'] for p in positions], dtype=np.float64)
+        bad = ~((lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180))
+        for k in np.flatnonzero(bad):
+            errors[located[k]] = "latitude/longitude out of range"
+
+    return errors
+
+
+def _report(total, accepted, errors):
+    return {
+        "received": total,
+        "accepted": accepted,
+        "rejected": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS]
+    }
+
+
+def ingest_ndjson(store, data):
+    """Validate and apply newline-delimited JSON entity updates; returns a report"""
+    errors = []
+    candidates = []
+    lines = [(number, line) for number, line in enumerate(data.splitlines(), start=1) if line.strip()]
+    for number, line in lines:
+        try:
+            entity = json.loads(line)
+        except ValueError as e:
+            errors.append({"line": number, "error": f"invalid JSON: {e}"})
+            continue
+        error = check_structure(entity)
+        if error:
+            errors.append({"line": number, "entity_id": entity.get('entity_id') if isinstance(entity, dict) else None,
+                           "error": error})
+        else:
+            candidates.append((number, entity))
+
+    valid = []
+    for (number, entity), error in zip(candidates, check_ranges([entity for _, entity in candidates])):
+        if error:
+            errors.append({"line": number, "entity_id": entity['entity_id'], "error": error})
+        else:
+            valid.append(entity)
+
+    store.apply_batch(valid)
+    errors.sort(key=lambda error: error["line"])
+    return _report(len(lines), len(valid), errors)
+
+
+def encode_updates(entity_ids, latitudes, longitudes, altitudes=None, health_statuses=None):
+    """Pack position/health updates into a binary ingest frame"""
+    count = len(entity_ids)
+    records = np.zeros(count, dtype=INGEST_RECORD)
+    records['entity_id'] = [entity_id.encode('utf-8') for entity_id in entity_ids]
+    records['latitude'] = latitudes
+    records['longitude'] = longitudes
+    records['altitude'] = np.nan if altitudes is None else altitudes
+    records['health_status'] = -1 if health_statuses is None else health_statuses
+    return INGEST_FRAME_HEADER.pack(INGEST_FRAME_MAGIC, count) + records.tobytes()
+
+
+def ingest_binary(store, data):
+    """
+    Validate and apply a binary frame of position/health updates
+    Binary records only update existing entities; returns a report
+    """
+    if len(data) < INGEST_FRAME_HEADER.size:
+        raise ValueError("Frame too short")
+    magic, count = INGEST_FRAME_HEADER.unpack_from(data)
+    if magic != INGEST_FRAME_MAGIC:
+        raise ValueError("Not an ingest frame")
+    if len(data) != INGEST_FRAME_HEADER.size + count * INGEST_RECORD.itemsize:
+        raise ValueError("Frame length does not match its record count")
+    records = np.frombuffer(data, dtype=INGEST_RECORD, count=count, offset=INGEST_FRAME_HEADER.size)
+
+    lat, lon, alt = records['latitude'], records['longitude'], records['altitude']
+    health = records['health_status']
+    moves = ~np.isnan(lat) | ~np.isnan(lon)
+    # NaN altitude means unchanged; infinities are never valid
+    bad_position = (moves & ~((lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180))) | np.isinf(alt)
+    bad_health = health < -1
+    entity_ids = [raw.decode('utf-8', errors='replace') for raw in records['entity_id'].tolist()]
+
+    with store.lock:
+        rows = np.array([store.row_of(entity_id) if entity_id in store else -1 for entity_id in entity_ids],
+                        dtype=np.int64)
+        unknown = rows < 0
+        rejected = bad_position | bad_health | unknown
+        errors = [
+            {
+                "record": int(i),
+                "entity_id": entity_ids[i],
+                "error": ("position out of range" if bad_position[i]
+                          else "health_status out of range" if bad_health[i] else "unknown entity")
+            }
+            for i in np.flatnonzero(rejected)
+        ]
+
+        valid = ~rejected
+        position_updates = valid & moves
+        if position_updates.any():
+            target = rows[position_updates]
+            altitudes = alt[position_updates].astype(np.float64)
+            altitudes = np.where(np.isnan(altitudes), store.columns['altitude'][target], altitudes)
+            store.move_rows(target, lat[position_updates], lon[position_updates], altitudes)
+        health_updates = valid & (health >= 0)
+        if health_updates.any():
+            store.set_health_rows(rows[health_updates], health[health_updates])
+
+    return _report(count, int(valid.sum()), errors)
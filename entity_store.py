@@ -0,0 +1,560 @@
+#!/usr/bin/env python
+"""
+Columnar in-memory entity store
+Entity state lives in NumPy column arrays indexed by row, with secondary
+indexes on platform type, health status and indicator flags and a spatial
+grid on positions, so filtered, paginated and geographic queries cost time
+proportional to the result rather than the store
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from spatial_index import (
+    DEFAULT_CELL_DEGREES, EARTH_RADIUS_METERS, METERS_PER_DEGREE, GeoGrid, SortedRows,
+    haversine_meters, in_bbox, radius_bbox
+)
+
+INDICATOR_FLAGS = ('simulated', 'exercise', 'emergency')
+
+# Sentinel for missing small-integer fields (health and connection status)
+MISSING = -1
+
+INITIAL_CAPACITY = 1024
+
+
+def _last_occurrences(rows):
+    """Indices keeping the last occurrence of each repeated row, or None if rows are unique"""
+    unique, first_reversed = np.unique(rows[::-1], return_index=True)
+    if len(unique) == len(rows):
+        return None
+    return np.sort(len(rows) - 1 - first_reversed)
+
+
+def project(entity, fields):
+    """
+    Keep only the given dotted field paths of an entity dict
+    entity_id is always kept
+    """
+    result = {"entity_id": entity["entity_id"]}
+    for field in fields:
+        parts = field.split('.')
+        value = entity
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = result
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return result
+
+
+class EntityStore:
+    """
+    Entity state in column arrays, one row per entity
+
+    Rows are assigned in insertion order and never reused, so a row number is
+    a stable pagination cursor. Removed entities leave a dead row behind.
+    Every write bumps `sequence` and stamps the rows it touched, so readers
+    can ask for what changed since a sequence number. Nested fields that are never filtered on (sensors, unknown extras) are
+    kept in plain object lists.
+    """
+
+    NUMERIC_COLUMNS = {
+        'alive': np.bool_,
+        'is_live': np.bool_,
+        'platform_type': np.int32,
+        'specific_type': np.int32,
+        'health_status': np.int8,
+        'connection_status': np.int8,
+        'has_location': np.bool_,
+        'latitude': np.float64,
+        'longitude': np.float64,
+        'altitude': np.float64,
+        'indicators': np.uint8,
+        # Store sequence numbers of the last state and position change
+        'state_version': np.int64,
+        'position_version': np.int64,
+    }
+
+    def __init__(self, capacity=INITIAL_CAPACITY, cell_degrees=DEFAULT_CELL_DEGREES):
+        self._lock = threading.RLock()
+        self._count = 0
+        self._capacity = capacity
+        self.sequence = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.NUMERIC_COLUMNS.items()}
+        self.entity_ids = []
+        self.descriptions = []
+        self.created_times = []
+        self.sensors = []
+        self.extras = []
+        self._rows = {}
+
+        # Dictionary encoding of string-valued columns
+        self._codes = {'platform_type': {}, 'specific_type': {}}
+        self._values = {'platform_type': [], 'specific_type': []}
+
+        self.indexes = {
+            'platform_type': {},
+            'health_status': {},
+            'indicators': {flag: SortedRows() for flag in INDICATOR_FLAGS}
+        }
+        self.spatial = GeoGrid(cell_degrees)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._rows
+
+    @property
+    def row_count(self):
+        """Rows in use, including dead rows of removed entities"""
+        return self._count
+
+    @property
+    def lock(self):
+        return self._lock
+
+    def _encode(self, column, value):
+        if value is None:
+            return MISSING
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(self._values[column])
+            self._values[column].append(value)
+        return codes[value]
+
+    def _decode(self, column, code):
+        return None if code == MISSING else self._values[column][code]
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, data in self.columns.items():
+            grown = np.zeros(self._capacity, dtype=data.dtype)
+            grown[:len(data)] = data
+            self.columns[name] = grown
+
+    def _index_row(self, row, add):
+        """Add or remove a row from every secondary index using its current column values"""
+        c = self.columns
+        platform = int(c['platform_type'][row])
+        health = int(c['health_status'][row])
+        keyed = (('platform_type', platform), ('health_status', health))
+        for name, key in keyed:
+            if add:
+                self.indexes[name].setdefault(key, SortedRows()).add(row)
+            elif key in self.indexes[name]:
+                self.indexes[name][key].discard(row)
+        flags = int(c['indicators'][row])
+        for bit, flag in enumerate(INDICATOR_FLAGS):
+            if flags & (1 << bit):
+                if add:
+                    self.indexes['indicators'][flag].add(row)
+                else:
+                    self.indexes['indicators'][flag].discard(row)
+        if c['has_location'][row]:
+            lat, lon = float(c['latitude'][row]), float(c['longitude'][row])
+            if add:
+                self.spatial.add(row, lat, lon)
+            else:
+                self.spatial.discard(row, lat, lon)
+
+    def upsert(self, entity, merge=False):
+        """
+        Insert or replace an entity given in the /entities JSON shape
+        With merge, top-level fields missing from `entity` keep their stored
+        values. Returns its row; raises ValueError if it has no entity_id
+        """
+        entity_id = entity.get('entity_id') if isinstance(entity, dict) else None
+        if not entity_id:
+            raise ValueError("Entity must have an entity_id")
+
+        with self._lock:
+            row = self._rows.get(entity_id)
+            if row is not None and merge:
+                entity = {**self.entity(row), **entity}
+            if row is None:
+                if self._count == self._capacity:
+                    self._grow()
+                row = self._count
+                self._count += 1
+                self._rows[entity_id] = row
+                self.entity_ids.append(entity_id)
+                self.descriptions.append(None)
+                self.created_times.append(None)
+                self.sensors.append(None)
+                self.extras.append(None)
+            else:
+                self._index_row(row, add=False)
+
+            self._write_row(row, entity)
+            self._index_row(row, add=True)
+            self.sequence += 1
+            self.columns['state_version'][row] = self.columns['position_version'][row] = self.sequence
+            return row
+
+    def _write_row(self, row, entity):
+        c = self.columns
+        ontology = entity.get('ontology') or {}
+        health = entity.get('health') or {}
+        indicators = entity.get('indicators') or {}
+        position = (entity.get('location') or {}).get('position') or {}
+        altitude = position.get('altitude_hae_meters')
+        if isinstance(altitude, dict):
+            altitude = altitude.get('__root__')
+
+        c['alive'][row] = True
+        c['is_live'][row] = bool(entity.get('is_live', False))
+        c['platform_type'][row] = self._encode('platform_type', ontology.get('platform_type'))
+        c['specific_type'][row] = self._encode('specific_type', ontology.get('specific_type'))
+        c['health_status'][row] = MISSING if health.get('health_status') is None else health['health_status']
+        c['connection_status'][row] = MISSING if health.get('connection_status') is None else health['connection_status']
+        c['has_location'][row] = 'latitude_degrees' in position and 'longitude_degrees' in position
+        c['latitude'][row] = position.get('latitude_degrees', np.nan)
+        c['longitude'][row] = position.get('longitude_degrees', np.nan)
+        c['altitude'][row] = np.nan if altitude is None else altitude
+        c['indicators'][row] = sum(1 << bit for bit, flag in enumerate(INDICATOR_FLAGS) if indicators.get(flag))
+
+        self.descriptions[row] = entity.get('description')
+        self.created_times[row] = entity.get('created_time')
+        self.sensors[row] = entity.get('sensors')
+        known = {'entity_id', 'description', 'is_live', 'created_time', 'ontology',
+                 'health', 'location', 'sensors', 'indicators'}
+        extras = {key: value for key, value in entity.items() if key not in known}
+        self.extras[row] = extras or None
+
+    def remove(self, entity_id):
+        """Remove an entity; returns False if it was not present"""
+        with self._lock:
+            row = self._rows.pop(entity_id, None)
+            if row is None:
+                return False
+            self._index_row(row, add=False)
+            self.columns['alive'][row] = False
+            self.sensors[row] = self.extras[row] = None
+            self.sequence += 1
+            self.columns['state_version'][row] = self.sequence
+            return True
+
+    def row_of(self, entity_id):
+        return self._rows.get(entity_id)
+
+    def move_rows(self, rows, latitudes, longitudes, altitudes=None):
+        """
+        Vectorized position update of live rows
+        Only rows whose grid cell changed touch the spatial index
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        if altitudes is not None:
+            altitudes = np.broadcast_to(np.asarray(altitudes, dtype=np.float64), rows.shape)
+        keep = _last_occurrences(rows)
+        if keep is not None:
+            rows, latitudes, longitudes = rows[keep], latitudes[keep], longitudes[keep]
+            altitudes = None if altitudes is None else altitudes[keep]
+        with self._lock:
+            c = self.columns
+            # Rows removed since the caller selected them must not come back,
+            # and non-finite coordinates cannot be placed in the spatial grid
+            live = c['alive'][rows] & np.isfinite(latitudes) & np.isfinite(longitudes)
+            if not live.all():
+                rows, latitudes, longitudes = rows[live], latitudes[live], longitudes[live]
+                altitudes = None if altitudes is None else altitudes[live]
+            had_location = c['has_location'][rows]
+            old_cells = self.spatial.cells_of(c['latitude'][rows], c['longitude'][rows])
+            new_cells = self.spatial.cells_of(latitudes, longitudes)
+            moved_cell = ~had_location | (old_cells != new_cells)
+            for i in np.flatnonzero(moved_cell):
+                row = int(rows[i])
+                if had_location[i]:
+                    self.spatial.discard(row, float(c['latitude'][row]), float(c['longitude'][row]))
+                self.spatial.add(row, float(latitudes[i]), float(longitudes[i]))
+
+            c['latitude'][rows] = latitudes
+            c['longitude'][rows] = longitudes
+            if altitudes is not None:
+                c['altitude'][rows] = altitudes
+            c['has_location'][rows] = True
+            self.sequence += 1
+            c['position_version'][rows] = self.sequence
+
+    def set_health_rows(self, rows, health_statuses):
+        """Vectorized health_status update; only rows whose status changes are reindexed"""
+        rows = np.asarray(rows, dtype=np.int64)
+        health_statuses = np.asarray(health_statuses, dtype=np.int8)
+        keep = _last_occurrences(rows)
+        if keep is not None:
+            rows, health_statuses = rows[keep], health_statuses[keep]
+        with self._lock:
+            c = self.columns
+            changed = c['health_status'][rows] != health_statuses
+            rows, health_statuses = rows[changed], health_statuses[changed]
+            if not len(rows):
+                return
+            for row, old in zip(rows.tolist(), c['health_status'][rows].tolist()):
+                index = self.indexes['health_status'].get(old)
+                if index is not None:
+                    index.discard(row)
+            c['health_status'][rows] = health_statuses
+            for row, new in zip(rows.tolist(), health_statuses.tolist()):
+                self.indexes['health_status'].setdefault(new, SortedRows()).add(row)
+            self.sequence += 1
+            c['state_version'][rows] = self.sequence
+
+    def apply_batch(self, entities):
+        """
+        Merge a batch of entity updates under one lock acquisition
+
+        Updates of existing entities that carry only a position are applied
+        together through move_rows (keeping the stored altitude when none is
+        given); everything else is merged with upsert. Returns the number of
+        entities applied.
+        """
+        with self._lock:
+            pending = {}
+
+            def flush():
+                if pending:
+                    rows = np.fromiter(pending, dtype=np.int64, count=len(pending))
+                    values = np.array(list(pending.values()), dtype=np.float64)
+                    altitudes = np.where(np.isnan(values[:, 2]), self.columns['altitude'][rows], values[:, 2])
+                    self.move_rows(rows, values[:, 0], values[:, 1], altitudes)
+                    pending.clear()
+
+            for entity in entities:
+                row = self._rows.get(entity['entity_id'])
+                position = (entity.get('location') or {}).get('position') or {}
+                if (row is not None and len(entity) == 2 and 'location' in entity
+                        and 'latitude_degrees' in position and 'longitude_degrees' in position):
+                    altitude = position.get('altitude_hae_meters')
+                    if isinstance(altitude, dict):
+                        altitude = altitude.get('__root__')
+                    pending[row] = (position['latitude_degrees'], position['longitude_degrees'],
+                                    np.nan if altitude is None else altitude)
+                else:
+                    if row in pending:
+                        flush()
+                    self.upsert(entity, merge=True)
+            flush()
+            return len(entities)
+
+    def changed_rows(self, since):
+        """
+        Rows written after sequence `since`, and whether each had a state
+        change (anything beyond its position, including removal)
+        """
+        with self._lock:
+            c = self.columns
+            state = c['state_version'][:self._count] > since
+            position = c['position_version'][:self._count] > since
+            rows = np.flatnonzero(state | position)
+            return rows, state[rows]
+
+    def get(self, entity_id):
+        with self._lock:
+            row = self._rows.get(entity_id)
+            return None if row is None else self.entity(row)
+
+    def entity(self, row):
+        """Rebuild the JSON shape of the entity stored at a row"""
+        c = self.columns
+        location = None
+        if c['has_location'][row]:
+            altitude = float(c['altitude'][row])
+            location = {
+                "position": {
+                    "latitude_degrees": float(c['latitude'][row]),
+                    "longitude_degrees": float(c['longitude'][row]),
+                    "altitude_hae_meters": None if np.isnan(altitude) else {"__root__": altitude}
+                }
+            }
+        health_status = int(c['health_status'][row])
+        connection_status = int(c['connection_status'][row])
+        flags = int(c['indicators'][row])
+        entity = {
+            "entity_id": self.entity_ids[row],
+            "description": self.descriptions[row],
+            "is_live": bool(c['is_live'][row]),
+            "created_time": self.created_times[row],
+            "ontology": {
+                "platform_type": self._decode('platform_type', int(c['platform_type'][row])),
+                "specific_type": self._decode('specific_type', int(c['specific_type'][row]))
+            },
+            "health": {
+                "health_status": None if health_status == MISSING else health_status,
+                "connection_status": None if connection_status == MISSING else connection_status
+            },
+            "location": location,
+            "sensors": self.sensors[row],
+            "indicators": {flag: bool(flags & (1 << bit)) for bit, flag in enumerate(INDICATOR_FLAGS)}
+        }
+        if self.extras[row]:
+            entity.update(self.extras[row])
+        return entity
+
+    def filter_mask(self, rows, filters):
+        """Vectorized check of every filter for a chunk of candidate rows"""
+        c = self.columns
+        mask = c['alive'][rows]
+        if filters.get('platform_codes') is not None:
+            mask &= np.isin(c['platform_type'][rows], filters['platform_codes'])
+        if filters.get('health_statuses') is not None:
+            mask &= np.isin(c['health_status'][rows], filters['health_statuses'])
+        if filters.get('is_live') is not None:
+            mask &= c['is_live'][rows] == filters['is_live']
+        for flag, wanted in (filters.get('indicators') or {}).items():
+            bit = 1 << INDICATOR_FLAGS.index(flag)
+            mask &= ((c['indicators'][rows] & bit) != 0) == wanted
+        if filters.get('bbox') is not None:
+            mask &= c['has_location'][rows] & in_bbox(c['latitude'][rows], c['longitude'][rows], filters['bbox'])
+        if filters.get('altitude_range') is not None:
+            low, high = filters['altitude_range']
+            altitude = c['altitude'][rows]
+            if low is not None:
+                mask &= altitude >= low
+            if high is not None:
+                mask &= altitude <= high
+        return mask
+
+    def _candidates(self, filters):
+        """Smallest sorted row array that covers the filters, or None to scan every row"""
+        options = []
+        if filters.get('platform_codes') is not None:
+            options.append([self.indexes['platform_type'].get(code) for code in filters['platform_codes']])
+        if filters.get('health_statuses') is not None:
+            options.append([self.indexes['health_status'].get(status) for status in filters['health_statuses']])
+        for flag, wanted in (filters.get('indicators') or {}).items():
+            if wanted:
+                options.append([self.indexes['indicators'][flag]])
+
+        best = None
+        if options:
+            indexes = min(options, key=lambda indexes: sum(len(index) for index in indexes if index))
+            arrays = [index.rows() for index in indexes if index is not None and len(index)]
+            if not arrays:
+                return np.empty(0, dtype=np.int64)
+            best = arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+        if filters.get('bbox') is not None:
+            spatial = self.spatial.rows_in_bbox(filters['bbox'])
+            if best is None or len(spatial) < len(best):
+                best = spatial
+        return best
+
+    def compile_filters(self, platform_types=None, health_statuses=None, indicators=None, is_live=None,
+                        bbox=None, altitude_range=None):
+        """Resolve query filters (see query) into the form filter_mask expects"""
+        unknown = set(indicators or {}) - set(INDICATOR_FLAGS)
+        if unknown:
+            raise ValueError(f"Unknown indicator flags: {', '.join(sorted(unknown))}")
+        platform_codes = None
+        if platform_types is not None:
+            codes = self._codes['platform_type']
+            platform_codes = [codes[value] for value in platform_types if value in codes]
+        return {
+            'platform_codes': platform_codes,
+            'health_statuses': health_statuses,
+            'indicators': indicators,
+            'is_live': is_live,
+            'bbox': bbox,
+            'altitude_range': altitude_range if altitude_range and altitude_range != (None, None) else None
+        }
+
+    def select_rows(self, filters):
+        """Every row matching compiled filters, in row order"""
+        with self._lock:
+            candidates = self._candidates(filters)
+            if candidates is None:
+                candidates = np.arange(self._count)
+            return candidates[self.filter_mask(candidates, filters)]
+
+    def query(self, fields=None, cursor=None, limit=100, **filters):
+        """
+        Filtered, projected page of entities in row order
+
+        Filters: platform_types / health_statuses match any of the given
+        values, indicators maps flag names to required booleans, is_live,
+        bbox is (west, south, east, north) in degrees and altitude_range is
+        (low, high) meters HAE with None for an open end. cursor is the row
+        of the last entity of the previous page. Returns (entities,
+        next_cursor), next_cursor being None on the last page.
+        """
+        with self._lock:
+            filters = self.compile_filters(**filters)
+            start = 0 if cursor is None else cursor + 1
+
+            candidates = self._candidates(filters)
+            if candidates is None:
+                position, end = start, self._count
+            else:
+                position, end = int(np.searchsorted(candidates, start)), len(candidates)
+
+            chunk_size = max(2 * limit, 256)
+            found = []
+            more = False
+            while position < end:
+                chunk_end = min(position + chunk_size, end)
+                rows = np.arange(position, chunk_end) if candidates is None else candidates[position:chunk_end]
+                matched = rows[self.filter_mask(rows, filters)]
+                room = limit - len(found)
+                found.extend(int(row) for row in matched[:room])
+                position = chunk_end
+                if len(found) == limit:
+                    # More may follow if this chunk overflowed or rows remain unscanned
+                    more = len(matched) > room or position < end
+                    break
+
+            next_cursor = found[-1] if more else None
+            entities = [self.entity(row) for row in found]
+
+        if fields:
+            entities = [project(entity, fields) for entity in entities]
+        return entities, next_cursor
+
+    def _within(self, lat, lon, radius_meters, filters):
+        """Rows within a great-circle radius and their distances, nearest first"""
+        filters = dict(filters, bbox=radius_bbox(lat, lon, radius_meters))
+        rows = self._candidates(filters)
+        rows = rows[self.filter_mask(rows, filters)]
+        distances = haversine_meters(lat, lon, self.columns['latitude'][rows], self.columns['longitude'][rows])
+        inside = distances <= radius_meters
+        rows, distances = rows[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
+
+    def _with_distances(self, rows, distances, fields):
+        entities = []
+        for row, distance in zip(rows, distances):
+            entity = self.entity(int(row))
+            if fields:
+                entity = project(entity, fields)
+            entity["distance_meters"] = float(distance)
+            entities.append(entity)
+        return entities
+
+    def within_radius(self, lat, lon, radius_meters, fields=None, limit=100, **filters):
+        """Entities within radius_meters of a point, nearest first, each with distance_meters"""
+        with self._lock:
+            rows, distances = self._within(lat, lon, radius_meters, self.compile_filters(**filters))
+            return self._with_distances(rows[:limit], distances[:limit], fields)
+
+    def nearest(self, lat, lon, k=10, fields=None, **filters):
+        """
+        The k entities nearest to a point, each with distance_meters
+        The search radius doubles from one grid cell until k matches are found
+        """
+        with self._lock:
+            filters = self.compile_filters(**filters)
+            radius = self.spatial.cell_degrees * METERS_PER_DEGREE
+            while True:
+                rows, distances = self._within(lat, lon, radius, filters)
+                if len(rows) >= k or radius >= math.pi * EARTH_RADIUS_METERS:
+                    break
+                radius *= 2
+            return self._with_distances(rows[:k], distances[:k], fields)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Live entity subscriptions
+A subscription sends a snapshot of the entities matching its filters, then
+deltas computed from the store's change sequence: full entities for state
+changes, compact binary frames for position-only changes, and removals for
+entities that left the subscription
+"""
+
+import struct
+
+import numpy as np
+
+from entity_store import project
+
+# Binary position frame: header then one packed record per entity
+POSITION_FRAME_MAGIC = b'EPOS'
+POSITION_FRAME_HEADER = struct.Struct('<4sIQ')  # magic, record count, store sequence
+POSITION_RECORD = np.dtype([
+    ('row', '<u4'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('altitude', '<f4'),
+])
+
+# Entities per snapshot message
+SNAPSHOT_CHUNK = 1000
+
+
+def encode_positions(sequence, rows, latitudes, longitudes, altitudes):
+    """Pack row positions into a binary frame (altitude NaN when unknown)"""
+    records = np.empty(len(rows), dtype=POSITION_RECORD)
+    records['row'] = rows
+    records['latitude'] = latitudes
+    records['longitude'] = longitudes
+    records['altitude'] = altitudes
+    return POSITION_FRAME_HEADER.pack(POSITION_FRAME_MAGIC, len(rows), sequence) + records.tobytes()
+
+
+def decode_positions(frame):
+    """Unpack a binary position frame into (sequence, records)"""
+    magic, count, sequence = POSITION_FRAME_HEADER.unpack_from(frame)
+    if magic != POSITION_FRAME_MAGIC:
+        raise ValueError("Not a position frame")
+    records = np.frombuffer(frame, dtype=POSITION_RECORD, count=count, offset=POSITION_FRAME_HEADER.size)
+    return sequence, records
+
+
+class EntitySubscription:
+    """
+    One client's view of the entity store
+
+    poll() always diffs against the store's current state rather than
+    queueing per-tick messages, so a consumer that falls behind receives
+    one conflated delta covering everything it missed.
+    """
+
+    def __init__(self, store, filters=None, fields=None):
+        self.store = store
+        self.filters = store.compile_filters(**(filters or {}))
+        self.fields = fields
+        self.sequence = 0
+        self.known = np.zeros(0, dtype=bool)
+
+    def _entities(self, rows):
+        entities = [self.store.entity(int(row)) for row in rows]
+        if self.fields:
+            entities = [project(entity, self.fields) for entity in entities]
+        return entities
+
+    def _mark_known(self, rows, value):
+        if len(rows) and rows.max() >= len(self.known):
+            grown = np.zeros(max(int(rows.max()) + 1, 2 * len(self.known)), dtype=bool)
+            grown[:len(self.known)] = self.known
+            self.known = grown
+        self.known[rows] = value
+
+    def _is_known(self, rows):
+        known = np.zeros(len(rows), dtype=bool)
+        inside = rows < len(self.known)
+        known[inside] = self.known[rows[inside]]
+        return known
+
+    def snapshot(self):
+        """Messages describing every matching entity, ending with snapshot_end"""
+        with self.store.lock:
+            self.sequence = self.store.sequence
+            rows = self.store.select_rows(self.filters)
+            self.known = np.zeros(self.store.row_count, dtype=bool)
+            self._mark_known(rows, True)
+            messages = [
+                {
+                    "type": "snapshot",
+                    "sequence": self.sequence,
+                    "rows": rows[start:start + SNAPSHOT_CHUNK].tolist(),
+                    "entities": self._entities(rows[start:start + SNAPSHOT_CHUNK])
+                }
+                for start in range(0, len(rows), SNAPSHOT_CHUNK)
+            ]
+        messages.append({"type": "snapshot_end", "sequence": self.sequence, "count": int(len(rows))})
+        return messages
+
+    def poll(self):
+        """
+        Delta messages since the last snapshot or poll: "remove" (JSON),
+        "upsert" (JSON, full entities) and position frames (bytes)
+        """
+        with self.store.lock:
+            sequence = self.store.sequence
+            if sequence == self.sequence:
+                return []
+            rows, state_changed = self.store.changed_rows(self.sequence)
+            matches = self.store.filter_mask(rows, self.filters)
+            known = self._is_known(rows)
+
+            exits = rows[known & ~matches]
+            upserts = rows[matches & (state_changed | ~known)]
+            moves = rows[matches & known & ~state_changed]
+
+            messages = []
+            if len(exits):
+                messages.append({
+                    "type": "remove",
+                    "sequence": sequence,
+                    "entity_ids": [self.store.entity_ids[row] for row in exits]
+                })
+            if len(upserts):
+                messages.append({
+                    "type": "upsert",
+                    "sequence": sequence,
+                    "rows": upserts.tolist(),
+                    "entities": self._entities(upserts)
+                })
+            if len(moves):
+                c = self.store.columns
+                messages.append(encode_positions(
+                    sequence, moves, c['latitude'][moves], c['longitude'][moves], c['altitude'][moves]
+                ))
+
+            self._mark_known(exits, False)
+            self._mark_known(upserts, True)
+            self.sequence = sequence
+        return messages
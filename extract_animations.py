@@ -30,9 +30,13 @@ def clear_scene():
     for block in bpy.data.images:
         if block.users == 0:
             bpy.data.images.remove(block)
+            
+    for block in bpy.data.actions:
+        if block.users == 0:
+            bpy.data.actions.remove(block)
 
-def extract_animation_info(model_path, output_json_path):
-    """Extract animation information from a model and save it to a JSON file"""
+def get_animation_info(model_path):
+    """Import a model and return its animation information as a dictionary"""
     # Clear existing scene
     clear_scene()
     
@@ -41,13 +45,10 @@ def extract_animation_info(model_path, output_json_path):
     
     # Only GLB/GLTF files are supported for animation extraction
     if file_ext not in ['.glb', '.gltf']:
-        result = {
+        return {
             "supports_animation": False,
             "animations": []
         }
-        with open(output_json_path, 'w') as f:
-            json.dump(result, f)
-        return
     
     # Import the model
     bpy.ops.import_scene.gltf(filepath=model_path)
@@ -84,10 +85,14 @@ def extract_animation_info(model_path, output_json_path):
             })
     
     # Prepare the result
-    result = {
+    return {
         "supports_animation": True,
         "animations": animations
     }
+
+def extract_animation_info(model_path, output_json_path):
+    """Extract animation information from a model and save it to a JSON file"""
+    result = get_animation_info(model_path)
     
     # Save the result to a JSON file
     with open(output_json_path, 'w') as f:
@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+"""
+Pure-Python GLB combiner
+Merges several GLB files into one by re-indexing their glTF documents and
+concatenating their binary chunks, without a Blender import/export round trip.
+An input repeated several times is stored once and its copies share its
+meshes (or become EXT_mesh_gpu_instancing nodes)
+"""
+
+import os
+import copy
+import math
+
+import numpy as np
+
+from glb_reader import GLBFile, GLBError
+from glb_writer import BinaryBuilder, write_glb
+from model_serving import content_hash
+from model_stats import node_matrix, world_matrices
+
+# Top-level glTF arrays that are concatenated across inputs
+MERGED_ARRAYS = [
+    'accessors', 'bufferViews', 'images', 'samplers', 'textures', 'materials',
+    'meshes', 'nodes', 'skins', 'cameras', 'animations'
+]
+
+# Inputs are placed in the combined BIN chunk at this alignment so every
+# bufferView keeps the alignment it had in its source file
+INPUT_ALIGNMENT = 8
+
+# Tolerance for treating a composed instance transform as rotation and scale only
+SHEAR_TOLERANCE = 1e-5
+
+
+def euler_to_quaternion(rotation):
+    """Convert Blender XYZ Euler angles in degrees (X applied first, about fixed axes) to an [x, y, z, w] quaternion"""
+    x, y, z = (math.radians(angle) / 2 for angle in rotation)
+    cx, sx = math.cos(x), math.sin(x)
+    cy, sy = math.cos(y), math.sin(y)
+    cz, sz = math.cos(z), math.sin(z)
+    # q = qz * qy * qx
+    return [
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+        cx * cy * cz + sx * sy * sz
+    ]
+
+
+def transform_to_trs(data):
+    """
+    Convert a position/rotation/scale entry from /combine_models into glTF node TRS
+    Entries are in Blender's Z-up axes, as the Blender combine applies them;
+    they are mapped to glTF's Y-up axes (x, z, -y) the way Blender's
+    exporter maps the result, so both paths place models alike
+    """
+    trs = {}
+    if not data:
+        return trs
+
+    if "position" in data and len(data["position"]) == 3:
+        x, y, z = (float(v) for v in data["position"])
+        trs["translation"] = [x, z, -y]
+
+    if "rotation" in data and len(data["rotation"]) == 3:
+        qx, qy, qz, qw = euler_to_quaternion(data["rotation"])
+        trs["rotation"] = [qx, qz, -qy, qw]
+
+    if "scale" in data:
+        if isinstance(data["scale"], list) and len(data["scale"]) == 3:
+            x, y, z = (float(v) for v in data["scale"])
+            trs["scale"] = [x, z, y]
+        elif isinstance(data["scale"], (int, float)):
+            trs["scale"] = [float(data["scale"])] * 3
+
+    return trs
+
+
+def matrix_to_trs(matrix):
+    """
+    Translation, [x, y, z, w] rotation and scale of a 4x4 affine matrix
+    Returns None when the matrix has shear or a zero scale, which TRS cannot express
+    """
+    linear = np.array(matrix[:3, :3], dtype=np.float64)
+    scale = np.linalg.norm(linear, axis=0)
+    if np.any(scale < 1e-12):
+        return None
+    rotation = linear / scale
+    if np.linalg.det(rotation) < 0:
+        # A mirror is carried by a negative scale
+        scale[0] = -scale[0]
+        rotation[:, 0] = -rotation[:, 0]
+    if not np.allclose(rotation.T @ rotation, np.eye(3), atol=SHEAR_TOLERANCE):
+        return None
+
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = rotation
+    trace = m00 + m11 + m22
+    if trace > 0:
+        s = math.sqrt(trace + 1.0) * 2
+        quaternion = [(m21 - m12) / s, (m02 - m20) / s, (m10 - m01) / s, 0.25 * s]
+    elif m00 > m11 and m00 > m22:
+        s = math.sqrt(1.0 + m00 - m11 - m22) * 2
+        quaternion = [0.25 * s, (m01 + m10) / s, (m02 + m20) / s, (m21 - m12) / s]
+    elif m11 > m22:
+        s = math.sqrt(1.0 + m11 - m00 - m22) * 2
+        quaternion = [(m01 + m10) / s, 0.25 * s, (m12 + m21) / s, (m02 - m20) / s]
+    else:
+        s = math.sqrt(1.0 + m22 - m00 - m11) * 2
+        quaternion = [(m02 + m20) / s, (m12 + m21) / s, 0.25 * s, (m10 - m01) / s]
+    return matrix[:3, 3].tolist(), quaternion, scale.tolist()
+
+
+def instanceable(doc):
+    """
+    Whether copies of a document can be drawn with EXT_mesh_gpu_instancing
+    Only static meshes qualify: no animations, skins, cameras, lights,
+    morph weights or instancing of its own
+    """
+    if doc.get('animations') or doc.get('skins'):
+        return False
+    for node in doc.get('nodes', []):
+        if 'camera' in node or 'weights' in node or node.get('extensions'):
+            return False
+    return any('mesh' in node for node in doc.get('nodes', []))
+
+
+def _remap_texture_refs(value, texture_offset):
+    """Shift every texture index found under a *Texture key of a material"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key.endswith('Texture') and isinstance(item, dict) and 'index' in item:
+                item['index'] += texture_offset
+            _remap_texture_refs(item, texture_offset)
+    elif isinstance(value, list):
+        for item in value:
+            _remap_texture_refs(item, texture_offset)
+
+
+class GLTFMerger:
+    """
+    Accumulates glTF documents into one combined document
+
+    add_document() appends a document's arrays with every index shifted by the
+    current array lengths; binary data is referenced, not copied.
+    """
+
+    def __init__(self):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "HolographicViewer glb_combine"},
+            "scene": 0,
+            "scenes": [{"nodes": []}]
+        }
+        self.binary = BinaryBuilder()
+        self.extensions_used = set()
+        self.extensions_required = set()
+        self.lights = []
+
+    def _array(self, name):
+        return self.gltf.setdefault(name, [])
+
+    def offsets(self):
+        """Current length of every merged array: where the next document's items start"""
+        offsets = {name: len(self.gltf.get(name, [])) for name in MERGED_ARRAYS}
+        offsets['lights'] = len(self.lights)
+        return offsets
+
+    def add_document(self, doc, bin_data, with_nodes=True):
+        """
+        Merge a glTF document whose single buffer is bin_data
+        Returns the remapped root node indices of its default scene. Without
+        with_nodes only its data (meshes, materials, ...) is merged, for
+        documents whose copies are all drawn as instances
+        """
+        for buffer in doc.get('buffers', []):
+            if 'uri' in buffer:
+                raise GLBError("External or data-URI buffers are not supported")
+        if len(doc.get('buffers', [])) > 1:
+            raise GLBError("Multiple buffers are not supported")
+
+        doc = copy.deepcopy(doc)
+        offsets = self.offsets()
+        bin_offset = self.binary.add(bin_data, INPUT_ALIGNMENT) if len(bin_data) else 0
+
+        for view in doc.get('bufferViews', []):
+            view['buffer'] = 0
+            view['byteOffset'] = view.get('byteOffset', 0) + bin_offset
+
+        for accessor in doc.get('accessors', []):
+            if 'bufferView' in accessor:
+                accessor['bufferView'] += offsets['bufferViews']
+            sparse = accessor.get('sparse')
+            if sparse:
+                sparse['indices']['bufferView'] += offsets['bufferViews']
+                sparse['values']['bufferView'] += offsets['bufferViews']
+
+        for image in doc.get('images', []):
+            if 'bufferView' in image:
+                image['bufferView'] += offsets['bufferViews']
+
+        for texture in doc.get('textures', []):
+            if 'sampler' in texture:
+                texture['sampler'] += offsets['samplers']
+            if 'source' in texture:
+                texture['source'] += offsets['images']
+            for extension in texture.get('extensions', {}).values():
+                if 'source' in extension:
+                    extension['source'] += offsets['images']
+
+        for material in doc.get('materials', []):
+            _remap_texture_refs(material, offsets['textures'])
+
+        for mesh in doc.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                attributes = primitive.get('attributes', {})
+                for name in attributes:
+                    attributes[name] += offsets['accessors']
+                if 'indices' in primitive:
+                    primitive['indices'] += offsets['accessors']
+                if 'material' in primitive:
+                    primitive['material'] += offsets['materials']
+                for target in primitive.get('targets', []):
+                    for name in target:
+                        target[name] += offsets['accessors']
+                draco = primitive.get('extensions', {}).get('KHR_draco_mesh_compression')
+                if draco:
+                    draco['bufferView'] += offsets['bufferViews']
+
+        if not with_nodes:
+            for name in ('nodes', 'skins', 'animations'):
+                doc.pop(name, None)
+        self._remap_scene_graph(doc, offsets)
+
+        for name in MERGED_ARRAYS:
+            if doc.get(name):
+                self._array(name).extend(doc[name])
+
+        self.lights.extend(doc.get('extensions', {}).get('KHR_lights_punctual', {}).get('lights', []))
+        self.extensions_used.update(doc.get('extensionsUsed', []))
+        self.extensions_required.update(doc.get('extensionsRequired', []))
+        return _scene_roots(doc, offsets['nodes']) if with_nodes else []
+
+    def add_copy(self, doc, shared):
+        """
+        Add another copy of a document merged earlier at offsets `shared`
+        Only its nodes, skins and animations are added; they reference the
+        first copy's meshes, accessors, materials, cameras and lights, so
+        geometry and textures are stored once. Returns its root node indices
+        """
+        doc = copy.deepcopy({key: doc[key] for key in ('nodes', 'skins', 'animations', 'scenes', 'scene')
+                             if key in doc})
+        offsets = dict(shared)
+        current = self.offsets()
+        for name in ('nodes', 'skins', 'animations'):
+            offsets[name] = current[name]
+        self._remap_scene_graph(doc, offsets)
+
+        for name in ('nodes', 'skins', 'animations'):
+            if doc.get(name):
+                self._array(name).extend(doc[name])
+        return _scene_roots(doc, offsets['nodes'])
+
+    def _remap_scene_graph(self, doc, offsets):
+        """Shift the indices in a document's nodes, skins and animations"""
+        for node in doc.get('nodes', []):
+            if 'children' in node:
+                node['children'] = [child + offsets['nodes'] for child in node['children']]
+            if 'mesh' in node:
+                node['mesh'] += offsets['meshes']
+            if 'skin' in node:
+                node['skin'] += offsets['skins']
+            if 'camera' in node:
+                node['camera'] += offsets['cameras']
+            extensions = node.get('extensions', {})
+            if 'KHR_lights_punctual' in extensions:
+                extensions['KHR_lights_punctual']['light'] += offsets['lights']
+            if 'EXT_mesh_gpu_instancing' in extensions:
+                attributes = extensions['EXT_mesh_gpu_instancing']['attributes']
+                for name in attributes:
+                    attributes[name] += offsets['accessors']
+
+        for skin in doc.get('skins', []):
+            if 'inverseBindMatrices' in skin:
+                skin['inverseBindMatrices'] += offsets['accessors']
+            if 'skeleton' in skin:
+                skin['skeleton'] += offsets['nodes']
+            skin['joints'] = [joint + offsets['nodes'] for joint in skin.get('joints', [])]
+
+        for animation in doc.get('animations', []):
+            for sampler in animation.get('samplers', []):
+                sampler['input'] += offsets['accessors']
+                sampler['output'] += offsets['accessors']
+            for channel in animation.get('channels', []):
+                target = channel.get('target', {})
+                if 'node' in target:
+                    target['node'] += offsets['nodes']
+
+    def add_accessor(self, values):
+        """Store float32 rows (count, components) as a new accessor and return its index"""
+        data = np.ascontiguousarray(values, dtype=np.float32)
+        views = self._array('bufferViews')
+        views.append({"buffer": 0, "byteOffset": self.binary.add(data), "byteLength": data.nbytes})
+        accessors = self._array('accessors')
+        accessors.append({
+            "bufferView": len(views) - 1,
+            "componentType": 5126,
+            "count": data.shape[0],
+            "type": {3: "VEC3", 4: "VEC4"}[data.shape[1]]
+        })
+        return len(accessors) - 1
+
+    def add_instanced_nodes(self, doc, shared, transforms):
+        """
+        EXT_mesh_gpu_instancing nodes drawing every mesh node of a document
+        (merged earlier at offsets `shared`) once per instance
+        transforms are the instances' 4x4 matrices. Returns the new node
+        indices, or None (adding nothing) if a composed transform has shear
+        """
+        worlds = world_matrices(doc)
+        placements = []
+        for index, node in enumerate(doc.get('nodes', [])):
+            if 'mesh' not in node or index not in worlds:
+                continue
+            trs = [matrix_to_trs(transform @ worlds[index]) for transform in transforms]
+            if any(value is None for value in trs):
+                return None
+            placements.append((node, trs))
+
+        nodes = self._array('nodes')
+        added = []
+        for node, trs in placements:
+            translations, rotations, scales = (np.array([value[i] for value in trs]) for i in range(3))
+            instanced = {
+                "mesh": node['mesh'] + shared['meshes'],
+                "extensions": {"EXT_mesh_gpu_instancing": {"attributes": {
+                    "TRANSLATION": self.add_accessor(translations),
+                    "ROTATION": self.add_accessor(rotations),
+                    "SCALE": self.add_accessor(scales)
+                }}}
+            }
+            if 'name' in node:
+                instanced["name"] = node['name']
+            nodes.append(instanced)
+            added.append(len(nodes) - 1)
+        self.extensions_used.add('EXT_mesh_gpu_instancing')
+        return added
+
+    def add_wrapper_node(self, name, children, trs=None):
+        """Add a parent node for an input model to the combined scene"""
+        node = {"name": name}
+        if children:
+            node["children"] = children
+        node.update(trs or {})
+        nodes = self._array('nodes')
+        nodes.append(node)
+        self.gltf['scenes'][0]['nodes'].append(len(nodes) - 1)
+        return len(nodes) - 1
+
+    def finish(self):
+        """Return the combined document, with its single buffer described"""
+        if self.binary.length:
+            self.gltf['buffers'] = [{"byteLength": self.binary.length}]
+        if self.lights:
+            self.gltf.setdefault('extensions', {})['KHR_lights_punctual'] = {"lights": self.lights}
+        if self.extensions_used:
+            self.gltf['extensionsUsed'] = sorted(self.extensions_used)
+        if self.extensions_required:
+            self.gltf['extensionsRequired'] = sorted(self.extensions_required)
+        return self.gltf
+
+
+def _scene_roots(doc, node_offset):
+    """Root node indices of a document's default scene, shifted by node_offset"""
+    scenes = doc.get('scenes', [])
+    if scenes:
+        roots = scenes[doc.get('scene', 0)].get('nodes', [])
+    else:
+        # No scene: every node that is nobody's child is a root
+        children = {child for node in doc.get('nodes', []) for child in node.get('children', [])}
+        roots = [i for i in range(len(doc.get('nodes', []))) if i not in children]
+    return [root + node_offset for root in roots]
+
+
+def combine_glbs(model_paths, output_path, position_data=None, gpu_instancing=False):
+    """
+    Combine GLB files into a single GLB
+
+    Each input is wrapped in a parent node carrying the position (translation),
+    rotation (XYZ Euler degrees) and scale given for its index in position_data,
+    given in Blender's Z-up axes like the Blender fallback (see transform_to_trs). Inputs with the same content are stored once:
+    later copies get their own nodes (and skins and animations) referencing
+    the first copy's meshes, so scene root i is still input i.
+
+    With gpu_instancing, copies of static models are instead drawn by one
+    EXT_mesh_gpu_instancing node per mesh, under a single root at the first
+    copy's place. Raises GLBError if an input cannot be merged natively.
+    """
+    position_data = position_data or {}
+    merger = GLTFMerger()
+    inputs = []
+
+    # Inputs with identical content, by hash, in order of first appearance
+    groups = {}
+    for i, model_path in enumerate(model_paths):
+        groups.setdefault(content_hash(model_path) or model_path, []).append(i)
+    shared = {}
+    try:
+        for i, model_path in enumerate(model_paths):
+            key = content_hash(model_path) or model_path
+            copies = groups[key]
+            name = os.path.splitext(os.path.basename(model_path))[0]
+            trs = transform_to_trs(position_data.get(str(i)))
+
+            if key in shared:
+                glb, offsets, instanced = shared[key]
+                if not instanced:
+                    merger.add_wrapper_node(name, merger.add_copy(glb.json, offsets), trs)
+                continue
+
+            glb = GLBFile(model_path)
+            inputs.append(glb)
+            if gpu_instancing and len(copies) > 1 and instanceable(glb.json):
+                offsets = merger.offsets()
+                merger.add_document(glb.json, glb.bin, with_nodes=False)
+                transforms = [node_matrix(transform_to_trs(position_data.get(str(copy_index))))
+                              for copy_index in copies]
+                nodes = merger.add_instanced_nodes(glb.json, offsets, transforms)
+                if nodes is not None:
+                    shared[key] = (glb, offsets, True)
+                    merger.add_wrapper_node(name, nodes)
+                    continue
+                # Some copy needs shear: give every copy its own nodes instead
+                merger.add_wrapper_node(name, merger.add_copy(glb.json, offsets), trs)
+            else:
+                offsets = merger.offsets()
+                merger.add_wrapper_node(name, merger.add_document(glb.json, glb.bin), trs)
+            shared[key] = (glb, offsets, False)
+
+        gltf = merger.finish()
+        write_glb(output_path, gltf, merger.binary.pieces, merger.binary.length)
+    finally:
+        # Drop the views into the mapped inputs before unmapping them
+        merger.binary.pieces.clear()
+        for glb in inputs:
+            glb.close()
+
+    return output_path
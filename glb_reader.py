@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+Pure-Python reader for GLB/glTF files
+Parses only the GLB header and JSON chunk, so model metadata can be
+served without starting Blender
+"""
+
+import os
+import json
+import mmap
+import struct
+
+GLB_MAGIC = b'glTF'
+GLB_HEADER_SIZE = 12
+CHUNK_HEADER_SIZE = 8
+CHUNK_TYPE_JSON = 0x4E4F534A
+CHUNK_TYPE_BIN = 0x004E4942
+
+# Blender's glTF importer converts keyframe times to frames at the scene
+# frame rate, which defaults to 24 fps
+DEFAULT_FPS = 24
+
+
+class GLBError(ValueError):
+    """Raised when a file cannot be parsed as GLB/glTF"""
+
+
+def _parse_glb_json(buf):
+    """Parse the header and JSON chunk of a GLB buffer"""
+    if len(buf) < GLB_HEADER_SIZE + CHUNK_HEADER_SIZE:
+        raise GLBError("File too small to be a GLB")
+
+    magic, version, length = struct.unpack_from('<4sII', buf, 0)
+    if magic != GLB_MAGIC:
+        raise GLBError("Invalid GLB magic")
+    if version != 2:
+        raise GLBError(f"Unsupported GLB version: {version}")
+    if length > len(buf):
+        raise GLBError("GLB header length exceeds file size")
+
+    chunk_length, chunk_type = struct.unpack_from('<II', buf, GLB_HEADER_SIZE)
+    if chunk_type != CHUNK_TYPE_JSON:
+        raise GLBError("First GLB chunk is not JSON")
+
+    start = GLB_HEADER_SIZE + CHUNK_HEADER_SIZE
+    end = start + chunk_length
+    if end > length:
+        raise GLBError("JSON chunk exceeds GLB length")
+
+    try:
+        return json.loads(bytes(buf[start:end]).decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise GLBError(f"Invalid JSON chunk: {str(e)}")
+
+
+def read_gltf_json(path):
+    """
+    Read the glTF JSON document from a .glb or .gltf file
+
+    For GLB files only the 12-byte header and the JSON chunk are touched;
+    the binary chunk is never read into memory.
+    """
+    file_ext = os.path.splitext(path)[1].lower()
+
+    if file_ext == '.gltf':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise GLBError(f"Invalid glTF JSON: {str(e)}")
+
+    if file_ext != '.glb':
+        raise GLBError(f"Unsupported file format: {file_ext}")
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise GLBError("Empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse_glb_json(mm)
+
+
+class GLBFile:
+    """
+    Memory-mapped GLB file
+    Exposes the parsed JSON document and a zero-copy memoryview of the BIN
+    chunk; use as a context manager so the mapping is closed afterwards
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = None
+        self.bin = memoryview(b'')
+        try:
+            if os.fstat(self._file.fileno()).st_size == 0:
+                raise GLBError("Empty file")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.json = _parse_glb_json(self._mmap)
+            self.bin = self._find_bin_chunk()
+        except Exception:
+            self.close()
+            raise
+
+    def _find_bin_chunk(self):
+        """Return a memoryview of the BIN chunk, or an empty view if there is none"""
+        _, _, length = struct.unpack_from('<4sII', self._mmap, 0)
+        json_length, _ = struct.unpack_from('<II', self._mmap, GLB_HEADER_SIZE)
+        offset = GLB_HEADER_SIZE + CHUNK_HEADER_SIZE + json_length
+
+        if offset + CHUNK_HEADER_SIZE > length:
+            return memoryview(b'')
+
+        chunk_length, chunk_type = struct.unpack_from('<II', self._mmap, offset)
+        if chunk_type != CHUNK_TYPE_BIN:
+            return memoryview(b'')
+
+        start = offset + CHUNK_HEADER_SIZE
+        if start + chunk_length > length:
+            raise GLBError("BIN chunk exceeds GLB length")
+        return memoryview(self._mmap)[start:start + chunk_length]
+
+    def buffer_view_data(self, index):
+        """Return a zero-copy memoryview of a bufferView in the BIN chunk"""
+        view = self.json['bufferViews'][index]
+        if view.get('buffer', 0) != 0 or 'uri' in self.json['buffers'][0]:
+            raise GLBError("Only the embedded GLB buffer is supported")
+        start = view.get('byteOffset', 0)
+        return self.bin[start:start + view['byteLength']]
+
+    def close(self):
+        self.bin = memoryview(b'')
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out by buffer_view_data are still alive; the
+                # mapping is released when they are garbage collected
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _joint_nodes(gltf):
+    """Return the set of node indices that are skin joints (bones)"""
+    joints = set()
+    for skin in gltf.get('skins', []):
+        joints.update(skin.get('joints', []))
+    return joints
+
+
+def _sampler_duration(gltf, sampler):
+    """Return the duration in seconds covered by a sampler's input accessor"""
+    accessors = gltf.get('accessors', [])
+    input_index = sampler.get('input')
+    if input_index is None or input_index >= len(accessors):
+        return 0.0
+
+    accessor = accessors[input_index]
+    if 'min' not in accessor or 'max' not in accessor:
+        return 0.0
+    return accessor['max'][0] - accessor['min'][0]
+
+
+def extract_animation_info(gltf, fps=DEFAULT_FPS):
+    """
+    Build the animation summary for a glTF document
+
+    Returns the same payload as extract_animations.py:
+    {"supports_animation": True, "animations": [{"name", "duration_frames", "affected_elements"}]}
+    """
+    nodes = gltf.get('nodes', [])
+    joints = _joint_nodes(gltf)
+
+    animations = []
+    for i, animation in enumerate(gltf.get('animations', [])):
+        samplers = animation.get('samplers', [])
+
+        # Clip duration is the longest time span over all samplers
+        duration = 0.0
+        affected_objects = set()
+        for channel in animation.get('channels', []):
+            sampler_index = channel.get('sampler')
+            if sampler_index is not None and sampler_index < len(samplers):
+                duration = max(duration, _sampler_duration(gltf, samplers[sampler_index]))
+
+            node_index = channel.get('target', {}).get('node')
+            if node_index in joints and node_index < len(nodes):
+                bone_name = nodes[node_index].get('name', f"node_{node_index}")
+                affected_objects.add(f"Bone: {bone_name}")
+            else:
+                affected_objects.add("Object animation")
+
+        animations.append({
+            "name": animation.get('name', f"Animation_{i}"),
+            "duration_frames": duration * fps,
+            "affected_elements": list(affected_objects)
+        })
+
+    return {
+        "supports_animation": True,
+        "animations": animations
+    }
+
+
+def read_model_info(path):
+    """Read a GLB/glTF file and return its animation summary"""
+    return extract_animation_info(read_gltf_json(path))
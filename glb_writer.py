@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+GLB writer
+Streams a glTF JSON document and a sequence of binary pieces into a GLB
+file without first joining the pieces into one buffer
+"""
+
+import os
+import json
+import struct
+import threading
+
+from glb_reader import GLB_MAGIC, GLB_HEADER_SIZE, CHUNK_HEADER_SIZE, CHUNK_TYPE_JSON, CHUNK_TYPE_BIN
+
+
+def padding(length, alignment=4):
+    """Number of bytes needed to pad length up to a multiple of alignment"""
+    return (alignment - length % alignment) % alignment
+
+
+class BinaryBuilder:
+    """
+    Collects the pieces of a GLB binary chunk
+    Pieces are kept as references (e.g. memoryviews over mmapped inputs) and
+    only copied when the file is written
+    """
+
+    def __init__(self):
+        self.pieces = []
+        self.length = 0
+
+    def add(self, data, alignment=4):
+        """Append data aligned to `alignment` bytes and return its byte offset"""
+        pad = padding(self.length, alignment)
+        if pad:
+            self.pieces.append(b'\0' * pad)
+            self.length += pad
+        offset = self.length
+        self.pieces.append(data)
+        self.length += len(memoryview(data).cast('B'))
+        return offset
+
+
+def write_glb(output_path, gltf, pieces=(), bin_length=None):
+    """
+    Write a GLB file from a glTF document and binary pieces
+
+    The pieces are concatenated in order to form the BIN chunk; gltf['buffers']
+    should already describe a single buffer of that length. The file is written
+    to a temporary path and moved into place, so output_path may also be one of
+    the (memory-mapped) inputs.
+    """
+    if bin_length is None:
+        bin_length = sum(len(memoryview(piece).cast('B')) for piece in pieces)
+
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_bytes += b' ' * padding(len(json_bytes))
+    bin_padding = padding(bin_length)
+
+    total_length = GLB_HEADER_SIZE + CHUNK_HEADER_SIZE + len(json_bytes)
+    if bin_length:
+        total_length += CHUNK_HEADER_SIZE + bin_length + bin_padding
+
+    temp_path = f"{output_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(struct.pack('<4sII', GLB_MAGIC, 2, total_length))
+            f.write(struct.pack('<II', len(json_bytes), CHUNK_TYPE_JSON))
+            f.write(json_bytes)
+            if bin_length:
+                f.write(struct.pack('<II', bin_length + bin_padding, CHUNK_TYPE_BIN))
+                for piece in pieces:
+                    f.write(piece)
+                f.write(b'\0' * bin_padding)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return output_path
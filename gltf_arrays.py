@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""
+NumPy access to glTF accessor data and GLB repacking
+read_accessor() returns accessor data as arrays (zero-copy for tightly
+packed data); GLBRepacker writes a document back out with replaced
+accessors and images, one tightly packed bufferView per accessor
+"""
+
+import copy
+
+import numpy as np
+
+from glb_reader import GLBError
+from glb_writer import BinaryBuilder, write_glb
+
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+DTYPE_COMPONENTS = {np.dtype(dtype): component for component, dtype in COMPONENT_DTYPES.items()}
+
+TYPE_SIZES = {
+    'SCALAR': 1,
+    'VEC2': 2,
+    'VEC3': 3,
+    'VEC4': 4,
+    'MAT2': 4,
+    'MAT3': 9,
+    'MAT4': 16,
+}
+
+SIZE_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4', 16: 'MAT4'}
+
+TARGET_ARRAY_BUFFER = 34962
+TARGET_ELEMENT_ARRAY_BUFFER = 34963
+
+MODE_TRIANGLES = 4
+
+
+def _raw_accessor(gltf, bin_data, accessor):
+    """Read the dense (non-sparse) part of an accessor"""
+    dtype = np.dtype(COMPONENT_DTYPES[accessor['componentType']])
+    components = TYPE_SIZES[accessor['type']]
+    count = accessor['count']
+
+    if 'bufferView' not in accessor:
+        return np.zeros((count, components), dtype=dtype)
+
+    view = gltf['bufferViews'][accessor['bufferView']]
+    if view.get('buffer', 0) != 0 or 'uri' in gltf['buffers'][0]:
+        raise GLBError("Only the embedded GLB buffer is supported")
+
+    start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+    element_size = dtype.itemsize * components
+    stride = view.get('byteStride') or element_size
+
+    if count == 0:
+        return np.zeros((0, components), dtype=dtype)
+    end = start + stride * (count - 1) + element_size
+    if end > view.get('byteOffset', 0) + view['byteLength'] or end > len(bin_data):
+        raise GLBError("Accessor exceeds its bufferView")
+
+    # Zero-copy view; interleaved data simply gets a larger row stride
+    return np.ndarray(
+        shape=(count, components),
+        dtype=dtype,
+        buffer=bin_data,
+        offset=start,
+        strides=(stride, dtype.itemsize)
+    )
+
+
+def read_accessor(gltf, bin_data, index):
+    """
+    Return an accessor's data as an array of shape (count, components)
+    Values are the stored components; normalized integers are not rescaled
+    """
+    accessor = gltf['accessors'][index]
+    data = _raw_accessor(gltf, bin_data, accessor)
+
+    sparse = accessor.get('sparse')
+    if sparse:
+        data = np.array(data)
+        indices_accessor = {
+            "bufferView": sparse['indices']['bufferView'],
+            "byteOffset": sparse['indices'].get('byteOffset', 0),
+            "componentType": sparse['indices']['componentType'],
+            "count": sparse['count'],
+            "type": 'SCALAR'
+        }
+        values_accessor = {
+            "bufferView": sparse['values']['bufferView'],
+            "byteOffset": sparse['values'].get('byteOffset', 0),
+            "componentType": accessor['componentType'],
+            "count": sparse['count'],
+            "type": accessor['type']
+        }
+        indices = _raw_accessor(gltf, bin_data, indices_accessor)[:, 0]
+        data[indices] = _raw_accessor(gltf, bin_data, values_accessor)
+
+    return data
+
+
+def dequantize(data, component_type, normalized):
+    """Convert stored components to float values, applying glTF normalization"""
+    if not normalized or component_type == 5126:
+        return data.astype(np.float32)
+    if component_type == 5120:
+        return np.maximum(data.astype(np.float32) / 127.0, -1.0)
+    if component_type == 5121:
+        return data.astype(np.float32) / 255.0
+    if component_type == 5122:
+        return np.maximum(data.astype(np.float32) / 32767.0, -1.0)
+    if component_type == 5123:
+        return data.astype(np.float32) / 65535.0
+    return data.astype(np.float32)
+
+
+def read_accessor_float(gltf, bin_data, index):
+    """Return an accessor's data as float32 values"""
+    accessor = gltf['accessors'][index]
+    return dequantize(
+        read_accessor(gltf, bin_data, index),
+        accessor['componentType'],
+        accessor.get('normalized', False)
+    )
+
+
+def read_indices(gltf, bin_data, primitive):
+    """Return a primitive's index array, generating one for non-indexed geometry"""
+    if 'indices' in primitive:
+        return read_accessor(gltf, bin_data, primitive['indices'])[:, 0].astype(np.uint32)
+    count = gltf['accessors'][primitive['attributes']['POSITION']]['count']
+    return np.arange(count, dtype=np.uint32)
+
+
+def accessor_usage(gltf):
+    """
+    Classify accessors by how they are used
+    Returns (vertex_accessors, index_accessors, referenced_accessors)
+    """
+    vertex, indices, referenced = set(), set(), set()
+
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            if 'KHR_draco_mesh_compression' in primitive.get('extensions', {}):
+                raise GLBError("Draco-compressed meshes are not supported")
+            vertex.update(primitive.get('attributes', {}).values())
+            for target in primitive.get('targets', []):
+                vertex.update(target.values())
+            if 'indices' in primitive:
+                indices.add(primitive['indices'])
+
+    for node in gltf.get('nodes', []):
+        instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing')
+        if instancing:
+            vertex.update(instancing.get('attributes', {}).values())
+
+    referenced.update(vertex)
+    referenced.update(indices)
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            referenced.add(skin['inverseBindMatrices'])
+    for animation in gltf.get('animations', []):
+        for sampler in animation.get('samplers', []):
+            referenced.add(sampler['input'])
+            referenced.add(sampler['output'])
+
+    return vertex, indices, referenced
+
+
+def remap_accessor_refs(gltf, remap):
+    """Rewrite every accessor reference in a document through remap"""
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            attributes = primitive.get('attributes', {})
+            for name in attributes:
+                attributes[name] = remap[attributes[name]]
+            for target in primitive.get('targets', []):
+                for name in target:
+                    target[name] = remap[target[name]]
+            if 'indices' in primitive:
+                primitive['indices'] = remap[primitive['indices']]
+
+    for node in gltf.get('nodes', []):
+        instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing')
+        if instancing:
+            attributes = instancing.get('attributes', {})
+            for name in attributes:
+                attributes[name] = remap[attributes[name]]
+
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            skin['inverseBindMatrices'] = remap[skin['inverseBindMatrices']]
+
+    for animation in gltf.get('animations', []):
+        for sampler in animation.get('samplers', []):
+            sampler['input'] = remap[sampler['input']]
+            sampler['output'] = remap[sampler['output']]
+
+
+def add_extension(gltf, name, required=False):
+    """Declare an extension as used (and optionally required) by a document"""
+    used = gltf.setdefault('extensionsUsed', [])
+    if name not in used:
+        used.append(name)
+    if required:
+        required_list = gltf.setdefault('extensionsRequired', [])
+        if name not in required_list:
+            required_list.append(name)
+
+
+class GLBRepacker:
+    """
+    Rewrites a GLB document with modified accessor and image data
+
+    Edit self.gltf freely (it is a deep copy), then call set_accessor(),
+    add_accessor() or set_image() for new data. write() drops accessors that
+    nothing references and packs each remaining accessor into its own
+    bufferView, padding vertex attributes to 4-byte strides.
+    """
+
+    def __init__(self, gltf, bin_data):
+        self.source = gltf
+        self.bin = bin_data
+        self.gltf = copy.deepcopy(gltf)
+        self._accessor_data = {}
+        self._image_data = {}
+
+    def accessor(self, index):
+        """Current data of an accessor (replacement if set, otherwise the original)"""
+        if index in self._accessor_data:
+            return self._accessor_data[index]
+        return read_accessor(self.source, self.bin, index)
+
+    def set_accessor(self, index, data, normalized=None, keep_bounds=False):
+        """Replace an accessor's data; component and element types follow the array"""
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        accessor = self.gltf['accessors'][index]
+        accessor['componentType'] = DTYPE_COMPONENTS[data.dtype]
+        accessor['type'] = SIZE_TYPES[data.shape[1]] if accessor['type'] not in ('MAT2', 'MAT3') else accessor['type']
+        accessor['count'] = data.shape[0]
+        accessor.pop('sparse', None)
+        if normalized is not None:
+            if normalized:
+                accessor['normalized'] = True
+            else:
+                accessor.pop('normalized', None)
+        if not keep_bounds:
+            accessor.pop('min', None)
+            accessor.pop('max', None)
+        self._accessor_data[index] = data
+
+    def add_accessor(self, data, accessor_type=None, normalized=False):
+        """Append a new accessor holding data and return its index"""
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        accessors = self.gltf.setdefault('accessors', [])
+        accessors.append({
+            "componentType": DTYPE_COMPONENTS[data.dtype],
+            "count": data.shape[0],
+            "type": accessor_type or SIZE_TYPES[data.shape[1]]
+        })
+        index = len(accessors) - 1
+        self.set_accessor(index, data, normalized=normalized)
+        return index
+
+    def set_image(self, index, data, mime_type):
+        """Replace an embedded image's bytes"""
+        image = self.gltf['images'][index]
+        image.pop('uri', None)
+        image['mimeType'] = mime_type
+        self._image_data[index] = data
+
+    def image_data(self, index):
+        """Current bytes of an embedded image, or None if it is external"""
+        if index in self._image_data:
+            return self._image_data[index]
+        image = self.source['images'][index]
+        if 'bufferView' not in image:
+            return None
+        view = self.source['bufferViews'][image['bufferView']]
+        start = view.get('byteOffset', 0)
+        return self.bin[start:start + view['byteLength']]
+
+    def _pack(self):
+        """Build the final document and its binary pieces"""
+        gltf = self.gltf
+        vertex, indices, referenced = accessor_usage(gltf)
+
+        builder = BinaryBuilder()
+        buffer_views = []
+        accessors = []
+        remap = {}
+
+        bounds_required = set()
+        for mesh in gltf.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                if 'POSITION' in primitive.get('attributes', {}):
+                    bounds_required.add(primitive['attributes']['POSITION'])
+                for target in primitive.get('targets', []):
+                    if 'POSITION' in target:
+                        bounds_required.add(target['POSITION'])
+        for animation in gltf.get('animations', []):
+            for sampler in animation.get('samplers', []):
+                bounds_required.add(sampler['input'])
+
+        for old_index, accessor in enumerate(gltf.get('accessors', [])):
+            if old_index not in referenced:
+                continue
+            data = np.ascontiguousarray(self.accessor(old_index))
+            accessor = dict(accessor)
+            accessor.pop('sparse', None)
+            accessor.pop('byteOffset', None)
+            accessor['count'] = data.shape[0]
+
+            element_size = data.dtype.itemsize * data.shape[1]
+            view = {"buffer": 0}
+            if old_index in vertex:
+                # Vertex attributes need 4-byte aligned elements
+                stride = (element_size + 3) // 4 * 4
+                if stride != element_size:
+                    padded = np.zeros((data.shape[0], stride), dtype=np.uint8)
+                    padded[:, :element_size] = data.view(np.uint8).reshape(data.shape[0], element_size)
+                    data = padded
+                    view["byteStride"] = stride
+                view["target"] = TARGET_ARRAY_BUFFER
+            elif old_index in indices:
+                view["target"] = TARGET_ELEMENT_ARRAY_BUFFER
+
+            view["byteOffset"] = builder.add(data)
+            view["byteLength"] = data.nbytes
+            buffer_views.append(view)
+            accessor['bufferView'] = len(buffer_views) - 1
+
+            if old_index in bounds_required or 'min' in accessor:
+                values = self.accessor(old_index)
+                if values.shape[0]:
+                    accessor['min'] = values.min(axis=0).tolist()
+                    accessor['max'] = values.max(axis=0).tolist()
+
+            remap[old_index] = len(accessors)
+            accessors.append(accessor)
+
+        for index, image in enumerate(gltf.get('images', [])):
+            data = self.image_data(index)
+            if data is None:
+                continue
+            buffer_views.append({"buffer": 0, "byteOffset": builder.add(data), "byteLength": len(data)})
+            image['bufferView'] = len(buffer_views) - 1
+
+        remap_accessor_refs(gltf, remap)
+        gltf['accessors'] = accessors
+        gltf['bufferViews'] = buffer_views
+        if builder.length:
+            gltf['buffers'] = [{"byteLength": builder.length}]
+        else:
+            gltf.pop('buffers', None)
+        return gltf, builder
+
+    def write(self, output_path):
+        """Write the repacked GLB and return its size in bytes"""
+        gltf, builder = self._pack()
+        write_glb(output_path, gltf, builder.pieces, builder.length)
+        return builder.length
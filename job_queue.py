@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Bounded background job queue for long-running model operations
+Jobs run on a thread pool so request handlers can return a job id at once;
+identical in-flight jobs are coalesced by key
+"""
+
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the queue already holds the maximum number of pending jobs"""
+
+
+class Job:
+    """State and progress events of a single background job"""
+
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JOB_QUEUED
+        self.progress = 0.0
+        self.message = 'Queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._changed = threading.Condition()
+        # (event loop, asyncio.Event) pairs of coroutines awaiting events
+        self._waiters = set()
+        self._add_event()
+
+    def _add_event(self):
+        """Record the current state as a progress event and wake waiters"""
+        with self._changed:
+            self.events.append({
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message
+            })
+            self._changed.notify_all()
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has closed
+                pass
+
+    def update(self, status=None, progress=None, message=None):
+        if status is not None:
+            self.status = status
+        if progress is not None:
+            self.progress = progress
+        if message is not None:
+            self.message = message
+        self._add_event()
+
+    def is_finished(self):
+        return self.status in FINISHED_STATES
+
+    def wait_for_events(self, after, timeout=None):
+        """
+        Block until there are more than `after` events or the timeout expires
+        Returns the new events (possibly empty)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after, timeout=timeout)
+            return self.events[after:]
+
+    async def next_events(self, after, timeout=None):
+        """
+        Awaitable wait_for_events: waits on the event loop without holding a thread
+        Returns the new events (possibly empty)
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._changed:
+            if len(self.events) > after:
+                return self.events[after:]
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._changed:
+                self._waiters.discard(waiter)
+        with self._changed:
+            return self.events[after:]
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on a thread pool with a bound on pending work
+
+    Job functions are called as fn(report, *args) where report(progress, message)
+    publishes a progress event; the return value becomes the job result.
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, max_finished=1000):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.coalesced = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn, *args):
+        """
+        Queue a job and return (job, coalesced)
+        If a job with the same key is still queued or running, that job is
+        returned with coalesced=True and the new work is dropped
+        """
+        with self._lock:
+            existing = self._in_flight.get(key)
+            if existing is not None:
+                self.coalesced += 1
+                return existing, True
+
+            if len(self._in_flight) >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({self.max_pending} pending jobs)")
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn, args)
+        return job, False
+
+    def _run(self, job, fn, args):
+        job.started_at = time.time()
+        job.update(status=JOB_RUNNING, message='Running')
+
+        def report(progress, message=None):
+            job.update(progress=progress, message=message)
+
+        try:
+            job.result = fn(report, *args)
+        except Exception as e:
+            job.error = str(e)
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+            job.update(status=JOB_FAILED, message='Failed')
+        else:
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+            job.update(status=JOB_SUCCEEDED, progress=1.0, message='Done')
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_finished (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a job by id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
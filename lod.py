@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+"""
+Level-of-detail generation for GLB models
+Meshes are simplified with quadric-error edge collapse, vectorized with
+NumPy by collapsing a batch of independent edges per pass; LOD files are
+cached next to the original model
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+
+from glb_reader import GLBFile, read_gltf_json
+from gltf_arrays import GLBRepacker, MODE_TRIANGLES, read_accessor_float, read_indices
+from mesh_optimize import reorder_for_locality
+from metrics import record_cache_lookup
+from model_serving import model_version
+
+# Fraction of the original triangle count kept at each level; level 0 is the original
+LOD_RATIOS = [1.0, 0.5, 0.25, 0.1]
+
+LOD_DIR_NAME = '.lod'
+
+# Primitives are never simplified below this many triangles
+MIN_TRIANGLES = 32
+
+# Weight of the constraint planes that keep open boundaries in place
+BOUNDARY_WEIGHT = 100.0
+
+_lod_locks = {}
+_lod_locks_guard = threading.Lock()
+
+
+def _face_quadrics(points, triangles):
+    """Area-weighted plane quadrics (4x4) of triangles"""
+    p0, p1, p2 = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    normals = np.cross(p1 - p0, p2 - p0)
+    lengths = np.linalg.norm(normals, axis=1)
+    area = lengths / 2
+    normals = normals / np.maximum(lengths, 1e-20)[:, None]
+    planes = np.concatenate([normals, -(normals * p0).sum(axis=1, keepdims=True)], axis=1)
+    return planes[:, :, None] * planes[:, None, :] * area[:, None, None]
+
+
+def _boundary_quadrics(points, triangles):
+    """
+    Quadrics of planes through each open boundary edge, perpendicular to its
+    face, so collapses slide along boundaries instead of eroding them
+    Returns (edge endpoints, quadrics)
+    """
+    edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    faces = np.repeat(np.arange(len(triangles)), 3)
+    keys = np.sort(edges, axis=1)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    boundary = counts[inverse.ravel()] == 1
+    edges, faces = edges[boundary], faces[boundary]
+
+    tris = triangles[faces]
+    p0, p1, p2 = points[tris[:, 0]], points[tris[:, 1]], points[tris[:, 2]]
+    face_normals = np.cross(p1 - p0, p2 - p0)
+    start, end = points[edges[:, 0]], points[edges[:, 1]]
+    direction = end - start
+    normals = np.cross(direction, face_normals)
+    normals = normals / np.maximum(np.linalg.norm(normals, axis=1), 1e-20)[:, None]
+    planes = np.concatenate([normals, -(normals * start).sum(axis=1, keepdims=True)], axis=1)
+    weight = BOUNDARY_WEIGHT * (direction ** 2).sum(axis=1)
+    return edges, planes[:, :, None] * planes[:, None, :] * weight[:, None, None]
+
+
+def _quadric_error(quadrics, points):
+    """Evaluate v^T Q v for homogeneous points"""
+    homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    return np.einsum('ni,nij,nj->n', homogeneous, quadrics, homogeneous)
+
+
+def _unique_edges(triangles):
+    """Unique undirected edges of triangles"""
+    edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    edges.sort(axis=1)
+    return np.unique(edges, axis=0)
+
+
+def simplify(positions, indices, target_triangles, max_error=np.inf):
+    """
+    Simplify a triangle mesh to roughly target_triangles triangles
+
+    Topology is computed on unique positions, so vertices split for UV or
+    normal seams move together and keep their own attributes. Open
+    boundaries are held by weighted constraint planes. Returns (new_positions, new_indices) where
+    new_positions has one entry per input vertex.
+    """
+    unique_points, position_ids = np.unique(positions.astype(np.float64), axis=0, return_inverse=True)
+    position_ids = position_ids.ravel()
+    points = unique_points.copy()
+    triangles = indices.reshape(-1, 3).astype(np.int64)
+
+    def live_triangles(tris):
+        ids = position_ids[tris]
+        keep = (ids[:, 0] != ids[:, 1]) & (ids[:, 1] != ids[:, 2]) & (ids[:, 0] != ids[:, 2])
+        return tris[keep]
+
+    triangles = live_triangles(triangles)
+    quadrics = np.zeros((len(points), 4, 4))
+    face_quadrics = _face_quadrics(points, position_ids[triangles])
+    for corner in range(3):
+        np.add.at(quadrics, position_ids[triangles[:, corner]], face_quadrics)
+    boundary_edges, boundary_quadrics = _boundary_quadrics(points, position_ids[triangles])
+    for end in range(2):
+        np.add.at(quadrics, boundary_edges[:, end], boundary_quadrics)
+
+    while len(triangles) > target_triangles:
+        ids = position_ids[triangles]
+        edges = _unique_edges(ids)
+
+        a, b = edges[:, 0], edges[:, 1]
+        edge_quadrics = quadrics[a] + quadrics[b]
+        candidates = np.stack([points[a], points[b], (points[a] + points[b]) / 2])
+        errors = np.stack([_quadric_error(edge_quadrics, c) for c in candidates])
+        best = errors.argmin(axis=0)
+        cost = errors[best, np.arange(len(edges))]
+        target_points = candidates[best, np.arange(len(edges))]
+
+        # Independent set: edges that are the cheapest at both endpoints
+        vertex_min = np.full(len(points), np.inf)
+        np.minimum.at(vertex_min, a, cost)
+        np.minimum.at(vertex_min, b, cost)
+        selected = (cost <= vertex_min[a]) & (cost <= vertex_min[b]) & (cost <= max_error)
+        edge_ids = np.arange(len(edges))
+        first_edge = np.full(len(points), len(edges))
+        np.minimum.at(first_edge, a[selected], edge_ids[selected])
+        np.minimum.at(first_edge, b[selected], edge_ids[selected])
+        selected &= (first_edge[a] == edge_ids) & (first_edge[b] == edge_ids)
+
+        chosen = np.flatnonzero(selected)
+        if not len(chosen):
+            break
+        # Each collapse removes about two triangles; do not overshoot the target
+        needed = max(1, (len(triangles) - target_triangles + 1) // 2)
+        chosen = chosen[np.argsort(cost[chosen], kind='stable')[:needed]]
+
+        keep_ids, drop_ids = a[chosen], b[chosen]
+        points[keep_ids] = target_points[chosen]
+        quadrics[keep_ids] += quadrics[drop_ids]
+
+        remap = np.arange(len(points))
+        remap[drop_ids] = keep_ids
+        position_ids = remap[position_ids]
+        triangles = live_triangles(triangles)
+
+    return points[position_ids].astype(np.float32), triangles.ravel().astype(np.uint32)
+
+
+def _store_positions(values, accessor):
+    """Convert float positions back to an accessor's stored component type"""
+    if accessor['componentType'] == 5126:
+        return values.astype(np.float32)
+    dtype = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16}[accessor['componentType']]
+    if accessor.get('normalized'):
+        values = values * np.iinfo(dtype).max
+    return np.round(values).clip(np.iinfo(dtype).min, np.iinfo(dtype).max).astype(dtype)
+
+
+def generate_lod(input_path, output_path, ratio):
+    """
+    Write a simplified copy of a GLB keeping about `ratio` of each mesh's triangles
+    Returns the total triangle count of the result
+    """
+    total_triangles = 0
+    with GLBFile(input_path) as glb:
+        repacker = GLBRepacker(glb.json, glb.bin)
+        gltf = repacker.gltf
+
+        users = {}
+        for mesh in gltf.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                for index in list(primitive.get('attributes', {}).values()) + [primitive.get('indices')]:
+                    users[index] = users.get(index, 0) + 1
+
+        for mesh in gltf.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                attributes = primitive.get('attributes', {})
+                indices = read_indices(glb.json, glb.bin, primitive)
+                exclusive = all(users[i] == 1 for i in list(attributes.values()) + [primitive.get('indices')])
+                if (primitive.get('mode', MODE_TRIANGLES) != MODE_TRIANGLES or primitive.get('targets')
+                        or 'POSITION' not in attributes or not exclusive or len(indices) < 3):
+                    if primitive.get('mode', MODE_TRIANGLES) == MODE_TRIANGLES:
+                        total_triangles += len(indices) // 3
+                    continue
+
+                position_accessor = gltf['accessors'][attributes['POSITION']]
+                positions = read_accessor_float(glb.json, glb.bin, attributes['POSITION'])
+                triangle_count = len(indices) // 3
+                target = max(min(triangle_count, MIN_TRIANGLES), int(triangle_count * ratio))
+                new_positions, new_indices = simplify(positions, indices[:triangle_count * 3], target)
+                total_triangles += len(new_indices) // 3
+
+                arrays = {name: repacker.accessor(index) for name, index in attributes.items()}
+                arrays['POSITION'] = _store_positions(new_positions, position_accessor)
+                arrays, new_indices = reorder_for_locality(arrays, new_indices)
+
+                for name, index in attributes.items():
+                    accessor = gltf['accessors'][index]
+                    repacker.set_accessor(index, arrays[name], normalized=accessor.get('normalized', False))
+                index_data = new_indices.astype(np.uint16 if len(arrays['POSITION']) <= 0xFFFF else np.uint32)
+                if 'indices' in primitive:
+                    repacker.set_accessor(primitive['indices'], index_data)
+                else:
+                    primitive['indices'] = repacker.add_accessor(index_data)
+
+        repacker.write(output_path)
+    return total_triangles
+
+
+def gltf_triangle_count(gltf):
+    """Total triangle count over all triangle primitives of a glTF document"""
+    total = 0
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            if primitive.get('mode', MODE_TRIANGLES) != MODE_TRIANGLES:
+                continue
+            if 'indices' in primitive:
+                total += gltf['accessors'][primitive['indices']]['count'] // 3
+            elif 'POSITION' in primitive.get('attributes', {}):
+                total += gltf['accessors'][primitive['attributes']['POSITION']]['count'] // 3
+    return total
+
+
+def count_triangles(path):
+    """Total triangle count of a GLB/glTF file, read from its JSON chunk only"""
+    return gltf_triangle_count(read_gltf_json(path))
+
+
+def lod_dir(models_dir, model_name):
+    return os.path.join(models_dir, LOD_DIR_NAME, os.path.splitext(model_name)[0])
+
+
+def _lock_for(path):
+    with _lod_locks_guard:
+        return _lod_locks.setdefault(path, threading.Lock())
+
+
+def ensure_lods(models_dir, model_name):
+    """
+    Generate (once per model version) and return the LOD manifest of a model
+
+    {"version", "levels": [{"level", "ratio", "triangles", "path"}]}; level 0
+    is the original file. Stale levels from older versions are replaced.
+    """
+    model_path = os.path.join(models_dir, model_name)
+    version = model_version(model_path)
+    directory = lod_dir(models_dir, model_name)
+    manifest_path = os.path.join(directory, 'lods.json')
+
+    with _lock_for(directory):
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == version and all(os.path.exists(l['path']) for l in manifest['levels']):
+                record_cache_lookup('lod', True)
+                return manifest
+        record_cache_lookup('lod', False)
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+        levels = [{"level": 0, "ratio": 1.0, "triangles": count_triangles(model_path), "path": model_path}]
+        for level, ratio in enumerate(LOD_RATIOS[1:], start=1):
+            path = os.path.join(directory, f"lod{level}.glb")
+            triangles = generate_lod(model_path, path, ratio)
+            levels.append({"level": level, "ratio": ratio, "triangles": triangles, "path": path})
+
+        manifest = {"version": version, "levels": levels}
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        return manifest
+
+
+def select_lod(manifest, lod=None, max_triangles=None):
+    """
+    Pick a level from a manifest by explicit level or triangle budget
+    With a budget, the most detailed level that fits is chosen (or the coarsest)
+    """
+    levels = manifest['levels']
+    if lod is not None:
+        return levels[max(0, min(lod, len(levels) - 1))]
+    if max_triangles is not None:
+        for level in levels:
+            if level['triangles'] <= max_triangles:
+                return level
+        return levels[-1]
+    return levels[0]
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""
+Vectorized mesh optimization for GLB files
+Welds duplicate vertices, spatially sorts triangles and vertices for
+locality, prunes unused attributes and quantizes vertex data with
+KHR_mesh_quantization
+"""
+
+import os
+from collections import Counter
+
+import numpy as np
+
+from glb_reader import GLBFile
+from gltf_arrays import GLBRepacker, MODE_TRIANGLES, read_indices, add_extension
+
+# Bits per axis of the Morton code used to sort triangles spatially
+MORTON_BITS = 10
+
+
+def _spread_bits(values):
+    """Interleave two zero bits between each of the low 10 bits (for 3D Morton codes)"""
+    values = values.astype(np.uint32) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points):
+    """30-bit Morton codes of points normalized to their bounding box"""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-12)
+    grid = ((points - lo) / extent * ((1 << MORTON_BITS) - 1)).astype(np.uint32)
+    return (_spread_bits(grid[:, 0]) << 2) | (_spread_bits(grid[:, 1]) << 1) | _spread_bits(grid[:, 2])
+
+
+def weld_vertices(attributes, indices):
+    """
+    Merge vertices whose attributes are bit-identical
+
+    attributes maps names to (count, components) arrays. Returns
+    (welded_attributes, remapped_indices); welded vertices keep the order of
+    their first occurrence.
+    """
+    count = next(iter(attributes.values())).shape[0]
+    if not count or not len(indices):
+        return attributes, indices
+
+    # One row of raw bytes per vertex covering every attribute
+    rows = np.concatenate(
+        [np.ascontiguousarray(data).view(np.uint8).reshape(count, -1) for data in attributes.values()],
+        axis=1
+    )
+    keys = np.ascontiguousarray(rows).view(np.dtype((np.void, rows.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # Renumber unique vertices by first occurrence to preserve locality
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    keep = first[order]
+
+    welded = {name: np.ascontiguousarray(data)[keep] for name, data in attributes.items()}
+    return welded, rank[inverse.ravel()][indices].astype(np.uint32)
+
+
+def reorder_for_locality(attributes, indices, mode=MODE_TRIANGLES):
+    """
+    Spatially sort triangles and vertices for fetch locality
+
+    Triangles are sorted along a Morton curve through their centroids, then
+    vertices are renumbered in order of first use (dropping unused ones).
+    Nearby triangles end up close in the index buffer, which helps the
+    vertex cache, but this is not a dedicated cache optimizer (Forsyth or
+    Tipsify).
+    """
+    if mode == MODE_TRIANGLES and len(indices) >= 3 and 'POSITION' in attributes:
+        triangles = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+        positions = attributes['POSITION'].astype(np.float32)
+        centroids = positions[triangles].mean(axis=1)
+        triangles = triangles[np.argsort(morton_codes(centroids), kind='stable')]
+        indices = triangles.ravel()
+
+    used, first = np.unique(indices, return_index=True)
+    order = used[np.argsort(first, kind='stable')]
+    remap = np.zeros(max(int(indices.max()) + 1 if len(indices) else 0, 1), dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+
+    reordered = {name: np.ascontiguousarray(data)[order] for name, data in attributes.items()}
+    return reordered, remap[indices]
+
+
+def used_texcoords(gltf, material_index):
+    """Texture coordinate sets referenced by a material's textures"""
+    used = set()
+
+    def visit(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key.endswith('Texture') and isinstance(item, dict) and 'index' in item:
+                    used.add(item.get('texCoord', 0))
+                    # KHR_texture_transform may read a different set than the texture info
+                    transform = item.get('extensions', {}).get('KHR_texture_transform', {})
+                    if 'texCoord' in transform:
+                        used.add(transform['texCoord'])
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+
+    if material_index is not None:
+        visit(gltf.get('materials', [])[material_index])
+    return used
+
+
+def prune_attributes(gltf, primitive):
+    """
+    Drop texture coordinates and tangents the primitive's material never reads
+    Only sets above the highest one read are dropped, since TEXCOORD_n
+    indices must start at 0 and stay consecutive
+    """
+    attributes = primitive.get('attributes', {})
+    material_index = primitive.get('material')
+    last_used = max(used_texcoords(gltf, material_index), default=-1)
+    material = gltf['materials'][material_index] if material_index is not None else {}
+
+    pruned = []
+    for name in list(attributes):
+        if name.startswith('TEXCOORD_') and int(name.split('_')[1]) > last_used:
+            pruned.append(name)
+        elif name == 'TANGENT' and 'normalTexture' not in material:
+            pruned.append(name)
+    for name in pruned:
+        del attributes[name]
+    return pruned
+
+
+def _primitive_accessors(primitive):
+    accessors = list(primitive.get('attributes', {}).values())
+    for target in primitive.get('targets', []):
+        accessors.extend(target.values())
+    if 'indices' in primitive:
+        accessors.append(primitive['indices'])
+    return accessors
+
+
+def _index_array(indices, vertex_count):
+    return indices.astype(np.uint16 if vertex_count <= 0xFFFF else np.uint32)
+
+
+def optimize_primitive(repacker, primitive, weld=True, reorder=True):
+    """Weld and/or reorder one primitive in place; returns (vertices_before, vertices_after)"""
+    gltf = repacker.gltf
+    attributes = primitive['attributes']
+    names = list(attributes)
+    target_names = [list(target) for target in primitive.get('targets', [])]
+
+    # Morph targets are welded together with the base attributes
+    arrays = {name: repacker.accessor(attributes[name]) for name in names}
+    for t, target in enumerate(primitive.get('targets', [])):
+        for name in target_names[t]:
+            arrays[f"target{t}:{name}"] = repacker.accessor(target[name])
+
+    vertices_before = gltf['accessors'][attributes['POSITION']]['count']
+    indices = read_indices(repacker.source, repacker.bin, primitive) if 'indices' in primitive \
+        else np.arange(vertices_before, dtype=np.uint32)
+
+    if weld:
+        arrays, indices = weld_vertices(arrays, indices)
+    if reorder:
+        arrays, indices = reorder_for_locality(arrays, indices, primitive.get('mode', MODE_TRIANGLES))
+    vertices_after = arrays['POSITION'].shape[0]
+
+    for name in names:
+        accessor = gltf['accessors'][attributes[name]]
+        repacker.set_accessor(attributes[name], arrays[name], normalized=accessor.get('normalized', False))
+    for t, target in enumerate(primitive.get('targets', [])):
+        for name in target_names[t]:
+            repacker.set_accessor(target[name], arrays[f"target{t}:{name}"])
+
+    index_data = _index_array(indices, vertices_after)
+    if 'indices' in primitive:
+        repacker.set_accessor(primitive['indices'], index_data)
+    else:
+        primitive['indices'] = repacker.add_accessor(index_data)
+    return vertices_before, vertices_after
+
+
+def _quantize_unit(values, dtype):
+    """Quantize values in [-1, 1] (signed) or [0, 1] (unsigned) to a normalized integer type"""
+    limit = np.iinfo(dtype).max
+    low = -1.0 if np.iinfo(dtype).min < 0 else 0.0
+    return np.round(np.clip(values, low, 1.0) * limit).astype(dtype)
+
+
+def quantize_attributes(repacker, done):
+    """
+    Quantize normals and tangents to int8 and [0, 1] texture coordinates to
+    uint16 (all normalized). Returns True if anything was quantized
+    """
+    gltf = repacker.gltf
+    quantized = False
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            if primitive.get('targets'):
+                continue
+            for name, index in primitive['attributes'].items():
+                accessor = gltf['accessors'][index]
+                if index in done or accessor['componentType'] != 5126:
+                    continue
+                data = repacker.accessor(index)
+                if name in ('NORMAL', 'TANGENT'):
+                    repacker.set_accessor(index, _quantize_unit(data, np.int8), normalized=True)
+                elif name.startswith('TEXCOORD_') and data.size and data.min() >= 0.0 and data.max() <= 1.0:
+                    repacker.set_accessor(index, _quantize_unit(data, np.uint16), normalized=True)
+                else:
+                    continue
+                done.add(index)
+                quantized = True
+    return quantized
+
+
+def quantize_positions(repacker):
+    """
+    Quantize mesh positions to normalized int16 around each mesh's bounds
+
+    Dequantization moves into a new child node (translation = bounds center,
+    uniform scale = half extent), so this is skipped for skinned, morphed or
+    instanced meshes and for position data shared between meshes.
+    Returns the number of meshes quantized
+    """
+    gltf = repacker.gltf
+    nodes = gltf.get('nodes', [])
+
+    position_users = Counter()
+    for mesh in gltf.get('meshes', []):
+        for index in {p['attributes'].get('POSITION') for p in mesh.get('primitives', [])}:
+            position_users[index] += 1
+
+    blocked = set()
+    for node in nodes:
+        if 'mesh' in node and ('skin' in node or 'EXT_mesh_gpu_instancing' in node.get('extensions', {})):
+            blocked.add(node['mesh'])
+
+    quantized = 0
+    for mesh_index, mesh in enumerate(gltf.get('meshes', [])):
+        primitives = mesh.get('primitives', [])
+        position_indices = sorted({p['attributes'].get('POSITION') for p in primitives})
+        if (mesh_index in blocked or not primitives or None in position_indices
+                or any(p.get('targets') for p in primitives)
+                or any(position_users[i] > 1 for i in position_indices)
+                or any(gltf['accessors'][i]['componentType'] != 5126 for i in position_indices)):
+            continue
+
+        positions = {i: repacker.accessor(i).astype(np.float64) for i in position_indices}
+        stacked = np.concatenate(list(positions.values()))
+        if not stacked.size:
+            continue
+        lo, hi = stacked.min(axis=0), stacked.max(axis=0)
+        center = (lo + hi) / 2
+        scale = float((hi - lo).max() / 2) or 1.0
+
+        for index, data in positions.items():
+            repacker.set_accessor(index, _quantize_unit((data - center) / scale, np.int16), normalized=True)
+
+        # Move the mesh to a child node that carries the dequantization transform
+        for node in list(nodes):
+            if node.get('mesh') != mesh_index:
+                continue
+            nodes.append({
+                "name": f"{node.get('name', 'node')}_quantized",
+                "mesh": mesh_index,
+                "translation": center.tolist(),
+                "scale": [scale, scale, scale]
+            })
+            del node['mesh']
+            node.setdefault('children', []).append(len(nodes) - 1)
+        quantized += 1
+    return quantized
+
+
+def optimize_glb(input_path, output_path, weld=True, reorder=True, prune=True, quantize=True):
+    """
+    Optimize the meshes of a GLB file and write the result to output_path
+    Returns a report with before/after byte sizes and vertex counts
+    """
+    bytes_before = os.path.getsize(input_path)
+    report = {
+        "bytes_before": bytes_before,
+        "vertices_before": 0,
+        "vertices_after": 0,
+        "primitives_optimized": 0,
+        "attributes_pruned": 0,
+        "meshes_position_quantized": 0,
+        "quantized": False
+    }
+
+    with GLBFile(input_path) as glb:
+        repacker = GLBRepacker(glb.json, glb.bin)
+        gltf = repacker.gltf
+
+        # Primitives whose accessors are shared cannot be rewritten in isolation
+        accessor_users = Counter()
+        for mesh in gltf.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                accessor_users.update(set(_primitive_accessors(primitive)))
+
+        for mesh in gltf.get('meshes', []):
+            for primitive in mesh.get('primitives', []):
+                if prune:
+                    report["attributes_pruned"] += len(prune_attributes(gltf, primitive))
+                exclusive = all(accessor_users[i] == 1 for i in _primitive_accessors(primitive))
+                if (weld or reorder) and exclusive and 'POSITION' in primitive.get('attributes', {}):
+                    before, after = optimize_primitive(repacker, primitive, weld, reorder)
+                    report["vertices_before"] += before
+                    report["vertices_after"] += after
+                    report["primitives_optimized"] += 1
+
+        if quantize:
+            attributes_quantized = quantize_attributes(repacker, set())
+            meshes_quantized = quantize_positions(repacker)
+            report["meshes_position_quantized"] = meshes_quantized
+            if attributes_quantized or meshes_quantized:
+                add_extension(gltf, 'KHR_mesh_quantization', required=True)
+                report["quantized"] = True
+
+        repacker.write(output_path)
+
+    report["bytes_after"] = os.path.getsize(output_path)
+    report["bytes_saved"] = bytes_before - report["bytes_after"]
+    return report
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+"""
+Prometheus metrics for the server
+A small self-contained registry (counters, gauges and histograms with
+labels, plus callbacks sampled at scrape time) rendered in the Prometheus
+text exposition format, and an ASGI middleware timing every request by
+route
+"""
+
+import math
+import time
+import bisect
+import threading
+
+from starlette.routing import Match
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latencies (seconds); model operations take much longer
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPERATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Registry:
+    """Metrics and scrape-time collectors, rendered together by render()"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Register a callable sampled on every scrape
+        It returns an iterable of (name, type, help, samples) families where
+        samples are (labels dict, value) pairs
+        """
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # A broken collector must not take the whole scrape down
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base class: a named family of values keyed by label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or '(none)'}")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames)}")
+
+    def _labels(self, key):
+        return list(zip(self.labelnames, key))
+
+    def value(self, **labels):
+        """Current value for a label set (0 if never observed)"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', self._labels(key), value) for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; each label set keeps bucket counts, a sum and a count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the wall time of its block"""
+        return _Timer(self, labels)
+
+    def value(self, **labels):
+        """(count, sum) for a label set"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', labels + [('le', _format_value(bound))], cumulative))
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, count))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# HTTP
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests by method, route and status code',
+                        ('method', 'route', 'status'))
+HTTP_REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'HTTP request latency by method and route',
+                                 ('method', 'route'))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests currently being served, by route', ('route',))
+HTTP_RESPONSE_BYTES = Counter('http_response_bytes_total', 'HTTP response body bytes sent, by route', ('route',))
+WEBSOCKETS_OPEN = Gauge('websocket_connections', 'Open WebSocket connections, by route', ('route',))
+
+# Blender worker subprocesses
+BLENDER_JOBS = Counter('blender_jobs_total', 'Blender worker jobs by operation and outcome (ok, error, worker_error)',
+                       ('operation', 'outcome'))
+BLENDER_JOB_SECONDS = Histogram('blender_job_duration_seconds', 'Wall time of Blender worker jobs by operation',
+                                ('operation',), buckets=OPERATION_BUCKETS)
+BLENDER_WORKER_EXITS = Counter('blender_worker_exits_total',
+                               'Retired Blender worker processes by last operation, exit code and reason',
+                               ('operation', 'exit_code', 'reason'))
+
+# Model pipeline
+MODEL_OPERATION_ERRORS = Counter('model_operation_errors_total', 'Failed model operations by operation and backend',
+                                 ('operation', 'backend'))
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Request body bytes received by uploads and ingest, by source',
+                       ('source',))
+MODEL_BYTES_PRODUCED = Counter('model_bytes_produced_total', 'Bytes of model files written, by operation',
+                               ('operation',))
+CACHE_LOOKUPS = Counter('cache_lookups_total', 'Cache lookups by cache and result (hit or miss)', ('cache', 'result'))
+
+# Hot-path sections (see profiler.profile_section)
+SECTION_SECONDS = Histogram('section_duration_seconds', 'Wall time of instrumented hot-path sections', ('section',))
+
+
+def cache_hit_ratios():
+    """Collector: hit ratio of every cache with lookups so far"""
+    caches = sorted({labels[0][1] for _, labels, _ in CACHE_LOOKUPS.samples()})
+    samples = []
+    for cache in caches:
+        hits = CACHE_LOOKUPS.value(cache=cache, result='hit')
+        lookups = hits + CACHE_LOOKUPS.value(cache=cache, result='miss')
+        samples.append(({"cache": cache}, hits / lookups if lookups else 0.0))
+    return [('cache_hit_ratio', 'gauge', 'Fraction of cache lookups that were hits, by cache', samples)]
+
+
+REGISTRY.add_collector(cache_hit_ratios)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts, latency, in-flight
+    requests and response bytes
+
+    Requests are labelled with the path template of the route they match
+    (e.g. /model_info/{model_name}), so label values stay bounded. With
+    server_timing set, responses carry a Server-Timing header with the time
+    the app took to start the response.
+    """
+
+    def __init__(self, app, routes=None, server_timing=False):
+        self.app = app
+        self.routes = routes if routes is not None else []
+        self.server_timing = server_timing
+
+    def route_label(self, scope):
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'websocket':
+            route = self.route_label(scope)
+            WEBSOCKETS_OPEN.inc(route=route)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                WEBSOCKETS_OPEN.dec(route=route)
+            return
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        route = self.route_label(scope)
+        start = time.perf_counter()
+        status = 500
+        body_bytes = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, body_bytes
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', f'app;dur={elapsed_ms:.2f}'.encode('latin-1')))
+                    message = {**message, 'headers': headers}
+            elif message['type'] == 'http.response.body':
+                body_bytes += len(message.get('body', b''))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(route=route)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_IN_FLIGHT.dec(route=route)
+            HTTP_REQUESTS.inc(method=scope['method'], route=route, status=status)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope['method'], route=route)
+            HTTP_RESPONSE_BYTES.inc(body_bytes, route=route)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Persistent LRU cache for model metadata
+Entries are keyed by the file's path, size and modification time, so a
+rewritten file never serves stale metadata
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+from metrics import record_cache_lookup
+
+DEFAULT_CACHE_PATH = os.path.join('cache', 'model_info.json')
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def file_fingerprint(path):
+    """Return the (path, size, mtime) fingerprint of a file, or None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class ModelInfoCache:
+    """
+    LRU cache of model info dictionaries, persisted to a JSON file
+
+    Lookups are a dictionary hit plus one os.stat() call; the cache file is
+    rewritten only when an entry is added or removed.
+    """
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load persisted entries from disk, ignoring a missing or corrupt file"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            for entry in data.get('entries', []):
+                key = (entry['path'], entry['size'], entry['mtime_ns'])
+                self._entries[key] = entry['info']
+        except Exception as e:
+            print(f"Error loading model info cache: {str(e)}")
+            self._entries.clear()
+
+    def _save(self):
+        """Atomically write the cache to disk (caller holds the lock)"""
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            entries = [
+                {"path": path, "size": size, "mtime_ns": mtime_ns, "info": info}
+                for (path, size, mtime_ns), info in self._entries.items()
+            ]
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"entries": entries}, f)
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            print(f"Error saving model info cache: {str(e)}")
+
+    def get(self, path):
+        """Return the cached info for a file, or None if missing or stale"""
+        key = file_fingerprint(path)
+        with self._lock:
+            if key is None or key not in self._entries:
+                self.misses += 1
+                record_cache_lookup('model_info', False)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_cache_lookup('model_info', True)
+            return dict(self._entries[key])
+
+    def put(self, path, info):
+        """Store the info for a file under its current fingerprint"""
+        key = file_fingerprint(path)
+        if key is None:
+            return
+        with self._lock:
+            # Drop entries for older versions of the same file
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[old_key]
+            self._entries[key] = dict(info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, path):
+        """Remove every cached entry for a file path"""
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == abs_path]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._save()
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
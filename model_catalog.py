@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+"""
+Model catalog index
+One entry per file in the models directory with its category, size,
+content hash, geometry statistics and animation count. The directory is
+scanned once at startup and then kept current by refresh()/remove() hooks
+wherever the server writes a model, so listing models never touches the
+disk
+"""
+
+import os
+import json
+import threading
+
+from glb_reader import GLBError, read_gltf_json
+from model_cache import file_fingerprint
+from model_serving import content_hash
+from model_stats import geometry_stats
+
+DEFAULT_CATALOG_PATH = os.path.join('cache', 'model_catalog.json')
+
+# Bumped when entries gain fields, so a persisted index is rebuilt
+CATALOG_VERSION = 2
+
+MODEL_FORMATS = ('.glb', '.gltf', '.fbx', '.obj', '.stl', '.dae', '.blend')
+
+# Categories guessed from words in a model's filename; the first match wins
+CATEGORY_KEYWORDS = {
+    "aircraft": ("f16", "f35", "b2", "jet", "plane", "aircraft", "airliner", "helicopter", "drone", "uav"),
+    "vehicles": ("car", "truck", "tank", "train", "vehicle", "bus", "ship", "boat"),
+    "city": ("city", "new_york", "tokyo", "london", "building", "terrain")
+}
+DEFAULT_CATEGORY = "other"
+
+
+def guess_category(model_name):
+    """Category of a model from keywords in its filename"""
+    stem = os.path.splitext(model_name)[0].lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in stem for keyword in keywords):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def describe_model(path, category):
+    """Catalog entry for a model file; glTF statistics are None for other formats"""
+    name = os.path.basename(path)
+    file_ext = os.path.splitext(name)[1].lower()
+    entry = {
+        "name": name,
+        "category": category,
+        "format": file_ext[1:].upper(),
+        "size_bytes": os.path.getsize(path),
+        "sha256": content_hash(path),
+        "triangles": None,
+        "vertices": None,
+        "bbox": None,
+        "gpu_memory_bytes": None,
+        "animations": None
+    }
+    if file_ext in ('.glb', '.gltf'):
+        try:
+            stats = geometry_stats(path)
+            entry["triangles"] = stats["triangles"]
+            entry["vertices"] = stats["vertices"]
+            entry["bbox"] = stats["bbox"]
+            entry["gpu_memory_bytes"] = stats["gpu_memory_bytes"]["total"]
+            entry["animations"] = len(read_gltf_json(path).get('animations', []))
+        except (GLBError, KeyError, IndexError, TypeError, ValueError) as e:
+            entry["error"] = str(e)
+    return entry
+
+
+class ModelCatalog:
+    """
+    In-memory index of the models directory, persisted to a JSON file
+
+    Entries are keyed by filename and remember the (size, mtime) they were
+    built from, so the startup scan only re-reads files that changed while
+    the server was down.
+    """
+
+    def __init__(self, models_dir, catalog_path=DEFAULT_CATALOG_PATH):
+        self.models_dir = models_dir
+        self.catalog_path = catalog_path
+        self._entries = {}
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load the persisted index, ignoring a missing or corrupt file"""
+        if not self.catalog_path or not os.path.exists(self.catalog_path):
+            return
+        try:
+            with open(self.catalog_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != CATALOG_VERSION:
+                return
+            for item in data.get('entries', []):
+                name = item['entry']['name']
+                self._entries[name] = item['entry']
+                self._fingerprints[name] = (item['size'], item['mtime_ns'])
+        except Exception as e:
+            print(f"Error loading model catalog: {str(e)}")
+            self._entries.clear()
+            self._fingerprints.clear()
+
+    def _save(self):
+        """Atomically write the index to disk (caller holds the lock)"""
+        if not self.catalog_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.catalog_path) or '.', exist_ok=True)
+            entries = [
+                {"size": size, "mtime_ns": mtime_ns, "entry": self._entries[name]}
+                for name, (size, mtime_ns) in self._fingerprints.items()
+            ]
+            temp_path = f"{self.catalog_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"version": CATALOG_VERSION, "entries": entries}, f)
+            os.replace(temp_path, self.catalog_path)
+        except Exception as e:
+            print(f"Error saving model catalog: {str(e)}")
+
+    def _path(self, model_name):
+        return os.path.join(self.models_dir, model_name)
+
+    def _index(self, model_name, category=None):
+        """Build the entry for one file; returns (entry, fingerprint) or None if it is gone"""
+        path = self._path(model_name)
+        fingerprint = file_fingerprint(path)
+        if fingerprint is None or not os.path.isfile(path):
+            return None
+        with self._lock:
+            previous = self._entries.get(model_name)
+            if previous is not None and self._fingerprints.get(model_name) == fingerprint[1:] and (
+                    category is None or previous["category"] == category):
+                return previous, fingerprint[1:]
+        if category is None:
+            category = previous["category"] if previous else guess_category(model_name)
+        return describe_model(path, category), fingerprint[1:]
+
+    def scan(self):
+        """Reconcile the index with the models directory; returns the number of entries"""
+        names = []
+        if os.path.isdir(self.models_dir):
+            names = [
+                name for name in sorted(os.listdir(self.models_dir))
+                if not name.startswith('.') and os.path.splitext(name)[1].lower() in MODEL_FORMATS
+            ]
+        indexed = {}
+        for name in names:
+            result = self._index(name)
+            if result is not None:
+                indexed[name] = result
+        with self._lock:
+            self._entries = {name: entry for name, (entry, _) in indexed.items()}
+            self._fingerprints = {name: fingerprint for name, (_, fingerprint) in indexed.items()}
+            self._save()
+            return len(self._entries)
+
+    def refresh(self, model_name, category=None):
+        """Re-index one model after it was written (or drop it if it no longer exists)"""
+        if os.path.splitext(model_name)[1].lower() not in MODEL_FORMATS:
+            return None
+        result = self._index(model_name, category)
+        if result is None:
+            self.remove(model_name)
+            return None
+        entry, fingerprint = result
+        with self._lock:
+            self._entries[model_name] = entry
+            self._fingerprints[model_name] = fingerprint
+            self._save()
+        return dict(entry)
+
+    def remove(self, model_name):
+        with self._lock:
+            if self._entries.pop(model_name, None) is not None:
+                del self._fingerprints[model_name]
+                self._save()
+
+    def get(self, model_name):
+        with self._lock:
+            entry = self._entries.get(model_name)
+            return dict(entry) if entry else None
+
+    def categories(self):
+        """Number of models per category"""
+        counts = {}
+        with self._lock:
+            for entry in self._entries.values():
+                counts[entry["category"]] = counts.get(entry["category"], 0) + 1
+        return counts
+
+    def query(self, category=None, model_format=None, animated=None, min_triangles=None,
+              max_triangles=None, search=None, cursor=None, limit=None):
+        """
+        Entries matching every given filter, ordered by name
+        Returns (entries, next_cursor); the cursor is the last name returned
+        """
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry["name"])
+
+        def matches(entry):
+            if category is not None and entry["category"] != category:
+                return False
+            if model_format is not None and entry["format"] != model_format.upper():
+                return False
+            if animated is not None and bool(entry["animations"]) != animated:
+                return False
+            triangles = entry["triangles"]
+            if min_triangles is not None and (triangles is None or triangles < min_triangles):
+                return False
+            if max_triangles is not None and (triangles is None or triangles > max_triangles):
+                return False
+            if search and search.lower() not in entry["name"].lower():
+                return False
+            return cursor is None or entry["name"] > cursor
+
+        matched = [dict(entry) for entry in entries if matches(entry)]
+        if limit is None or len(matched) <= limit:
+            return matched, None
+        return matched[:limit], matched[limit - 1]["name"]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+HTTP delivery of model files
+Strong ETags from content hashes, content-hashed immutable URLs, single
+byte-range requests and gzip/brotli variants precomputed at upload time
+"""
+
+import os
+import gzip
+import shutil
+import hashlib
+import threading
+
+from model_cache import file_fingerprint
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_DIR = os.path.join('cache', 'compressed')
+READ_CHUNK_SIZE = 256 * 1024
+
+# Cache lifetime for content-hashed URLs, whose content can never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_hash_lock = threading.Lock()
+_hashes = {}
+
+
+def content_hash(path):
+    """
+    SHA-256 of a file's content
+    Memoized by (path, size, mtime) so unchanged files are hashed once
+    """
+    key = file_fingerprint(path)
+    if key is None:
+        return None
+    with _hash_lock:
+        if key in _hashes:
+            return _hashes[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    with _hash_lock:
+        # Drop hashes of older versions of the same file
+        for old_key in [k for k in _hashes if k[0] == key[0]]:
+            del _hashes[old_key]
+        _hashes[key] = digest.hexdigest()
+        return _hashes[key]
+
+
+def model_version(path):
+    """Short content version used in immutable URLs"""
+    digest = content_hash(path)
+    return digest[:16] if digest else None
+
+
+def versioned_url(digest, model_name):
+    """Content-hashed URL for a model with a known SHA-256"""
+    return f"/model_files/{digest[:16]}/{model_name}"
+
+
+def hashed_url(models_dir, model_name):
+    """Content-hashed URL for a model, or None if the file does not exist"""
+    digest = content_hash(os.path.join(models_dir, model_name))
+    if digest is None:
+        return None
+    return versioned_url(digest, model_name)
+
+
+def variant_path(digest, encoding):
+    """Path of the precompressed variant of a file with the given content hash"""
+    suffix = {'br': '.br', 'gzip': '.gz'}[encoding]
+    return os.path.join(COMPRESSED_DIR, f"{digest}{suffix}")
+
+
+def available_encodings():
+    """Encodings we can precompute, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def precompress_model(path):
+    """
+    Write gzip (and brotli, if installed) variants of a model once
+    Variants are keyed by content hash, so identical files share them
+    """
+    digest = content_hash(path)
+    if digest is None:
+        return []
+
+    os.makedirs(COMPRESSED_DIR, exist_ok=True)
+    written = []
+    for encoding in available_encodings():
+        target = variant_path(digest, encoding)
+        if os.path.exists(target):
+            continue
+        temp_path = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            if encoding == 'gzip':
+                with open(path, 'rb') as src, gzip.open(temp_path, 'wb', compresslevel=9) as dst:
+                    shutil.copyfileobj(src, dst, READ_CHUNK_SIZE)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                with open(path, 'rb') as src, open(temp_path, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(READ_CHUNK_SIZE), b''):
+                        dst.write(compressor.process(chunk))
+                    dst.write(compressor.finish())
+            # Keep a variant only if it actually saves bytes
+            if os.path.getsize(temp_path) < os.path.getsize(path):
+                os.replace(temp_path, target)
+                written.append(encoding)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return written
+
+
+def choose_variant(path, accept_encoding):
+    """
+    Pick a precompressed variant acceptable to the client
+    Returns (encoding, variant_path) or (None, path)
+    """
+    digest = content_hash(path)
+    accepted = {
+        part.split(';')[0].strip().lower()
+        for part in (accept_encoding or '').split(',')
+        if part.strip() and not part.strip().endswith(';q=0')
+    }
+    for encoding in available_encodings():
+        if encoding in accepted:
+            candidate = variant_path(digest, encoding)
+            if os.path.exists(candidate):
+                return encoding, candidate
+    return None, path
+
+
+def parse_range(range_header, size):
+    """
+    Parse a single 'bytes=' range against a file size
+    Returns (start, end) inclusive, or None for a missing, unsupported or
+    invalid range (which is ignored, so the whole file is served). Raises
+    ValueError only for a valid range that cannot be satisfied
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    spec = range_header[len('bytes='):].strip()
+    if ',' in spec:
+        # Multipart ranges are not supported; serve the whole file
+        return None
+
+    start_text, dash, end_text = spec.partition('-')
+    if not dash or not all(text == '' or (text.isascii() and text.isdigit()) for text in (start_text, end_text)):
+        return None
+    if start_text == '':
+        # Suffix range: last N bytes
+        if end_text == '':
+            return None
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError(f"Range not satisfiable: {range_header}")
+        return max(0, size - length), size - 1
+
+    start = int(start_text)
+    if end_text and int(end_text) < start:
+        return None
+    if start >= size:
+        raise ValueError(f"Range not satisfiable: {range_header}")
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    return start, end
+
+
+def iter_file_range(path, start, end, chunk_size=READ_CHUNK_SIZE):
+    """Yield the bytes of a file between start and end (inclusive)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
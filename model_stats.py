@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+Geometry statistics and budgets for GLB models
+Per-mesh triangle and vertex counts, local and scene bounding boxes and an
+estimate of the GPU memory a model needs for vertex, index and texture
+data, computed from accessor metadata (accessor data is only read when a
+POSITION accessor has no usable bounds)
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from glb_reader import GLBFile, read_gltf_json
+from gltf_arrays import COMPONENT_DTYPES, MODE_TRIANGLES, TYPE_SIZES, accessor_usage, read_accessor_float
+from lod import generate_lod
+from mesh_optimize import optimize_glb
+from texture_optimize import optimize_textures, texture_support
+
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+COMPONENT_FLOAT = 5126
+
+# Uploaded textures are RGBA8 with a full mip chain (about 4/3 of the base level)
+TEXTURE_BYTES_PER_PIXEL = 4
+MIPMAP_FACTOR = 4 / 3
+
+BUDGET_ACTIONS = ('reject', 'optimize', 'allow')
+
+
+def image_dimensions(data):
+    """(width, height) from a PNG, JPEG or WebP header, or None if unrecognized"""
+    data = bytes(data[:64 * 1024])
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        return None
+    if data[:2] == b'\xff\xd8':
+        # Walk JPEG segments to the first start-of-frame marker
+        offset = 2
+        while offset + 9 < len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def _triangle_count(primitive, accessors):
+    mode = primitive.get('mode', MODE_TRIANGLES)
+    if 'indices' in primitive:
+        count = accessors[primitive['indices']]['count']
+    elif 'POSITION' in primitive.get('attributes', {}):
+        count = accessors[primitive['attributes']['POSITION']]['count']
+    else:
+        return 0
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(0, count - 2)
+    return 0
+
+
+def _position_bounds(gltf, bin_data, index):
+    """(min, max) of a POSITION accessor in model units, or None if unknown"""
+    accessor = gltf['accessors'][index]
+    if accessor['componentType'] == COMPONENT_FLOAT and 'min' in accessor and 'max' in accessor:
+        return np.array(accessor['min'], dtype=np.float64), np.array(accessor['max'], dtype=np.float64)
+    if bin_data is None or not accessor['count']:
+        return None
+    # Quantized (or unbounded) positions: bounds of the dequantized data
+    points = read_accessor_float(gltf, bin_data, index)
+    return points.min(axis=0).astype(np.float64), points.max(axis=0).astype(np.float64)
+
+
+def node_matrix(node):
+    """Local 4x4 transform of a node"""
+    if 'matrix' in node:
+        return np.array(node['matrix'], dtype=np.float64).reshape(4, 4).T
+    x, y, z, w = node.get('rotation', [0.0, 0.0, 0.0, 1.0])
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.get('scale', [1.0, 1.0, 1.0]))
+    matrix[:3, 3] = node.get('translation', [0.0, 0.0, 0.0])
+    return matrix
+
+
+def world_matrices(gltf):
+    """World matrix of every node reachable from the default scene, by node index"""
+    nodes = gltf.get('nodes', [])
+    scenes = gltf.get('scenes', [])
+    if scenes:
+        roots = scenes[gltf.get('scene', 0)].get('nodes', [])
+    else:
+        children = {child for node in nodes for child in node.get('children', [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    matrices = {}
+    stack = [(root, np.eye(4)) for root in roots]
+    while stack:
+        index, parent = stack.pop()
+        if index in matrices or index >= len(nodes):
+            continue
+        matrices[index] = parent @ node_matrix(nodes[index])
+        stack.extend((child, matrices[index]) for child in nodes[index].get('children', []))
+    return matrices
+
+
+def _mesh_instances(gltf):
+    """(mesh index, world matrix, instance count) for every node drawing a mesh in the default scene"""
+    nodes = gltf.get('nodes', [])
+    instances = []
+    for index, world in world_matrices(gltf).items():
+        node = nodes[index]
+        if 'mesh' in node:
+            instancing = node.get('extensions', {}).get('EXT_mesh_gpu_instancing', {})
+            attributes = instancing.get('attributes', {})
+            count = gltf['accessors'][next(iter(attributes.values()))]['count'] if attributes else 1
+            instances.append((node['mesh'], world, count))
+    return instances
+
+
+def _bbox(lo, hi):
+    return {"min": [float(v) for v in lo], "max": [float(v) for v in hi]}
+
+
+def _gltf_stats(gltf, bin_data, image_bytes):
+    accessors = gltf.get('accessors', [])
+    meshes = []
+    local_bounds = []
+    for mesh_index, mesh in enumerate(gltf.get('meshes', [])):
+        positions = {p['attributes']['POSITION'] for p in mesh.get('primitives', [])
+                     if 'POSITION' in p.get('attributes', {})}
+        bounds = [b for b in (_position_bounds(gltf, bin_data, i) for i in sorted(positions)) if b is not None]
+        lo = np.min([b[0] for b in bounds], axis=0) if bounds else None
+        hi = np.max([b[1] for b in bounds], axis=0) if bounds else None
+        local_bounds.append((lo, hi))
+        meshes.append({
+            "name": mesh.get('name', f"Mesh_{mesh_index}"),
+            "primitives": len(mesh.get('primitives', [])),
+            "triangles": sum(_triangle_count(p, accessors) for p in mesh.get('primitives', [])),
+            "vertices": sum(accessors[i]['count'] for i in positions),
+            "instances": 0,
+            "bbox": _bbox(lo, hi) if bounds else None
+        })
+
+    # Scene bounds: the 8 corners of every instanced mesh box in world space
+    corners = []
+    for mesh_index, world, count in _mesh_instances(gltf):
+        if mesh_index >= len(meshes):
+            continue
+        meshes[mesh_index]["instances"] += count
+        lo, hi = local_bounds[mesh_index]
+        if lo is None:
+            continue
+        box = np.array(np.meshgrid(*zip(lo, hi), indexing='ij')).reshape(3, -1)
+        corners.append((world[:3, :3] @ box + world[:3, 3:4]).T)
+    scene_bbox = None
+    if corners:
+        corners = np.concatenate(corners)
+        scene_bbox = _bbox(corners.min(axis=0), corners.max(axis=0))
+
+    vertex, indices, _ = accessor_usage(gltf)
+    vertex_bytes = 0
+    for index in vertex:
+        accessor = accessors[index]
+        element = np.dtype(COMPONENT_DTYPES[accessor['componentType']]).itemsize * TYPE_SIZES[accessor['type']]
+        vertex_bytes += accessor['count'] * ((element + 3) // 4 * 4)
+    index_bytes = sum(
+        accessors[i]['count'] * np.dtype(COMPONENT_DTYPES[accessors[i]['componentType']]).itemsize for i in indices
+    )
+
+    textures = []
+    texture_bytes = 0
+    for image_index, image in enumerate(gltf.get('images', [])):
+        data = image_bytes(image)
+        size = image_dimensions(data) if data is not None else None
+        gpu_bytes = int(size[0] * size[1] * TEXTURE_BYTES_PER_PIXEL * MIPMAP_FACTOR) if size else None
+        texture_bytes += gpu_bytes or 0
+        textures.append({
+            "image": image_index,
+            "mime_type": image.get('mimeType'),
+            "width": size[0] if size else None,
+            "height": size[1] if size else None,
+            "gpu_bytes": gpu_bytes
+        })
+
+    return {
+        "triangles": sum(mesh["triangles"] for mesh in meshes),
+        "vertices": sum(mesh["vertices"] for mesh in meshes),
+        "rendered_triangles": sum(mesh["triangles"] * mesh["instances"] for mesh in meshes),
+        "bbox": scene_bbox,
+        "gpu_memory_bytes": {
+            "vertex": int(vertex_bytes),
+            "index": int(index_bytes),
+            "texture": texture_bytes,
+            "total": int(vertex_bytes + index_bytes + texture_bytes)
+        },
+        "meshes": meshes,
+        "textures": textures
+    }
+
+
+def geometry_stats(path):
+    """Geometry statistics of a GLB/glTF file"""
+    if os.path.splitext(path)[1].lower() != '.glb':
+        # External buffers and images are not read for .gltf files
+        return _gltf_stats(read_gltf_json(path), None, lambda image: None)
+
+    with GLBFile(path) as glb:
+        def image_bytes(image):
+            return glb.buffer_view_data(image['bufferView']) if 'bufferView' in image else None
+        return _gltf_stats(glb.json, glb.bin, image_bytes)
+
+
+def budget_violations(stats, max_triangles=None, max_gpu_bytes=None):
+    """Human-readable list of the budgets a model exceeds"""
+    violations = []
+    if max_triangles is not None and stats["rendered_triangles"] > max_triangles:
+        violations.append(f"{stats['rendered_triangles']} triangles exceeds the budget of {max_triangles}")
+    total = stats["gpu_memory_bytes"]["total"]
+    if max_gpu_bytes is not None and total > max_gpu_bytes:
+        violations.append(f"{total / 2 ** 20:.1f} MB of GPU memory exceeds the budget of {max_gpu_bytes / 2 ** 20:.1f} MB")
+    return violations
+
+
+def fit_to_budget(path, max_triangles=None, max_gpu_bytes=None):
+    """
+    Optimize a GLB in place until it fits the budgets, cheapest step first:
+    mesh optimization and quantization, then texture downscaling, then mesh
+    simplification. Returns a report including any violations that remain
+    """
+    stats = geometry_stats(path)
+    report = {"violations_before": budget_violations(stats, max_triangles, max_gpu_bytes), "steps": []}
+    if not report["violations_before"]:
+        report["violations_after"] = []
+        return report
+
+    optimize_glb(path, path)
+    report["steps"].append("optimize_meshes")
+    stats = geometry_stats(path)
+
+    max_size = max((max(t["width"] or 0, t["height"] or 0) for t in stats["textures"]), default=0)
+    while (max_gpu_bytes is not None and stats["gpu_memory_bytes"]["total"] > max_gpu_bytes
+           and stats["gpu_memory_bytes"]["texture"] and max_size > 256 and texture_support()):
+        max_size //= 2
+        if not optimize_textures(path, path, 'webp', max_size)["images_downscaled"]:
+            # Nothing left that this step can shrink
+            break
+        report["steps"].append(f"textures_{max_size}")
+        stats = geometry_stats(path)
+
+    if max_triangles is not None and stats["rendered_triangles"] > max_triangles:
+        generate_lod(path, path, max_triangles / stats["rendered_triangles"])
+        report["steps"].append("simplify")
+        stats = geometry_stats(path)
+
+    report["violations_after"] = budget_violations(stats, max_triangles, max_gpu_bytes)
+    return report
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Opt-in sampling profiler for hot paths
+A background thread periodically captures every thread's Python stack
+and counts them in collapsed-stack form ("outer;inner;leaf count", the
+input format of flamegraph tools). Code wrapped in profile_section() is
+timed into the section_duration_seconds histogram always, and tags the
+samples taken while it runs so a profile can be limited to hot paths
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from metrics import SECTION_SECONDS
+
+DEFAULT_INTERVAL = 0.005
+MAX_STACK_DEPTH = 64
+
+# Thread ident -> names of the sections it is currently inside
+_active_sections = {}
+
+
+@contextmanager
+def profile_section(name):
+    """Time a hot-path block and label profiler samples taken inside it"""
+    ident = threading.get_ident()
+    sections = _active_sections.setdefault(ident, [])
+    sections.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_SECONDS.observe(time.perf_counter() - start, section=name)
+        sections.pop()
+        if not sections:
+            _active_sections.pop(ident, None)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling sys._current_frames() on a thread
+
+    With all_threads off (the default) only threads inside a
+    profile_section() are sampled, so idle server threads do not swamp the
+    profile; stacks are then prefixed with the section names.
+    """
+
+    def __init__(self):
+        self.samples = Counter()
+        self.sample_count = 0
+        self.interval = DEFAULT_INTERVAL
+        self.all_threads = False
+        self.started_at = None
+        self.stopped_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=DEFAULT_INTERVAL, duration=None, all_threads=False):
+        """Start sampling (clearing earlier samples); returns False if already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.samples = Counter()
+            self.sample_count = 0
+            self.interval = interval
+            self.all_threads = all_threads
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True,
+                                            name='sampling-profiler')
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling; the samples stay available"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration):
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    def _sample(self):
+        own = threading.get_ident()
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            sections = _active_sections.get(ident)
+            if not sections and not self.all_threads:
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            names.reverse()
+            if sections:
+                names = [f"[{section}]" for section in list(sections)] + names
+            stacks.append(';'.join(names))
+        with self._lock:
+            self.samples.update(stacks)
+            self.sample_count += 1
+
+    def collapsed(self, limit=None):
+        """Collapsed stacks, most frequent first, one "stack count" per line"""
+        with self._lock:
+            stacks = self.samples.most_common(limit)
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_seconds": self.interval,
+                "all_threads": self.all_threads,
+                "sample_count": self.sample_count,
+                "distinct_stacks": len(self.samples),
+                "started_at": self.started_at,
+                "stopped_at": self.stopped_at
+            }
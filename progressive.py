@@ -0,0 +1,684 @@
+#!/usr/bin/env python
+"""
+Progressive packaging of GLB files
+A model is rewritten as one valid GLB whose binary chunk starts with a
+small skeleton section (vertex-clustered proxy geometry, animations, skins
+and meshes that cannot be streamed) followed by geometry chunks, one per
+spatial tile in priority order, each with the images it is the first to
+use. The manifest gives every section's byte range in the file and a glTF
+document that loads it, so a client can show the skeleton after one range
+request and stream the chunks in after it
+"""
+
+import os
+import sys
+import copy
+import json
+import math
+import argparse
+import threading
+
+import numpy as np
+
+from glb_reader import GLBError, GLBFile, GLB_HEADER_SIZE, CHUNK_HEADER_SIZE
+from glb_writer import BinaryBuilder, padding, write_glb
+from gltf_arrays import (
+    DTYPE_COMPONENTS, SIZE_TYPES, MODE_TRIANGLES, TARGET_ARRAY_BUFFER, TARGET_ELEMENT_ARRAY_BUFFER,
+    accessor_usage, read_accessor, read_accessor_float, read_indices, remap_accessor_refs
+)
+from metrics import record_cache_lookup
+from model_serving import model_version
+from model_stats import world_matrices
+
+PROGRESSIVE_DIR_NAME = '.progressive'
+
+# Bumped when the package layout changes, so packages are rebuilt
+PACKAGE_VERSION = 2
+
+# Proxy triangles for the whole model, spread over meshes by triangle share;
+# proxies never exceed MAX_PROXY_FRACTION of the streamed triangles, so small
+# models do not download their geometry twice
+DEFAULT_PROXY_TRIANGLES = 20000
+MAX_PROXY_FRACTION = 0.1
+MIN_PROXY_TRIANGLES = 12
+
+# Tiles per side are chosen so an average chunk holds about this much geometry
+DEFAULT_CHUNK_BYTES = 512 * 1024
+MAX_TILES_PER_SIDE = 16
+
+# Sections start on this boundary so every range is aligned for any component type
+SECTION_ALIGNMENT = 16
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def cluster_vertices(positions, triangles, target_triangles):
+    """
+    Vertex-clustering simplification to at most target_triangles triangles
+    Vertices are merged per grid cell (at their mean position) and the
+    grid is coarsened until the result fits (or is down to 2 cells per
+    side). Returns (points, triangles)
+    """
+    lo = positions.min(axis=0)
+    size = np.maximum(positions.max(axis=0) - lo, 1e-12)
+    cells = max(2, int(math.sqrt(max(target_triangles, 1) / 2)) + 1)
+    while True:
+        cell = np.minimum(((positions - lo) / size * cells).astype(np.int64), cells - 1)
+        keys = (cell[:, 0] * cells + cell[:, 1]) * cells + cell[:, 2]
+        unique_keys, cluster = np.unique(keys, return_inverse=True)
+        cluster = cluster.ravel()
+        tris = cluster[triangles]
+        tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])]
+        # Triangles collapsed onto the same three clusters are drawn once
+        _, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+        tris = tris[np.sort(first)]
+        if len(tris) <= target_triangles or cells <= 2:
+            break
+        cells = max(2, int(cells * 0.7))
+
+    counts = np.bincount(cluster, minlength=len(unique_keys)).astype(np.float64)
+    points = np.stack([
+        np.bincount(cluster, weights=positions[:, axis], minlength=len(unique_keys)) for axis in range(3)
+    ], axis=1) / np.maximum(counts, 1)[:, None]
+    used, tris = np.unique(tris, return_inverse=True)
+    return points[used].astype(np.float32), tris.reshape(-1, 3).astype(np.uint32)
+
+
+def vertex_normals(points, triangles):
+    """Area-weighted vertex normals"""
+    p0, p1, p2 = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    face_normals = np.cross(p1 - p0, p2 - p0)
+    normals = np.zeros((len(points), 3))
+    for corner in range(3):
+        for axis in range(3):
+            normals[:, axis] += np.bincount(triangles[:, corner], weights=face_normals[:, axis], minlength=len(points))
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.where(lengths > 1e-20, normals / np.maximum(lengths, 1e-20), [0.0, 1.0, 0.0])
+    return normals.astype(np.float32)
+
+
+def _texture_refs(value, found):
+    """Collect texture indices referenced anywhere in a material"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key.endswith('Texture') and isinstance(item, dict) and 'index' in item:
+                found.add(item['index'])
+            _texture_refs(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _texture_refs(item, found)
+    return found
+
+
+def _strip_texture_refs(value):
+    """Remove every texture reference from a material, keeping its factors"""
+    if isinstance(value, dict):
+        for key in [k for k, item in value.items()
+                    if k.endswith('Texture') and isinstance(item, dict) and 'index' in item]:
+            del value[key]
+        for item in value.values():
+            _strip_texture_refs(item)
+    elif isinstance(value, list):
+        for item in value:
+            _strip_texture_refs(item)
+
+
+def _remap_texture_refs(value, remap):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key.endswith('Texture') and isinstance(item, dict) and 'index' in item:
+                item['index'] = remap[item['index']]
+            _remap_texture_refs(item, remap)
+    elif isinstance(value, list):
+        for item in value:
+            _remap_texture_refs(item, remap)
+
+
+def _texture_images(texture):
+    """Image indices a texture can sample (its source and extension sources such as EXT_texture_webp)"""
+    images = [texture['source']] if 'source' in texture else []
+    images.extend(ext['source'] for ext in texture.get('extensions', {}).values()
+                  if isinstance(ext, dict) and 'source' in ext)
+    return images
+
+
+def material_images(gltf, material_indices):
+    """Image indices used by the given materials"""
+    textures = gltf.get('textures', [])
+    images = set()
+    for index in material_indices:
+        for texture in _texture_refs(gltf['materials'][index], set()):
+            if texture < len(textures):
+                images.update(_texture_images(textures[texture]))
+    return images
+
+
+class _Packer:
+    """Accessor and image data laid out section by section in one binary chunk"""
+
+    def __init__(self):
+        self.builder = BinaryBuilder()
+        self.views = []
+        self.accessors = []
+        self._section_start = 0
+
+    def begin_section(self):
+        pad = padding(self.builder.length, SECTION_ALIGNMENT)
+        if pad:
+            self.builder.pieces.append(b'\0' * pad)
+            self.builder.length += pad
+        self._section_start = self.builder.length
+
+    def end_section(self):
+        """(start, length) of the section within the binary chunk"""
+        return self._section_start, self.builder.length - self._section_start
+
+    def add_view(self, data, target=None, stride=None):
+        view = {"buffer": 0, "byteOffset": self.builder.add(data), "byteLength": len(memoryview(data).cast('B'))}
+        if stride:
+            view["byteStride"] = stride
+        if target:
+            view["target"] = target
+        self.views.append(view)
+        return len(self.views) - 1
+
+    def add_accessor(self, data, template=None, vertex=False, index=False, bounds=False):
+        """Pack an (count, components) array as a new accessor; template supplies type/normalized"""
+        data = np.ascontiguousarray(data)
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        accessor = {
+            key: value for key, value in (template or {}).items()
+            if key in ('type', 'normalized', 'name')
+        }
+        accessor["componentType"] = DTYPE_COMPONENTS[data.dtype]
+        accessor["count"] = data.shape[0]
+        accessor.setdefault("type", SIZE_TYPES[data.shape[1]])
+        if template and 'min' in template and not bounds:
+            accessor["min"], accessor["max"] = template["min"], template["max"]
+        if bounds and data.shape[0]:
+            accessor["min"] = data.min(axis=0).tolist()
+            accessor["max"] = data.max(axis=0).tolist()
+
+        element_size = data.dtype.itemsize * data.shape[1]
+        stride = None
+        if vertex:
+            # Vertex attributes need 4-byte aligned elements
+            stride = (element_size + 3) // 4 * 4
+            if stride != element_size:
+                padded = np.zeros((data.shape[0], stride), dtype=np.uint8)
+                padded[:, :element_size] = data.view(np.uint8).reshape(data.shape[0], element_size)
+                data = padded
+            else:
+                stride = None
+        target = TARGET_ARRAY_BUFFER if vertex else TARGET_ELEMENT_ARRAY_BUFFER if index else None
+        accessor["bufferView"] = self.add_view(data, target, stride)
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+def _document(base, packer, ranges):
+    """
+    Standalone glTF document for part of a package
+    base references packer accessors and views by their global indices; the
+    result gets its own accessors and bufferViews, one buffer per byte range
+    """
+    doc = base
+    _, _, referenced = accessor_usage(doc)
+    accessor_remap = {index: i for i, index in enumerate(sorted(referenced))}
+    remap_accessor_refs(doc, accessor_remap)
+    views = sorted({packer.accessors[index]["bufferView"] for index in accessor_remap}
+                   | {image["bufferView"] for image in doc.get('images', []) if 'bufferView' in image})
+    view_remap = {index: i for i, index in enumerate(views)}
+
+    doc_views = []
+    for index in views:
+        view = dict(packer.views[index])
+        start = view["byteOffset"]
+        for buffer, (range_start, range_length) in enumerate(ranges):
+            if range_start <= start and start + view["byteLength"] <= range_start + range_length:
+                view["buffer"] = buffer
+                view["byteOffset"] = start - range_start
+                break
+        else:
+            raise GLBError("bufferView outside the document's ranges")
+        doc_views.append(view)
+
+    accessors = []
+    for index in sorted(accessor_remap):
+        accessor = dict(packer.accessors[index])
+        accessor["bufferView"] = view_remap[accessor["bufferView"]]
+        accessors.append(accessor)
+    for image in doc.get('images', []):
+        if 'bufferView' in image:
+            image["bufferView"] = view_remap[image["bufferView"]]
+
+    for key in ('accessors', 'bufferViews', 'buffers'):
+        doc.pop(key, None)
+    if accessors:
+        doc["accessors"] = accessors
+    if doc_views:
+        doc["bufferViews"] = doc_views
+        doc["buffers"] = [{"byteLength": length} for _, length in ranges]
+    return doc
+
+
+def _subset_textures(doc):
+    """Drop textures and images no material of the document uses, renumbering the rest"""
+    used = set()
+    for material in doc.get('materials', []):
+        _texture_refs(material, used)
+    textures = doc.get('textures', [])
+    texture_remap = {index: i for i, index in enumerate(sorted(used))}
+    for material in doc.get('materials', []):
+        _remap_texture_refs(material, texture_remap)
+    kept = [copy.deepcopy(textures[index]) for index in sorted(used)]
+
+    images = sorted({image for texture in kept for image in _texture_images(texture)})
+    image_remap = {index: i for i, index in enumerate(images)}
+    for texture in kept:
+        if 'source' in texture:
+            texture['source'] = image_remap[texture['source']]
+        for ext in texture.get('extensions', {}).values():
+            if isinstance(ext, dict) and 'source' in ext:
+                ext['source'] = image_remap[ext['source']]
+    all_images = doc.get('images', [])
+    for key in ('textures', 'images'):
+        doc.pop(key, None)
+    if kept:
+        doc['textures'] = kept
+    if images:
+        doc['images'] = [dict(all_images[index]) for index in images]
+
+
+def _world_bounds(points, world):
+    transformed = points @ world[:3, :3].T + world[:3, 3]
+    return transformed.min(axis=0), transformed.max(axis=0)
+
+
+def package_progressive(input_path, output_path, proxy_triangles=DEFAULT_PROXY_TRIANGLES,
+                        chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Write a progressive package of a GLB and return its manifest
+
+    Meshes drawn by one node are split into per-tile primitives (tiles on
+    the world X/Z plane); meshes shared by several nodes go whole into the
+    tile of their first instance. Skinned, morphing, instanced or
+    non-triangle meshes stay at full detail in the skeleton. Ranges in the
+    manifest are absolute file offsets.
+    """
+    with GLBFile(input_path) as glb:
+        source, bin_data = glb.json, glb.bin
+        if 'uri' in (source.get('buffers') or [{}])[0]:
+            raise GLBError("Only GLB files with an embedded buffer can be packaged")
+        gltf = copy.deepcopy(source)
+        nodes = gltf.get('nodes', [])
+        meshes = gltf.get('meshes', [])
+        accessors = gltf.get('accessors', [])
+        worlds = world_matrices(gltf)
+
+        # Which meshes can be streamed, and by which nodes
+        mesh_nodes = {}
+        pinned = set()
+        for index, node in enumerate(nodes):
+            if 'mesh' not in node:
+                continue
+            mesh_nodes.setdefault(node['mesh'], []).append(index)
+            if 'skin' in node or 'EXT_mesh_gpu_instancing' in node.get('extensions', {}) or index not in worlds:
+                pinned.add(node['mesh'])
+        streamed = []
+        for mesh_index, mesh in enumerate(meshes):
+            primitives = mesh.get('primitives', [])
+            if (mesh_index in pinned or mesh_index not in mesh_nodes or not primitives or any(
+                    p.get('mode', MODE_TRIANGLES) != MODE_TRIANGLES or p.get('targets') or p.get('extensions')
+                    or 'POSITION' not in p.get('attributes', {}) for p in primitives)):
+                continue
+            streamed.append(mesh_index)
+        streamed_set = set(streamed)
+
+        # Per-primitive triangles with their world-space centroids
+        geometry = {}
+        streamed_triangles = 0
+        for mesh_index in streamed:
+            parts = []
+            world = worlds[mesh_nodes[mesh_index][0]]
+            for primitive in meshes[mesh_index]['primitives']:
+                indices = read_indices(source, bin_data, primitive)
+                triangles = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+                positions = read_accessor_float(source, bin_data, primitive['attributes']['POSITION'])
+                centroids = positions[triangles].mean(axis=1) @ world[:3, :3].T + world[:3, 3]
+                parts.append((primitive, triangles, positions, centroids))
+                streamed_triangles += len(triangles)
+            geometry[mesh_index] = parts
+
+        # Tile grid over the X/Z extent of the streamed geometry
+        all_centroids = [c for parts in geometry.values() for _, _, _, c in parts if len(c)]
+        if all_centroids:
+            centroids = np.concatenate(all_centroids)
+            lo, hi = centroids.min(axis=0), centroids.max(axis=0)
+        else:
+            lo = hi = np.zeros(3)
+        streamed_bytes = sum(
+            accessors[i]['count'] * 4 * 4
+            for mesh_index in streamed for p in meshes[mesh_index]['primitives'] for i in p['attributes'].values()
+        )
+        tiles_per_side = int(min(MAX_TILES_PER_SIDE, max(1, math.ceil(math.sqrt(streamed_bytes / chunk_bytes)))))
+        extent = np.maximum(hi - lo, 1e-9)
+
+        def tile_of(points):
+            cell = np.minimum(((points[:, [0, 2]] - lo[[0, 2]]) / extent[[0, 2]] * tiles_per_side).astype(np.int64),
+                              tiles_per_side - 1)
+            return cell[:, 0] * tiles_per_side + cell[:, 1]
+
+        # Tile contents: {tile: [(mesh index, part index, triangle mask or None)]}
+        tiles = {}
+        for mesh_index, parts in geometry.items():
+            if len(mesh_nodes[mesh_index]) == 1:
+                for part_index, (_, triangles, _, centroids) in enumerate(parts):
+                    tile_ids = tile_of(centroids) if len(centroids) else np.zeros(0, dtype=np.int64)
+                    for tile in np.unique(tile_ids):
+                        tiles.setdefault(int(tile), []).append((mesh_index, part_index, tile_ids == tile))
+            else:
+                # Shared meshes stay whole, in the tile of their first instance
+                first = np.concatenate([c for _, _, _, c in parts if len(c)] or [np.zeros((1, 3))]).mean(axis=0)
+                tile = int(tile_of(first[None, :])[0])
+                for part_index in range(len(parts)):
+                    tiles.setdefault(tile, []).append((mesh_index, part_index, None))
+
+        # Chunks nearest the center of the scene come first
+        center = (lo + hi) / 2
+
+        def tile_distance(tile):
+            ix, iz = divmod(tile, tiles_per_side)
+            tile_center = lo[[0, 2]] + (np.array([ix, iz]) + 0.5) / tiles_per_side * extent[[0, 2]]
+            return float(np.linalg.norm(tile_center - center[[0, 2]]))
+        order = sorted(tiles, key=lambda tile: (tile_distance(tile), tile))
+
+        packer = _Packer()
+
+        # Skeleton section: everything except streamed geometry, plus proxies
+        packer.begin_section()
+        base = copy.deepcopy(gltf)
+        for mesh_index in streamed:
+            base['meshes'][mesh_index]['primitives'] = []
+        _, _, referenced = accessor_usage(base)
+        remap = {}
+        vertex_accessors, index_accessors, _ = accessor_usage(base)
+        for index in sorted(referenced):
+            data = read_accessor(source, bin_data, index)
+            remap[index] = packer.add_accessor(
+                data, accessors[index], vertex=index in vertex_accessors, index=index in index_accessors,
+                bounds='min' in accessors[index]
+            )
+        remap_accessor_refs(base, remap)
+
+        ratio = min(MAX_PROXY_FRACTION, proxy_triangles / max(streamed_triangles, 1))
+        proxy_meshes = {}
+        proxy_total = 0
+        for mesh_index in streamed:
+            primitives = []
+            for primitive, triangles, positions, _ in geometry[mesh_index]:
+                if not len(triangles):
+                    continue
+                target = max(MIN_PROXY_TRIANGLES, int(len(triangles) * ratio))
+                if len(triangles) <= target:
+                    used, local = np.unique(triangles, return_inverse=True)
+                    points, proxy = positions[used], local.reshape(-1, 3).astype(np.uint32)
+                else:
+                    points, proxy = cluster_vertices(positions, triangles, target)
+                if not len(proxy):
+                    continue
+                proxy_total += len(proxy)
+                index_dtype = np.uint16 if len(points) <= 0xFFFF else np.uint32
+                proxy_primitive = {
+                    "attributes": {
+                        "POSITION": packer.add_accessor(points.astype(np.float32), vertex=True, bounds=True),
+                        "NORMAL": packer.add_accessor(vertex_normals(points, proxy), vertex=True)
+                    },
+                    "indices": packer.add_accessor(proxy.reshape(-1).astype(index_dtype), index=True)
+                }
+                if 'material' in primitive:
+                    proxy_primitive["material"] = primitive["material"]
+                primitives.append(proxy_primitive)
+            proxy_meshes[mesh_index] = primitives
+
+        # Images of materials used by pinned meshes load with the skeleton
+        pinned_materials = {p['material'] for i, mesh in enumerate(meshes) if i not in streamed_set
+                            for p in mesh.get('primitives', []) if 'material' in p}
+        image_views = {}
+
+        def place_images(image_indices):
+            for image_index in sorted(image_indices):
+                image = gltf['images'][image_index]
+                if image_index in image_views or 'bufferView' not in image:
+                    continue
+                image_views[image_index] = packer.add_view(glb.buffer_view_data(image['bufferView']))
+
+        place_images(material_images(gltf, pinned_materials))
+        skeleton_range = packer.end_section()
+
+        # Chunk sections, with full-detail primitives of the streamed meshes
+        full_primitives = {mesh_index: [] for mesh_index in streamed}
+        chunk_records = []
+        for tile in order:
+            packer.begin_section()
+            chunk_parts = {}
+            materials = set()
+            triangles_in_chunk = 0
+            bounds = []
+            for mesh_index, part_index, mask in tiles[tile]:
+                primitive, triangles, _, _ = geometry[mesh_index][part_index]
+                selected = triangles if mask is None else triangles[mask]
+                used, local = np.unique(selected, return_inverse=True)
+                local = local.reshape(-1)
+                attributes = {}
+                for name, accessor_index in primitive['attributes'].items():
+                    data = read_accessor(source, bin_data, accessor_index)[used]
+                    attributes[name] = packer.add_accessor(data, accessors[accessor_index], vertex=True,
+                                                           bounds=name == 'POSITION')
+                index_dtype = np.uint16 if len(used) <= 0xFFFF else np.uint32
+                new_primitive = {
+                    "attributes": attributes,
+                    "indices": packer.add_accessor(local.astype(index_dtype), index=True)
+                }
+                if 'material' in primitive:
+                    new_primitive["material"] = primitive["material"]
+                    materials.add(primitive["material"])
+                full_primitives[mesh_index].append(new_primitive)
+                chunk_parts.setdefault(mesh_index, []).append(new_primitive)
+                triangles_in_chunk += len(selected)
+
+                points = read_accessor_float(source, bin_data, primitive['attributes']['POSITION'])[used]
+                for node_index in mesh_nodes[mesh_index]:
+                    bounds.append(_world_bounds(points, worlds[node_index]))
+
+            chunk_images = material_images(gltf, materials)
+            place_images(chunk_images)
+            chunk_records.append({
+                "tile": tile,
+                "parts": chunk_parts,
+                "materials": materials,
+                "images": chunk_images,
+                "triangles": triangles_in_chunk,
+                "bbox": {
+                    "min": np.min([b[0] for b in bounds], axis=0).tolist(),
+                    "max": np.max([b[1] for b in bounds], axis=0).tolist()
+                } if bounds else None,
+                "range": packer.end_section()
+            })
+
+        # Images nothing above placed (unused, or only used by proxies' materials)
+        packer.begin_section()
+        place_images(range(len(gltf.get('images', []))))
+        packer.end_section()
+
+        # The complete document: split meshes hold all their tile primitives
+        full = copy.deepcopy(base)
+        for mesh_index in streamed:
+            full['meshes'][mesh_index]['primitives'] = full_primitives[mesh_index]
+        for image_index, image in enumerate(full.get('images', [])):
+            if image_index in image_views:
+                image['bufferView'] = image_views[image_index]
+        full['accessors'] = packer.accessors
+        full['bufferViews'] = packer.views
+        full['buffers'] = [{"byteLength": packer.builder.length}]
+        full.setdefault('asset', {})['extras'] = {"progressive": PACKAGE_VERSION}
+        write_glb(output_path, full, packer.builder.pieces, packer.builder.length)
+        packer.builder.pieces.clear()
+
+    with open(output_path, 'rb') as f:
+        header = f.read(GLB_HEADER_SIZE + CHUNK_HEADER_SIZE)
+    json_length = int.from_bytes(header[GLB_HEADER_SIZE:GLB_HEADER_SIZE + 4], 'little')
+    bin_start = GLB_HEADER_SIZE + CHUNK_HEADER_SIZE + json_length + CHUNK_HEADER_SIZE
+
+    def file_range(section_range):
+        return [bin_start + section_range[0], section_range[1]]
+
+    # Skeleton document: proxies hang under their nodes as extra leaf nodes
+    skeleton = copy.deepcopy(full)
+    skeleton['asset'].pop('extras', None)
+    for mesh_index in streamed:
+        skeleton['meshes'][mesh_index]['primitives'] = proxy_meshes[mesh_index]
+    for node_index, node in enumerate(list(skeleton.get('nodes', []))):
+        if node.get('mesh') in streamed_set:
+            mesh_index = node.pop('mesh')
+            node.setdefault('extras', {})['progressive_node'] = node_index
+            if proxy_meshes[mesh_index]:
+                skeleton['nodes'].append({"mesh": mesh_index, "extras": {"progressive_proxy": node_index}})
+                node.setdefault('children', []).append(len(skeleton['nodes']) - 1)
+    for material_index, material in enumerate(skeleton.get('materials', [])):
+        if material_index not in pinned_materials:
+            _strip_texture_refs(material)
+    _subset_textures(skeleton)
+    skeleton = _document(skeleton, packer, [skeleton_range])
+
+    chunks = []
+    node_chunks = {}
+    for priority, record in enumerate(chunk_records):
+        material_list = sorted(record["materials"])
+        material_remap = {index: i for i, index in enumerate(material_list)}
+        doc = {
+            "asset": dict(full.get('asset', {})),
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": []
+        }
+        doc['asset'].pop('extras', None)
+        for key in ('extensionsUsed', 'extensionsRequired', 'samplers', 'textures', 'images'):
+            if key in full:
+                doc[key] = copy.deepcopy(full[key])
+        if material_list:
+            doc['materials'] = [copy.deepcopy(full['materials'][index]) for index in material_list]
+        chunk_nodes = []
+        for mesh_index, primitives in record["parts"].items():
+            mesh = {"primitives": copy.deepcopy(primitives)}
+            if 'name' in meshes[mesh_index]:
+                mesh["name"] = meshes[mesh_index]["name"]
+            for primitive in mesh["primitives"]:
+                if 'material' in primitive:
+                    primitive['material'] = material_remap[primitive['material']]
+            doc['meshes'].append(mesh)
+            for node_index in mesh_nodes[mesh_index]:
+                doc['nodes'].append({"mesh": len(doc['meshes']) - 1, "extras": {"progressive_node": node_index}})
+                doc['scenes'][0]['nodes'].append(len(doc['nodes']) - 1)
+                chunk_nodes.append(node_index)
+                node_chunks[node_index] = node_chunks.get(node_index, 0) + 1
+        _subset_textures(doc)
+
+        ranges = [tuple(record["range"])]
+        for image in doc.get('images', []):
+            if 'bufferView' not in image:
+                continue
+            view = packer.views[image['bufferView']]
+            start, length = view["byteOffset"], view["byteLength"]
+            if not any(s <= start and start + length <= s + l for s, l in ranges):
+                ranges.append((start, length))
+        doc = _document(doc, packer, ranges)
+        chunks.append({
+            "id": record["tile"],
+            "priority": priority,
+            "nodes": sorted(set(chunk_nodes)),
+            "triangles": record["triangles"],
+            "bbox": record["bbox"],
+            "bytes": sum(length for _, length in ranges),
+            "ranges": [file_range(r) for r in ranges],
+            "gltf": doc
+        })
+
+    return {
+        "package_version": PACKAGE_VERSION,
+        "size_bytes": os.path.getsize(output_path),
+        "tiles_per_side": tiles_per_side,
+        "triangles": {"proxy": proxy_total, "full": streamed_triangles},
+        "skeleton": {"range": file_range(skeleton_range), "bytes": skeleton_range[1], "gltf": skeleton},
+        "chunks": chunks,
+        "node_chunks": {str(node): count for node, count in sorted(node_chunks.items())}
+    }
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def ensure_progressive(source_path, output_dir, **options):
+    """
+    Package a GLB (once per source version) into output_dir and return the manifest
+    The manifest gains "source_version", "version" (of the package file) and "path"
+    """
+    version = model_version(source_path)
+    path = os.path.join(output_dir, 'progressive.glb')
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+
+    with _lock_for(output_dir):
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if (manifest.get('source_version') == version and manifest.get('package_version') == PACKAGE_VERSION
+                    and os.path.exists(path)):
+                record_cache_lookup('progressive', True)
+                return manifest
+        record_cache_lookup('progressive', False)
+
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = package_progressive(source_path, path, **options)
+        manifest["source_version"] = version
+        manifest["version"] = model_version(path)
+        manifest["path"] = path
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        return manifest
+
+
+def progressive_dir(models_dir, model_name):
+    """Directory holding a model's progressive package"""
+    return os.path.join(models_dir, PROGRESSIVE_DIR_NAME, os.path.splitext(model_name)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a progressive (skeleton + tile chunks) package of a GLB")
+    parser.add_argument('input', help="Input GLB file")
+    parser.add_argument('output', help="Output GLB file")
+    parser.add_argument('--manifest', help="Write the manifest JSON here (default: print a summary)")
+    parser.add_argument('--proxy-triangles', type=int, default=DEFAULT_PROXY_TRIANGLES)
+    parser.add_argument('--chunk-kb', type=int, default=DEFAULT_CHUNK_BYTES // 1024)
+    args = parser.parse_args()
+
+    manifest = package_progressive(args.input, args.output, args.proxy_triangles, args.chunk_kb * 1024)
+    if args.manifest:
+        with open(args.manifest, 'w') as f:
+            json.dump(manifest, f)
+    print(json.dumps({
+        "size_bytes": manifest["size_bytes"],
+        "skeleton_bytes": manifest["skeleton"]["bytes"],
+        "chunks": len(manifest["chunks"]),
+        "triangles": manifest["triangles"]
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
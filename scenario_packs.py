@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Precompiled scenario packs
+A scenario's environment and models are merged into one GLB with every
+model already placed, so the viewer loads a scenario with a single fetch
+and parse. Packs are cached on disk next to a small manifest and keyed by
+the content hashes of their sources, so they are rebuilt only when a source
+model changes
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from glb_combine import combine_glbs
+from glb_reader import read_gltf_json
+from metrics import record_cache_lookup
+from model_serving import content_hash, model_version
+
+DEFAULT_PACK_DIR = os.path.join('cache', 'scenario_packs')
+
+# Bumped when the pack layout changes, so existing packs are rebuilt
+PACK_VERSION = 2
+
+# Placement matching what the viewer applied to separately loaded models:
+# everything at 10x scale, models 10 units up and spread along x
+# (combine_glbs takes /combine_models' Z-up axes, so up is z here)
+ENVIRONMENT_PLACEMENT = {"position": [0, 0, 0], "scale": 10}
+MODEL_SPACING = 30.0
+MODEL_HEIGHT = 10.0
+
+
+def scenario_sources(config):
+    """(role, model name) for the environment and every model of a scenario config"""
+    return [("environment", config["environment"])] + [("model", name) for name in config["models"]]
+
+
+def default_placement(role, index, model_count):
+    """position/scale entry (as accepted by combine_glbs) for a source"""
+    if role == "environment":
+        return dict(ENVIRONMENT_PLACEMENT)
+    offset = (index - (model_count - 1) / 2) * MODEL_SPACING
+    return {"position": [offset, 0, MODEL_HEIGHT], "scale": 10}
+
+
+def pack_key(sources):
+    """Cache key of a pack: its sources' names, hashes and placements"""
+    data = json.dumps({"version": PACK_VERSION, "sources": sources}, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ScenarioPacks:
+    """
+    On-disk cache of scenario packs, one GLB and manifest per scenario
+
+    ensure() returns a current manifest, building the pack when it is
+    missing or any source model's hash changed; concurrent calls for the
+    same scenario wait for a single build.
+    """
+
+    def __init__(self, models_dir, pack_dir=DEFAULT_PACK_DIR):
+        self.models_dir = models_dir
+        self.pack_dir = pack_dir
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, scenario_id):
+        with self._locks_guard:
+            return self._locks.setdefault(scenario_id, threading.Lock())
+
+    def _manifest_path(self, scenario_id):
+        return os.path.join(self.pack_dir, f"{scenario_id}.json")
+
+    def pack_path(self, scenario_id, key):
+        return os.path.join(self.pack_dir, f"{scenario_id}-{key[:16]}.glb")
+
+    def _sources(self, config):
+        """Source entries of the models that exist, and the names of those that do not"""
+        sources, missing = [], []
+        names = scenario_sources(config)
+        model_count = sum(1 for role, _ in names if role == "model")
+        model_index = 0
+        for role, name in names:
+            path = os.path.join(self.models_dir, name)
+            digest = content_hash(path) if os.path.isfile(path) else None
+            if digest is None:
+                missing.append(name)
+            else:
+                sources.append({
+                    "name": name,
+                    "role": role,
+                    "sha256": digest,
+                    "placement": default_placement(role, model_index, model_count)
+                })
+            if role == "model":
+                model_index += 1
+        return sources, missing
+
+    def manifest(self, scenario_id):
+        """The stored manifest of a scenario, whether or not it is current"""
+        try:
+            with open(self._manifest_path(scenario_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ensure(self, scenario_id, config):
+        """
+        Current manifest of a scenario's pack, building it if needed
+        Returns None when none of its sources exist or they are not all GLB
+        (the viewer then loads the models separately)
+        """
+        sources, missing = self._sources(config)
+        if not sources or not all(source["name"].lower().endswith('.glb') for source in sources):
+            return None
+        key = pack_key(sources)
+
+        with self._lock_for(scenario_id):
+            manifest = self.manifest(scenario_id)
+            if manifest is not None and manifest.get("key") == key and os.path.isfile(manifest["path"]):
+                record_cache_lookup('scenario_pack', True)
+                return manifest
+            record_cache_lookup('scenario_pack', False)
+            return self._build(scenario_id, sources, missing, key)
+
+    def _build(self, scenario_id, sources, missing, key):
+        os.makedirs(self.pack_dir, exist_ok=True)
+        path = self.pack_path(scenario_id, key)
+        temp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        paths = [os.path.join(self.models_dir, source["name"]) for source in sources]
+        try:
+            combine_glbs(paths, temp_path, {str(i): source["placement"] for i, source in enumerate(sources)})
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # Scene root i of the pack is source i; its clips follow those of the sources before it
+        first_animation = 0
+        for node, (source, source_path) in enumerate(zip(sources, paths)):
+            count = len(read_gltf_json(source_path).get('animations', []))
+            source["node"] = node
+            source["animations"] = {"first": first_animation, "count": count}
+            first_animation += count
+
+        manifest = {
+            "scenario": scenario_id,
+            "key": key,
+            "path": path,
+            "version": model_version(path),
+            "size_bytes": os.path.getsize(path),
+            "sources": sources,
+            "missing": missing
+        }
+        manifest_path = self._manifest_path(scenario_id)
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        # Packs of older source versions are no longer referenced
+        prefix = f"{scenario_id}-"
+        for name in os.listdir(self.pack_dir):
+            if name.startswith(prefix) and name.endswith('.glb') and os.path.join(self.pack_dir, name) != path:
+                os.remove(os.path.join(self.pack_dir, name))
+        return manifest
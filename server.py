@@ -1,21 +1,356 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form, Body
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form, Body, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import asyncio
 import json
-import subprocess
 import shutil
+import hashlib
+import tempfile
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Union
 
+from glb_reader import GLBError, read_model_info
+from glb_combine import combine_glbs
+from mesh_optimize import optimize_glb
+from animation_optimize import optimize_animations, DEFAULT_TOLERANCE as DEFAULT_ANIMATION_TOLERANCE
+from texture_optimize import (
+    optimize_textures, texture_support, shutdown_pool as shutdown_texture_pool,
+    TEXTURE_FORMATS, DEFAULT_MAX_TEXTURE_SIZE
+)
+from lod import ensure_lods, select_lod
+from model_cache import ModelInfoCache
+from model_catalog import ModelCatalog
+from model_stats import BUDGET_ACTIONS, budget_violations, fit_to_budget, geometry_stats
+from scenario_packs import ScenarioPacks
+from progressive import ensure_progressive, progressive_dir
+from blender_pool import BlenderPool, BlenderWorker, FakeWorker
+from job_queue import JobQueue, JobQueueFull, FINISHED_STATES
+from conversion_cache import ConversionCache, link_or_copy
+from entity_store import EntityStore
+from entity_stream import EntitySubscription
+from entity_ingest import ingest_binary, ingest_ndjson
+from simulation import SimulationEngine, FixedStepScheduler, PHYSICS_MODES
+from model_serving import (
+    IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, content_hash, model_version, hashed_url, versioned_url,
+    precompress_model, choose_variant, parse_range, iter_file_range
+)
+from metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware, MODEL_OPERATION_ERRORS, UPLOAD_BYTES, MODEL_BYTES_PRODUCED
+from profiler import SamplingProfiler, profile_section
+
 app = FastAPI()
 
+# Per-route request metrics for /metrics; SERVER_TIMING=1 adds a
+# Server-Timing header to every response
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+app.add_middleware(MetricsMiddleware, routes=app.routes, server_timing=SERVER_TIMING)
+
+# The sampling profiler endpoints (/debug/profiler/...) exist only with ENABLE_PROFILER=1
+PROFILER_ENABLED = os.environ.get('ENABLE_PROFILER', '0') == '1'
+profiler = SamplingProfiler()
+
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Model metadata cache, persisted across restarts
+model_info_cache = ModelInfoCache()
+
+# Index of static/models served by /models; scanned at startup, then
+# updated wherever a model is written
+model_catalog = ModelCatalog('static/models')
+DEFAULT_MODEL_PAGE = 100
+MAX_MODEL_PAGE = 1000
+
+# In a real app, this would load specific configuration
+SCENARIO_CONFIGS = {
+    "city_flyover": {
+        "environment": "new_york.glb",
+        "models": ["b2_spirit.glb"],
+        "camera": {"position": [0, 500, 500], "target": [0, 0, 0]},
+        "lighting": "day",
+        "physics": "simple"
+    },
+    "ground_vehicles": {
+        "environment": "tokyo.glb",
+        "models": ["car.glb", "truck.glb"],
+        "camera": {"position": [0, 100, 100], "target": [0, 0, 0]},
+        "lighting": "night",
+        "physics": "complex"
+    },
+    "military_op": {
+        "environment": "custom_city.glb",
+        "models": ["f16.glb", "tank.glb"],
+        "camera": {"position": [0, 300, 300], "target": [0, 0, 0]},
+        "lighting": "dusk",
+        "physics": "complex"
+    }
+}
+
+# One pre-combined GLB per scenario, rebuilt when a source model's hash changes
+scenario_packs = ScenarioPacks('static/models')
+
+# Warm Blender workers shared by conversion, combination and extraction.
+# BLENDER_WORKER=fake swaps in an in-process worker for machines without Blender
+BLENDER_PATH = os.environ.get('BLENDER_PATH', 'blender')
+BLENDER_POOL_SIZE = int(os.environ.get('BLENDER_POOL_SIZE', '2'))
+BLENDER_MAX_JOBS_PER_WORKER = int(os.environ.get('BLENDER_MAX_JOBS_PER_WORKER', '50'))
+BLENDER_MAX_MEMORY_MB = int(os.environ.get('BLENDER_MAX_MEMORY_MB', '2048'))
+
+if os.environ.get('BLENDER_WORKER', 'blender') == 'fake':
+    blender_worker_factory = FakeWorker
+else:
+    blender_worker_factory = lambda: BlenderWorker(blender_path=BLENDER_PATH)
+
+blender_pool = BlenderPool(
+    size=BLENDER_POOL_SIZE,
+    max_jobs_per_worker=BLENDER_MAX_JOBS_PER_WORKER,
+    max_memory_mb=BLENDER_MAX_MEMORY_MB,
+    worker_factory=blender_worker_factory
+)
+
+# Uploads are streamed to disk in chunks and capped at MAX_UPLOAD_MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_MB', '1024')) * 1024 * 1024
+
+# Models heavier than these budgets are rejected or optimized before they
+# reach static/models; MODEL_BUDGET_ACTION is reject, optimize or allow
+MODEL_BUDGET_TRIANGLES = int(os.environ.get('MODEL_BUDGET_TRIANGLES', '2000000'))
+MODEL_BUDGET_GPU_BYTES = int(os.environ.get('MODEL_BUDGET_GPU_MB', '1024')) * 1024 * 1024
+MODEL_BUDGET_ACTION = os.environ.get('MODEL_BUDGET_ACTION', 'reject')
+
+# Converted outputs keyed by source content hash and conversion options
+CONVERSION_CACHE_MB = int(os.environ.get('CONVERSION_CACHE_MB', '2048'))
+conversion_cache = ConversionCache(max_bytes=CONVERSION_CACHE_MB * 1024 * 1024)
+
+# Conversions and combinations run in the background so a large model
+# never blocks other requests
+JOB_QUEUE_MAX_PENDING = int(os.environ.get('JOB_QUEUE_MAX_PENDING', '32'))
+job_queue = JobQueue(max_workers=BLENDER_POOL_SIZE, max_pending=JOB_QUEUE_MAX_PENDING)
+
+# Entity state served by /entities
+DEFAULT_ENTITY_PAGE = 100
+MAX_ENTITY_PAGE = int(os.environ.get('MAX_ENTITY_PAGE', '1000'))
+entity_store = EntityStore()
+
+# Live entity stream tick rate (deltas per second) per WebSocket client
+ENTITY_STREAM_HZ = float(os.environ.get('ENTITY_STREAM_HZ', '10'))
+MAX_ENTITY_STREAM_HZ = 60.0
+
+# Bulk ingest batches (NDJSON or binary frames) are capped at MAX_INGEST_MB
+MAX_INGEST_BYTES = int(os.environ.get('MAX_INGEST_MB', '64')) * 1024 * 1024
+
+# Room for the multipart boundaries and form fields around an uploaded model
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies over a per-path limit with 413
+    A declared Content-Length is checked before the app runs, and bodies
+    are counted as they arrive, so an oversized upload is cut off at the
+    limit instead of being parsed and spooled to disk in full first
+    """
+    
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope['path']) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request body exceeds maximum size of {limit // (1024 * 1024)} MB"
+        
+        declared = dict(scope['headers']).get(b'content-length', b'')
+        if declared.isdigit() and int(declared) > limit:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # Raised inside form parsing; the app's exception handler turns it into the 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/upload_model": MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD,
+    "/entities/ingest": MAX_INGEST_BYTES
+})
+
+SAMPLE_ENTITIES = [
+    {
+        "entity_id": "ent-001",
+        "description": "UAV Surveillance Drone",
+        "is_live": True,
+        "created_time": "2025-02-15T10:30:00Z",
+        "ontology": {
+            "platform_type": "UAV",
+            "specific_type": "Surveillance"
+        },
+        "health": {
+            "health_status": 1,
+            "connection_status": 2
+        },
+        "location": {
+            "position": {
+                "latitude_degrees": 35.123456,
+                "longitude_degrees": -117.654321,
+                "altitude_hae_meters": {"__root__": 5000.0}
+            }
+        },
+        "sensors": {
+            "sensors": [
+                {
+                    "sensor_id": "sens-001",
+                    "sensor_description": "EO/IR Camera",
+                    "sensor_type": "OPTICAL",
+                    "operational_state": 4
+                },
+                {
+                    "sensor_id": "sens-002",
+                    "sensor_description": "RADAR",
+                    "sensor_type": "ACTIVE",
+                    "operational_state": 3
+                }
+            ]
+        },
+        "indicators": {
+            "simulated": True,
+            "exercise": True,
+            "emergency": False
+        }
+    },
+    {
+        "entity_id": "ent-002",
+        "description": "Ground Radar Station",
+        "is_live": True,
+        "created_time": "2025-02-10T08:15:00Z",
+        "ontology": {
+            "platform_type": "Fixed",
+            "specific_type": "Radar"
+        },
+        "health": {
+            "health_status": 1,
+            "connection_status": 2
+        },
+        "location": {
+            "position": {
+                "latitude_degrees": 34.987654,
+                "longitude_degrees": -118.123456,
+                "altitude_hae_meters": {"__root__": 150.0}
+            }
+        },
+        "sensors": {
+            "sensors": [
+                {
+                    "sensor_id": "sens-003",
+                    "sensor_description": "Long Range Radar",
+                    "sensor_type": "ACTIVE",
+                    "operational_state": 4
+                }
+            ]
+        },
+        "indicators": {
+            "simulated": False,
+            "exercise": True,
+            "emergency": False
+        }
+    },
+    {
+        "entity_id": "ent-003",
+        "description": "Geospatial Alert Zone",
+        "is_live": True,
+        "created_time": "2025-02-20T14:45:00Z",
+        "ontology": {
+            "platform_type": "Geo",
+            "specific_type": "Alert"
+        },
+        "health": {
+            "health_status": 3,
+            "connection_status": 2
+        },
+        "location": None,
+        "sensors": None,
+        "indicators": {
+            "simulated": True,
+            "exercise": True,
+            "emergency": True
+        }
+    }
+]
+for entity in SAMPLE_ENTITIES:
+    entity_store.upsert(entity)
+
+# Server-side simulation of entities flagged as simulated; scenarios pick the physics mode
+SIMULATION_HZ = float(os.environ.get('SIMULATION_HZ', '10'))
+simulation_engine = SimulationEngine(entity_store)
+simulation_scheduler = FixedStepScheduler(simulation_engine, SIMULATION_HZ)
+
+def server_metrics():
+    """Scrape-time gauges for /metrics: store, catalog, queue and pool sizes"""
+    cache_stats = conversion_cache.stats()
+    return [
+        ("entity_store_entities", "gauge", "Entities in the entity store", [({}, len(entity_store))]),
+        ("entity_store_rows", "gauge", "Rows in use by the entity store, including rows of removed entities", [({}, entity_store.row_count)]),
+        ("model_catalog_models", "gauge", "Models in the catalog, by category",
+         [({"category": category}, count) for category, count in sorted(model_catalog.categories().items())]),
+        ("model_info_cache_entries", "gauge", "Entries in the model info cache", [({}, len(model_info_cache))]),
+        ("conversion_cache_bytes", "gauge", "Bytes held by the conversion cache", [({}, cache_stats["total_bytes"])]),
+        ("conversion_cache_evictions_total", "counter", "Conversion cache evictions", [({}, cache_stats["evictions"])]),
+        ("job_queue_pending", "gauge", "Queued or running background jobs", [({}, job_queue.pending_count())]),
+        ("job_queue_coalesced_total", "counter", "Submissions coalesced into an in-flight job", [({}, job_queue.coalesced)]),
+        ("blender_workers_started_total", "counter", "Blender worker processes started", [({}, blender_pool.workers_started)]),
+        ("blender_workers_recycled_total", "counter", "Blender worker processes retired", [({}, blender_pool.workers_recycled)]),
+        ("simulation_overruns_total", "counter", "Simulation ticks missed because a step ran late",
+         [({}, simulation_scheduler.overruns)])
+    ]
+
+REGISTRY.add_collector(server_metrics)
+
+@app.on_event("startup")
+def index_models():
+    """Build the model catalog; files unchanged since the last run are not re-read"""
+    count = model_catalog.scan()
+    print(f"Model catalog: {count} models")
+
+@app.on_event("startup")
+def precompress_existing_models():
+    """Build compressed variants for models that predate this server run"""
+    def run_precompression(report, models_dir):
+        for name in sorted(os.listdir(models_dir)):
+            path = os.path.join(models_dir, name)
+            if os.path.isfile(path):
+                precompress_model(path)
+        return {"models_dir": models_dir}
+    
+    if os.path.isdir('static/models'):
+        job_queue.submit('precompress', ('precompress', 'static/models'), run_precompression, 'static/models')
+
+@app.on_event("startup")
+def prebuild_scenario_packs():
+    """Build packs whose sources changed while the server was down"""
+    schedule_scenario_packs(SCENARIO_CONFIGS)
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    simulation_scheduler.stop()
+    job_queue.shutdown()
+    blender_pool.shutdown()
+    shutdown_texture_pool()
+    profiler.stop()
+
 @app.get("/", response_class=HTMLResponse)
 def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -25,13 +360,44 @@ def entity_simulation(request: Request):
     return templates.TemplateResponse("entity_simulation.html", {"request": request})
 
 @app.get("/models")
-def list_models():
-    models = {
-        "aircraft": ["f16.glb", "b2_spirit.glb", "helicopter.glb", "commercial_airliner.glb"],
-        "vehicles": ["car.glb", "truck.glb", "tank.glb", "train.glb"],
-        "city": ["new_york.glb", "tokyo.glb", "london.glb", "custom_city.glb"]
-    }
-    return JSONResponse(content=models)
+def list_models(
+    request: Request,
+    category: Optional[str] = None,
+    format: Optional[str] = None,
+    animated: Optional[bool] = None,
+    min_triangle_count: Optional[int] = None,
+    max_triangle_count: Optional[int] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_MODEL_PAGE,
+    lod: Optional[int] = None,
+    max_triangles: Optional[int] = None
+):
+    """
+    Filtered page of the model catalog, ordered by name
+    Each entry carries its content-hashed URL, with lod/max_triangles
+    selecting the LOD served as for /model_files. The next page's cursor is
+    sent in the X-Next-Cursor header (and a Link rel="next" header)
+    """
+    entries, next_cursor = model_catalog.query(
+        category=category,
+        model_format=format,
+        animated=animated,
+        min_triangles=min_triangle_count,
+        max_triangles=max_triangle_count,
+        search=q,
+        cursor=cursor,
+        limit=max(1, min(limit, MAX_MODEL_PAGE))
+    )
+    urls = model_urls([entry["name"] for entry in entries], lod=lod, max_triangles=max_triangles)
+    for entry in entries:
+        entry["url"] = urls.get(entry["name"])
+    
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(content=entries, headers=headers)
 
 @app.get("/scenarios")
 def list_scenarios():
@@ -43,36 +409,300 @@ def list_scenarios():
     return JSONResponse(content=scenarios)
 
 @app.get("/load_scenario/{scenario_id}")
-def load_scenario(scenario_id):
-    # In a real app, this would load specific configuration
-    scenario_configs = {
-        "city_flyover": {
-            "environment": "new_york.glb",
-            "models": ["b2_spirit.glb"],
-            "camera": {"position": [0, 500, 500], "target": [0, 0, 0]},
-            "lighting": "day",
-            "physics": "simple"
-        },
-        "ground_vehicles": {
-            "environment": "tokyo.glb",
-            "models": ["car.glb", "truck.glb"],
-            "camera": {"position": [0, 100, 100], "target": [0, 0, 0]},
-            "lighting": "night",
-            "physics": "complex"
-        },
-        "military_op": {
-            "environment": "custom_city.glb",
-            "models": ["f16.glb", "tank.glb"],
-            "camera": {"position": [0, 300, 300], "target": [0, 0, 0]},
-            "lighting": "dusk",
-            "physics": "complex"
-        }
+def load_scenario(scenario_id, lod: Optional[int] = None, max_triangles: Optional[int] = None):
+    """
+    Scenario configuration with the URL of its pack (environment and models
+    in one GLB); per-model URLs are kept for clients that load them
+    separately and are the only option when an LOD level or budget is asked for
+    """
+    if scenario_id in SCENARIO_CONFIGS:
+        config = dict(SCENARIO_CONFIGS[scenario_id])
+        config["urls"] = model_urls(
+            [config["environment"]] + config["models"],
+            lod=lod, max_triangles=max_triangles
+        )
+        config["pack"] = scenario_pack(scenario_id) if lod is None and max_triangles is None else None
+        # Drive the entity simulation with the scenario's physics mode
+        simulation_engine.set_physics(config["physics"])
+        simulation_engine.sync_from_store()
+        simulation_scheduler.start()
+        config["simulation"] = simulation_scheduler.status()
+        return JSONResponse(content=config)
+    else:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+def scenario_pack(scenario_id):
+    """Client view of a scenario's pack (building it on first use), or None if it has none"""
+    try:
+        with profile_section('scenario_pack'):
+            manifest = scenario_packs.ensure(scenario_id, SCENARIO_CONFIGS[scenario_id])
+    except (GLBError, OSError) as e:
+        print(f"Error building scenario pack for {scenario_id}: {str(e)}")
+        MODEL_OPERATION_ERRORS.inc(operation='scenario_pack', backend='native')
+        return None
+    if manifest is None:
+        return None
+    precompress_model(manifest["path"])
+    return {
+        "url": f"/scenario_packs/{manifest['version']}/{scenario_id}.glb",
+        "progressive": f"/progressive/scenarios/{scenario_id}",
+        "size_bytes": manifest["size_bytes"],
+        "sources": [
+            {key: source[key] for key in ("name", "role", "node", "animations")}
+            for source in manifest["sources"]
+        ],
+        "missing": manifest["missing"]
+    }
+
+def build_scenario_packs(report, scenario_ids):
+    """Background job: bring the packs of the given scenarios up to date"""
+    built = {}
+    for i, scenario_id in enumerate(scenario_ids):
+        report(i / len(scenario_ids), f"Building scenario pack {scenario_id}")
+        pack = scenario_pack(scenario_id)
+        built[scenario_id] = pack["url"] if pack else None
+        if pack:
+            # Package it for streaming too, so the first viewer does not wait
+            try:
+                progressive_package('scenarios', scenario_id)
+            except HTTPException:
+                pass
+    return {"packs": built}
+
+def schedule_scenario_packs(scenario_ids):
+    """Queue a pack rebuild; a full queue just leaves it to the next /load_scenario"""
+    scenario_ids = tuple(sorted(scenario_ids))
+    if not scenario_ids:
+        return
+    try:
+        job_queue.submit('scenario_packs', ('scenario_packs', scenario_ids), build_scenario_packs, scenario_ids)
+    except JobQueueFull:
+        pass
+
+def model_urls(model_names, lod=None, max_triangles=None):
+    """
+    Map model filenames to their content-hashed URLs, skipping missing files
+    An LOD level or triangle budget is carried as a query parameter
+    """
+    query = ""
+    if lod is not None:
+        query = f"?lod={lod}"
+    elif max_triangles is not None:
+        query = f"?max_triangles={max_triangles}"
+    
+    urls = {}
+    for model_name in model_names:
+        # Catalogued models already know their hash
+        entry = model_catalog.get(model_name)
+        url = versioned_url(entry["sha256"], model_name) if entry else hashed_url('static/models', model_name)
+        if url:
+            urls[model_name] = url + query
+    return urls
+
+def model_changed(model_path, category=None):
+    """Drop cached metadata for a model that was (re)written and re-index it"""
+    model_info_cache.invalidate(model_path)
+    model_name = os.path.basename(model_path)
+    model_catalog.refresh(model_name, category)
+    schedule_scenario_packs(
+        scenario_id for scenario_id, config in SCENARIO_CONFIGS.items()
+        if model_name == config["environment"] or model_name in config["models"]
+    )
+
+def model_lods(model_name):
+    """LOD manifest of a model, generating and precompressing the levels on first use"""
+    try:
+        manifest = ensure_lods('static/models', model_name)
+    except GLBError as e:
+        raise HTTPException(status_code=422, detail=f"Cannot generate LODs for {model_name}: {e}")
+    for level in manifest["levels"][1:]:
+        precompress_model(level["path"])
+    return manifest
+
+def model_media_type(model_name):
+    file_ext = os.path.splitext(model_name)[1].lower()
+    if file_ext == '.glb':
+        return 'model/gltf-binary'
+    if file_ext == '.gltf':
+        return 'model/gltf+json'
+    return 'application/octet-stream'
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def serve_model_file(request: Request, model_name: str, cache_control: str,
+                     lod: Optional[int] = None, max_triangles: Optional[int] = None):
+    """
+    Serve a model with a strong ETag, conditional GET, single byte ranges and
+    precompressed variants (ranges always apply to the uncompressed bytes)
+    A simplified level is served when an LOD level or triangle budget is given
+    """
+    if os.path.basename(model_name) != model_name:
+        raise HTTPException(status_code=400, detail="Invalid model name")
+    
+    model_path = os.path.join('static/models', model_name)
+    if not os.path.isfile(model_path):
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_name}")
+    
+    level = 0
+    if (lod is not None or max_triangles is not None) and model_name.lower().endswith('.glb'):
+        selected = select_lod(model_lods(model_name), lod=lod, max_triangles=max_triangles)
+        model_path, level = selected["path"], selected["level"]
+    
+    return send_model_path(request, model_path, model_media_type(model_name), cache_control,
+                           {"X-LOD-Level": str(level)})
+
+def send_model_path(request: Request, model_path: str, media_type: str, cache_control: str,
+                    extra_headers: Optional[dict] = None):
+    """Response for a model file on disk, honouring ranges, conditional GETs and precompressed variants"""
+    digest = content_hash(model_path)
+    size = os.path.getsize(model_path)
+    headers = {
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        **(extra_headers or {})
     }
     
-    if scenario_id in scenario_configs:
-        return JSONResponse(content=scenario_configs[scenario_id])
+    # Byte ranges, unless If-Range names a different version
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and (not if_range or if_range == f'"{digest}"'):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            headers["ETag"] = f'"{digest}"'
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(model_path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers
+            )
+    
+    encoding, path = choose_variant(model_path, request.headers.get('accept-encoding'))
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    headers["ETag"] = etag
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    
+    body_size = os.path.getsize(path)
+    headers["Content-Length"] = str(body_size)
+    if request.method == 'HEAD':
+        return Response(status_code=200, media_type=media_type, headers=headers)
+    return StreamingResponse(
+        iter_file_range(path, 0, body_size - 1),
+        media_type=media_type,
+        headers=headers
+    )
+
+@app.api_route("/model_files/{version}/{model_name}", methods=["GET", "HEAD"])
+def get_versioned_model_file(request: Request, version: str, model_name: str,
+                             lod: Optional[int] = None, max_triangles: Optional[int] = None):
+    """Serve a model under its content-hashed URL; cached forever when the version matches"""
+    model_path = os.path.join('static/models', os.path.basename(model_name))
+    if os.path.isfile(model_path) and model_version(model_path) == version:
+        # LOD levels are derived deterministically from the versioned original
+        return serve_model_file(request, model_name, IMMUTABLE_CACHE_CONTROL, lod, max_triangles)
+    # Stale version: serve the current file, but make clients revalidate
+    return serve_model_file(request, model_name, REVALIDATE_CACHE_CONTROL, lod, max_triangles)
+
+@app.api_route("/model_files/{model_name}", methods=["GET", "HEAD"])
+def get_model_file(request: Request, model_name: str,
+                   lod: Optional[int] = None, max_triangles: Optional[int] = None):
+    """Serve a model under its plain name with ETag revalidation"""
+    return serve_model_file(request, model_name, REVALIDATE_CACHE_CONTROL, lod, max_triangles)
+
+@app.api_route("/scenario_packs/{version}/{pack_name}", methods=["GET", "HEAD"])
+def get_scenario_pack(request: Request, version: str, pack_name: str):
+    """Serve a scenario pack; cached forever when the version is current"""
+    scenario_id, file_ext = os.path.splitext(pack_name)
+    manifest = scenario_packs.manifest(scenario_id) if file_ext == '.glb' and scenario_id in SCENARIO_CONFIGS else None
+    if manifest is None or not os.path.isfile(manifest["path"]):
+        raise HTTPException(status_code=404, detail=f"Scenario pack not found: {pack_name}")
+    cache_control = IMMUTABLE_CACHE_CONTROL if manifest["version"] == version else REVALIDATE_CACHE_CONTROL
+    return send_model_path(request, manifest["path"], model_media_type(pack_name), cache_control)
+
+def progressive_package(kind, name):
+    """
+    Progressive package manifest of a model or scenario pack, building it on first use
+    Returns (manifest, source file name)
+    """
+    if kind == 'models':
+        model_name = os.path.basename(name)
+        source_path = os.path.join('static/models', model_name)
+        if not os.path.isfile(source_path) or not model_name.lower().endswith('.glb'):
+            raise HTTPException(status_code=404, detail=f"Model not found: {name}")
+        output_dir = progressive_dir('static/models', model_name)
+    elif kind == 'scenarios' and name in SCENARIO_CONFIGS:
+        pack = scenario_packs.ensure(name, SCENARIO_CONFIGS[name])
+        if pack is None:
+            raise HTTPException(status_code=404, detail=f"Scenario {name} has no pack")
+        source_path = pack["path"]
+        output_dir = os.path.join(scenario_packs.pack_dir, f"{name}.progressive")
     else:
-        raise HTTPException(status_code=404, detail="Scenario not found")
+        raise HTTPException(status_code=404, detail=f"Not found: {kind}/{name}")
+    
+    try:
+        with profile_section('progressive'):
+            return ensure_progressive(source_path, output_dir)
+    except GLBError as e:
+        MODEL_OPERATION_ERRORS.inc(operation='progressive', backend='native')
+        raise HTTPException(status_code=422, detail=f"Cannot package {name} progressively: {e}")
+
+@app.get("/progressive/{kind}/{name}")
+def get_progressive_manifest(kind: str, name: str):
+    """
+    Byte ranges and glTF documents of a progressive package (kind is models
+    or scenarios): load the skeleton range first, then the chunks in order
+    of priority, all from the file at "url" with Range requests
+    """
+    manifest = dict(progressive_package(kind, name))
+    manifest.pop("path")
+    manifest["url"] = f"/progressive/{kind}/{name}/{manifest['version']}"
+    return JSONResponse(content=manifest)
+
+@app.api_route("/progressive/{kind}/{name}/{version}", methods=["GET", "HEAD"])
+def get_progressive_file(request: Request, kind: str, name: str, version: str):
+    """Serve a progressive package; cached forever when the version is current"""
+    manifest = progressive_package(kind, name)
+    cache_control = IMMUTABLE_CACHE_CONTROL if manifest["version"] == version else REVALIDATE_CACHE_CONTROL
+    return send_model_path(request, manifest["path"], 'model/gltf-binary', cache_control)
+
+@app.get("/model_lods/{model_name}")
+def get_model_lods(model_name: str):
+    """Triangle counts and URLs of a model's LOD levels"""
+    model_path = os.path.join('static/models', os.path.basename(model_name))
+    if not os.path.isfile(model_path) or not model_name.lower().endswith('.glb'):
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_name}")
+    
+    manifest = model_lods(os.path.basename(model_name))
+    url = hashed_url('static/models', os.path.basename(model_name))
+    return JSONResponse(content={
+        "model": model_name,
+        "version": manifest["version"],
+        "levels": [
+            {
+                "level": level["level"],
+                "ratio": level["ratio"],
+                "triangles": level["triangles"],
+                "size_bytes": os.path.getsize(level["path"]),
+                "url": f"{url}?lod={level['level']}"
+            }
+            for level in manifest["levels"]
+        ]
+    })
 
 def get_supported_formats():
     """Returns a list of supported 3D model formats"""
@@ -99,30 +729,28 @@ def convert_to_glb(input_path, output_path, preserve_animations=True):
         shutil.copy(input_path, output_path)
         return output_path
     
-    # For other formats, use Blender for conversion
+    # For other formats, use a pooled Blender worker for conversion
     # Note: This requires Blender to be installed on the system
     try:
-        # Path to the Blender Python script for conversion
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'convert_model.py')
-        
-        # Run Blender headless to convert the model
-        cmd = [
-            'blender', '--background', '--python', script_path, '--', 
-            input_path, output_path, str(preserve_animations).lower()
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = blender_pool.run(
+            'convert',
+            input_path=input_path,
+            output_path=output_path,
+            preserve_animations=preserve_animations
+        )
         
-        if result.returncode != 0:
-            print(f"Conversion error: {result.stderr}")
+        if not result["ok"]:
+            print(f"Conversion error: {result['error']}")
+            MODEL_OPERATION_ERRORS.inc(operation='convert', backend='blender')
             return None
             
         return output_path
     except Exception as e:
         print(f"Error during conversion: {str(e)}")
+        MODEL_OPERATION_ERRORS.inc(operation='convert', backend='blender')
         return None
 
-def combine_models(model_paths, output_path, position_data=None):
+def combine_models(model_paths, output_path, position_data=None, gpu_instancing=False):
     """
     Combine multiple models into a single GLB file
     
@@ -130,51 +758,239 @@ def combine_models(model_paths, output_path, position_data=None):
         model_paths: List of paths to the models to combine
         output_path: Path to save the combined model
         position_data: Optional dictionary mapping model index to position/rotation data
+        gpu_instancing: Draw repeated static GLB inputs with EXT_mesh_gpu_instancing
     
     Returns:
         Path to the combined model or None if failed
     """
+    # GLB-only inputs are merged natively; Blender is only needed for other formats
+    if all(path.lower().endswith('.glb') for path in model_paths):
+        try:
+            with profile_section('combine.native'):
+                return combine_glbs(model_paths, output_path, position_data, gpu_instancing)
+        except GLBError as e:
+            print(f"Native GLB combination failed, falling back to Blender: {str(e)}")
+            MODEL_OPERATION_ERRORS.inc(operation='combine', backend='native')
+        except Exception as e:
+            print(f"Error during native model combination: {str(e)}")
+            MODEL_OPERATION_ERRORS.inc(operation='combine', backend='native')
+            return None
+    
     try:
         # Create temp directory if it doesn't exist
         os.makedirs('temp_combinations', exist_ok=True)
         
-        # Path to the Blender Python script for model combination
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'combine_models.py')
-        
-        # Create a temporary JSON file with position data
-        position_file = os.path.join('temp_combinations', 'position_data.json')
-        with open(position_file, 'w') as f:
+        # Create a temporary JSON file with position data, unique per job
+        # since several combinations can now run at once
+        fd, position_file = tempfile.mkstemp(suffix='_positions.json', dir='temp_combinations')
+        with os.fdopen(fd, 'w') as f:
             json.dump(position_data or {}, f)
         
-        # Convert model paths to comma-separated string
-        models_arg = ','.join(model_paths)
+        # Blender exports into a temp file that is then swapped into place:
+        # output_path may be a hard link to a conversion cache entry, which
+        # an in-place export would overwrite
+        fd, combined_path = tempfile.mkstemp(suffix='.glb', dir='temp_combinations')
+        os.close(fd)
         
-        # Run Blender headless to combine the models
-        cmd = [
-            'blender', '--background', '--python', script_path, '--',
-            models_arg, output_path, position_file
-        ]
+        # Combine the models on a pooled Blender worker
+        try:
+            result = blender_pool.run(
+                'combine',
+                model_paths=model_paths,
+                output_path=combined_path,
+                position_data_path=position_file
+            )
+            if result["ok"]:
+                os.replace(combined_path, output_path)
+        finally:
+            # Clean up the temporary position data and any failed export
+            for path in (position_file, combined_path):
+                if os.path.exists(path):
+                    os.remove(path)
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Clean up the temporary position data file
-        if os.path.exists(position_file):
-            os.remove(position_file)
-        
-        if result.returncode != 0:
-            print(f"Combination error: {result.stderr}")
+        if not result["ok"]:
+            print(f"Combination error: {result['error']}")
+            MODEL_OPERATION_ERRORS.inc(operation='combine', backend='blender')
             return None
             
         return output_path
     except Exception as e:
         print(f"Error during model combination: {str(e)}")
+        MODEL_OPERATION_ERRORS.inc(operation='combine', backend='blender')
         return None
 
+def model_budget_violations(path):
+    """Budgets a GLB/glTF file exceeds (empty for other formats)"""
+    if not path.lower().endswith(('.glb', '.gltf')):
+        return []
+    return budget_violations(geometry_stats(path), MODEL_BUDGET_TRIANGLES, MODEL_BUDGET_GPU_BYTES)
+
+def budget_error(model_name, violations):
+    return HTTPException(status_code=422, detail={
+        "error": f"{model_name} exceeds the model budget",
+        "violations": violations
+    })
+
+def run_conversion_job(report, temp_path, output_path, options, content_hash, budget_action=None):
+    """Background job: convert (and optionally optimize) an upload into static/models via the conversion cache"""
+    os.makedirs('temp_conversions', exist_ok=True)
+    fd, converted_path = tempfile.mkstemp(suffix='.glb', dir='temp_conversions')
+    os.close(fd)
+    optimization = None
+    animations = None
+    textures = None
+    budget = None
+    try:
+        report(0.1, "Converting to GLB")
+        result_path = convert_to_glb(temp_path, converted_path, options["preserve_animations"])
+        if not result_path:
+            raise RuntimeError("Failed to convert model to GLB format")
+        
+        if options["optimize_meshes"]:
+            report(0.6, "Optimizing meshes")
+            with profile_section('optimize_meshes'):
+                optimization = optimize_glb(converted_path, converted_path)
+        
+        if options.get("animations"):
+            report(0.7, "Reducing animation keyframes")
+            with profile_section('optimize_animations'):
+                animations = optimize_animations(converted_path, converted_path, **options["animations"])
+        
+        if options.get("textures"):
+            report(0.75, "Compressing textures")
+            with profile_section('optimize_textures'):
+                textures = optimize_textures(converted_path, converted_path, **options["textures"])
+        
+        # Over-budget results never reach static/models or the cache
+        if options.get("budget"):
+            report(0.8, "Fitting model budget")
+            with profile_section('fit_budget'):
+                budget = fit_to_budget(converted_path, options["budget"]["triangles"],
+                                       options["budget"]["gpu_bytes"])
+            violations = budget["violations_after"]
+        else:
+            violations = model_budget_violations(converted_path) if budget_action == 'reject' else []
+        if violations:
+            raise RuntimeError(f"Model exceeds the budget: {'; '.join(violations)}")
+        
+        # Keep the output under its content key, then link it into place
+        report(0.9, "Storing converted model")
+        cache_path = conversion_cache.put(content_hash, options, converted_path)
+        link_or_copy(cache_path, output_path)
+        model_changed(output_path)
+        MODEL_BYTES_PRODUCED.inc(os.path.getsize(output_path), operation='convert')
+        
+        report(0.95, "Precompressing model")
+        precompress_model(output_path)
+    finally:
+        # Clean up temp files
+        for path in (temp_path, converted_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    return {
+        "filename": os.path.basename(output_path),
+        "converted": os.path.splitext(temp_path)[1].lower() != '.glb',
+        "cached": False,
+        "animations_preserved": options["preserve_animations"],
+        "optimization": optimization,
+        "animations": animations,
+        "textures": textures,
+        "budget": budget
+    }
+
+def conversion_options(preserve_animations, optimize_meshes=False, texture_format=None,
+                       max_texture_size=DEFAULT_MAX_TEXTURE_SIZE, fit_budget=False, optimize_animations=False):
+    """Options that change conversion output; part of the conversion cache key"""
+    options = {
+        "format": "glb",
+        "preserve_animations": preserve_animations,
+        "optimize_meshes": optimize_meshes
+    }
+    # Only present when requested, so existing cache keys stay valid
+    if texture_format:
+        options["textures"] = {"image_format": texture_format, "max_size": max_texture_size}
+    if optimize_animations and preserve_animations:
+        options["animations"] = {"tolerance": DEFAULT_ANIMATION_TOLERANCE}
+    if fit_budget:
+        options["budget"] = {"triangles": MODEL_BUDGET_TRIANGLES, "gpu_bytes": MODEL_BUDGET_GPU_BYTES}
+    return options
+
+def check_texture_options(texture_format, max_texture_size):
+    if texture_format is None:
+        return
+    if texture_format not in TEXTURE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"texture_format must be one of {', '.join(TEXTURE_FORMATS)}")
+    if max_texture_size < 1:
+        raise HTTPException(status_code=400, detail="max_texture_size must be positive")
+    if not texture_support():
+        raise HTTPException(status_code=501, detail="Texture compression needs Pillow, which is not installed")
+
+def run_combination_job(report, model_paths, output_path, positions, gpu_instancing=False):
+    """Background job: combine models into static/models"""
+    report(0.1, "Combining models")
+    result_path = combine_models(model_paths, output_path, positions, gpu_instancing)
+    if not result_path:
+        raise RuntimeError("Failed to combine models")
+    model_changed(output_path, category="combined")
+    MODEL_BYTES_PRODUCED.inc(os.path.getsize(output_path), operation='combine')
+    
+    report(0.9, "Precompressing model")
+    precompress_model(output_path)
+    
+    return {"filename": os.path.basename(output_path)}
+
+def submit_job(kind, key, fn, *args):
+    """Queue a background job, mapping a full queue to 503"""
+    try:
+        return job_queue.submit(kind, key, fn, *args)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def job_links(job):
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+async def save_upload(upload, buffer):
+    """
+    Copy a parsed upload into an open file in fixed-size chunks, hashing it
+    Starlette has already spooled the multipart body to a temporary file;
+    BodySizeLimitMiddleware stops an oversized body while it arrives, and
+    the exact model size limit is checked again here
+    
+    Returns (size_bytes, sha256 hex digest)
+    """
+    digest = hashlib.sha256()
+    size_bytes = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size_bytes += len(chunk)
+        UPLOAD_BYTES.inc(len(chunk), source='model')
+        if size_bytes > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds maximum size of {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+            )
+        digest.update(chunk)
+        buffer.write(chunk)
+    return size_bytes, digest.hexdigest()
+
 @app.post("/upload_model")
 async def upload_model(
     model: UploadFile = File(...), 
     convert_to_glb_format: bool = Form(True),
-    preserve_animations: bool = Form(True)
+    preserve_animations: bool = Form(True),
+    optimize_meshes: bool = Form(False),
+    optimize_animations: bool = Form(False),
+    texture_format: Optional[str] = Form(None),
+    max_texture_size: int = Form(DEFAULT_MAX_TEXTURE_SIZE),
+    over_budget: Optional[str] = Form(None)
 ):
     # Get file extension
     filename = model.filename
@@ -188,47 +1004,120 @@ async def upload_model(
             detail=f"Invalid file type. Supported formats: {', '.join(supported_formats)}"
         )
     
-    # Create temp directory for uploads
+    check_texture_options(texture_format, max_texture_size)
+    budget_action = over_budget or MODEL_BUDGET_ACTION
+    if budget_action not in BUDGET_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"over_budget must be one of {', '.join(BUDGET_ACTIONS)}")
+    
+    # Create temp directory for uploads; every upload gets its own temp file
+    # because conversions of the same filename may overlap
     os.makedirs('temp_uploads', exist_ok=True)
-    temp_path = os.path.join('temp_uploads', filename)
+    fd, temp_path = tempfile.mkstemp(suffix=file_ext, dir='temp_uploads')
     
-    # Save uploaded file
-    with open(temp_path, "wb") as buffer:
-        buffer.write(await model.read())
+    # Stream the upload to disk, hashing it on the way
+    with os.fdopen(fd, "wb") as buffer:
+        try:
+            size_bytes, content_hash = await save_upload(model, buffer)
+        except HTTPException:
+            buffer.close()
+            os.remove(temp_path)
+            raise
     
     # Determine final filename and path
-    if convert_to_glb_format and file_ext != '.glb':
+    needs_conversion = convert_to_glb_format and file_ext != '.glb'
+    processes_glb = (optimize_meshes or optimize_animations or texture_format) and file_ext == '.glb'
+    
+    # Uploads kept as they are are checked against the budget right away;
+    # with over_budget=optimize they go through the conversion job instead
+    fit_budget = False
+    if not needs_conversion and not processes_glb and budget_action != 'allow':
+        try:
+            violations = await run_in_threadpool(model_budget_violations, temp_path)
+        except (GLBError, KeyError, IndexError) as e:
+            os.remove(temp_path)
+            raise HTTPException(status_code=422, detail=f"Invalid model: {e}")
+        if violations and (budget_action == 'reject' or file_ext != '.glb'):
+            os.remove(temp_path)
+            raise budget_error(filename, violations)
+        fit_budget = bool(violations)
+    elif budget_action == 'optimize':
+        fit_budget = True
+    
+    if needs_conversion or processes_glb or fit_budget:
         # Generate GLB filename
         base_name = os.path.splitext(filename)[0]
         glb_filename = f"{base_name}.glb"
         output_path = os.path.join('static/models', glb_filename)
+        options = conversion_options(preserve_animations, optimize_meshes, texture_format, max_texture_size,
+                                     fit_budget, optimize_animations)
         
-        # Convert to GLB
-        result_path = convert_to_glb(temp_path, output_path, preserve_animations)
-        if not result_path:
-            # Clean up temp file
+        # Identical content converted with the same options is served
+        # straight from the conversion cache
+        cached_path = conversion_cache.get(content_hash, options)
+        if cached_path and budget_action == 'reject':
+            violations = await run_in_threadpool(model_budget_violations, cached_path)
+            if violations:
+                os.remove(temp_path)
+                raise budget_error(filename, violations)
+        if cached_path:
+            link_or_copy(cached_path, output_path)
+            model_changed(output_path)
             os.remove(temp_path)
-            raise HTTPException(status_code=500, detail="Failed to convert model to GLB format")
+            await run_in_threadpool(precompress_model, output_path)
+            return {
+                "success": True,
+                "filename": glb_filename,
+                "converted": needs_conversion,
+                "cached": True,
+                "animations_preserved": preserve_animations,
+                "meshes_optimized": optimize_meshes,
+                "animations_optimized": "animations" in options,
+                "size_bytes": size_bytes,
+                "sha256": content_hash
+            }
         
-        # Clean up temp file
-        os.remove(temp_path)
-        return {
+        # Convert to GLB in the background; an identical upload that is
+        # still converting is coalesced into the same job
+        key = ('convert', content_hash, output_path, json.dumps(options, sort_keys=True), budget_action)
+        job, coalesced = submit_job(
+            'convert', key, run_conversion_job,
+            temp_path, output_path, options, content_hash, budget_action
+        )
+        if coalesced:
+            os.remove(temp_path)
+        
+        return JSONResponse(status_code=202, content={
             "success": True, 
             "filename": glb_filename, 
-            "converted": True,
-            "animations_preserved": preserve_animations
-        }
+            "converted": needs_conversion,
+            "cached": False,
+            "animations_preserved": preserve_animations,
+            "meshes_optimized": optimize_meshes,
+            "animations_optimized": "animations" in options,
+            "size_bytes": size_bytes,
+            "sha256": content_hash,
+            **job_links(job)
+        })
     else:
         # Just move the file to the models directory
         final_path = os.path.join('static/models', filename)
         shutil.move(temp_path, final_path)
-        return {"success": True, "filename": filename, "converted": False}
+        model_changed(final_path)
+        await run_in_threadpool(precompress_model, final_path)
+        return {
+            "success": True,
+            "filename": filename,
+            "converted": False,
+            "size_bytes": size_bytes,
+            "sha256": content_hash
+        }
 
 @app.post("/combine_models")
 async def combine_models_endpoint(
     models: List[str] = Body(..., description="List of model filenames to combine"),
     output_name: str = Body(..., description="Name for the combined model file"),
-    positions: Dict[str, Dict[str, Union[List[float], float]]] = Body(None, description="Optional positioning data")
+    positions: Dict[str, Dict[str, Union[List[float], float]]] = Body(None, description="Optional positioning data"),
+    gpu_instancing: bool = Body(False, description="Draw repeated static models with EXT_mesh_gpu_instancing")
 ):
     """
     Combine multiple models into a single GLB file
@@ -239,6 +1128,13 @@ async def combine_models_endpoint(
         "1": {"position": [x, y, z], "rotation": [x, y, z], "scale": [x, y, z]},
         ...
     }
+    
+    A model listed several times is stored once and its copies share its
+    meshes; with gpu_instancing, copies of static GLB models are drawn by
+    instanced nodes instead (one scene root for all of them, which viewers
+    without EXT_mesh_gpu_instancing show as a single copy).
+    
+    The combination runs in the background; poll /jobs/{job_id} for the result.
     """
     # Validate input
     if not models or len(models) < 2:
@@ -258,20 +1154,169 @@ async def combine_models_endpoint(
     # Set output path
     output_path = os.path.join('static/models', output_name)
     
-    # Combine the models
-    result_path = combine_models(model_paths, output_path, positions)
-    
-    if not result_path:
-        raise HTTPException(status_code=500, detail="Failed to combine models")
+    # Combine the models in the background
+    key = ('combine', tuple(model_paths), output_path, json.dumps(positions, sort_keys=True), gpu_instancing)
+    job, coalesced = submit_job('combine', key, run_combination_job, model_paths, output_path, positions,
+                                gpu_instancing)
     
-    return {
+    return JSONResponse(status_code=202, content={
         "success": True,
         "filename": output_name,
-        "source_models": models
-    }
+        "source_models": models,
+        **job_links(job)
+    })
+
+def run_optimization_job(report, model_path, quantize, texture_format=None, max_texture_size=None,
+                         animation_options=None):
+    """Background job: optimize a model's meshes (and optionally animations and textures) in place"""
+    report(0.1, "Optimizing meshes")
+    with profile_section('optimize_meshes'):
+        optimization = optimize_glb(model_path, model_path, quantize=quantize)
+    animations = None
+    if animation_options is not None:
+        report(0.4, "Reducing animation keyframes")
+        with profile_section('optimize_animations'):
+            animations = optimize_animations(model_path, model_path, **animation_options)
+    textures = None
+    if texture_format:
+        report(0.6, "Compressing textures")
+        with profile_section('optimize_textures'):
+            textures = optimize_textures(model_path, model_path, texture_format, max_texture_size)
+    model_changed(model_path)
+    MODEL_BYTES_PRODUCED.inc(os.path.getsize(model_path), operation='optimize')
+    
+    report(0.9, "Precompressing model")
+    precompress_model(model_path)
+    
+    return {"filename": os.path.basename(model_path), "optimization": optimization, "animations": animations,
+            "textures": textures}
+
+@app.post("/optimize_model/{model_name}")
+def optimize_model(model_name: str, quantize: bool = True, texture_format: Optional[str] = None,
+                   max_texture_size: int = DEFAULT_MAX_TEXTURE_SIZE, optimize_animations: bool = False,
+                   animation_tolerance: float = DEFAULT_ANIMATION_TOLERANCE, quantize_rotations: bool = False):
+    """
+    Weld, spatially sort, prune and (optionally) quantize a model's meshes in place
+    With texture_format (webp or jpeg), embedded images are also capped to
+    max_texture_size and re-encoded. With optimize_animations, keyframes
+    that interpolation reproduces within animation_tolerance are removed
+    (rotations optionally stored as int16). The job result reports byte
+    sizes before and after, per clip for animations
+    """
+    model_path = os.path.join('static/models', model_name)
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_name}")
+    if not model_name.lower().endswith('.glb'):
+        raise HTTPException(status_code=400, detail="Only GLB models can be optimized")
+    
+    check_texture_options(texture_format, max_texture_size)
+    if animation_tolerance < 0:
+        raise HTTPException(status_code=400, detail="animation_tolerance must not be negative")
+    animation_options = None
+    if optimize_animations:
+        animation_options = {"tolerance": animation_tolerance, "quantize_rotations": quantize_rotations}
+    
+    key = ('optimize', model_path, quantize, texture_format, max_texture_size,
+           json.dumps(animation_options, sort_keys=True))
+    job, coalesced = submit_job('optimize', key, run_optimization_job,
+                                model_path, quantize, texture_format, max_texture_size, animation_options)
+    return JSONResponse(status_code=202, content={"filename": model_name, **job_links(job)})
+
+@app.get("/metrics")
+def get_metrics():
+    """Request, Blender worker, pipeline, cache and entity store metrics in the Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set ENABLE_PROFILER=1)")
+
+@app.post("/debug/profiler/start", dependencies=[Depends(require_profiler)])
+def start_profiler(interval_ms: float = 5.0, seconds: Optional[float] = None, all_threads: bool = False):
+    """
+    Start the sampling profiler, discarding earlier samples
+    It stops by itself after `seconds`, if given; without all_threads only
+    threads inside an instrumented hot-path section are sampled
+    """
+    if interval_ms <= 0 or (seconds is not None and seconds <= 0):
+        raise HTTPException(status_code=400, detail="interval_ms and seconds must be positive")
+    if not profiler.start(interval_ms / 1000, seconds, all_threads):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return profiler.status()
+
+@app.post("/debug/profiler/stop", dependencies=[Depends(require_profiler)])
+def stop_profiler():
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/debug/profiler/status", dependencies=[Depends(require_profiler)])
+def get_profiler_status():
+    return profiler.status()
+
+@app.get("/debug/profiler", dependencies=[Depends(require_profiler)])
+def get_profile(limit: Optional[int] = None):
+    """Samples so far as collapsed stacks ("frame;frame;frame count" lines, most frequent first)"""
+    return PlainTextResponse(profiler.collapsed(limit))
+
+@app.get("/conversion_cache/stats")
+def get_conversion_cache_stats():
+    """Hit/miss counters and size of the conversion cache"""
+    return conversion_cache.stats()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get the status and result of a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream progress events of a background job as Server-Sent Events"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    async def event_stream():
+        sent = 0
+        while True:
+            events = await job.next_events(sent, 15)
+            if not events:
+                # Keep the connection alive through proxies
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            sent += len(events)
+            if events[-1]["status"] in FINISHED_STATES:
+                yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def extract_animations_with_blender(model_path, model_name):
+    """
+    Extract animation information on a pooled Blender worker
+    Used as a fallback for files the built-in GLB reader cannot parse
+
+    Returns the animation info dictionary or None if extraction failed
+    """
+    result = blender_pool.run('extract', model_path=model_path)
+    
+    if not result["ok"]:
+        print(f"Animation extraction error for {model_name}: {result['error']}")
+        MODEL_OPERATION_ERRORS.inc(operation='extract', backend='blender')
+        return None
+    
+    return result["result"]
 
 @app.get("/model_info/{model_name}")
-async def get_model_info(model_name: str):
+def get_model_info(model_name: str):
     """Get information about a model, including available animations"""
     model_path = os.path.join('static/models', model_name)
     
@@ -288,21 +1333,21 @@ async def get_model_info(model_name: str):
             "animations": []
         }
     
+    # Repeat lookups of an unchanged file are served from the cache
+    cached_info = model_info_cache.get(model_path)
+    if cached_info is not None:
+        return cached_info
+    
     try:
-        # Use Blender to extract animation information
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extract_animations.py')
-        
-        # Create a temporary file to store the animation data
-        temp_info_file = os.path.join('temp_conversions', f"{os.path.splitext(model_name)[0]}_info.json")
+        try:
+            # Parse the GLB/glTF JSON directly, no Blender needed
+            model_info = read_model_info(model_path)
+        except GLBError as e:
+            print(f"GLB reader failed for {model_name}, falling back to Blender: {str(e)}")
+            MODEL_OPERATION_ERRORS.inc(operation='extract', backend='native')
+            model_info = extract_animations_with_blender(model_path, model_name)
         
-        cmd = [
-            'blender', '--background', '--python', script_path, '--',
-            model_path, temp_info_file
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0 or not os.path.exists(temp_info_file):
+        if model_info is None:
             return {
                 "filename": model_name,
                 "format": os.path.splitext(model_name)[1][1:].upper(),
@@ -312,18 +1357,16 @@ async def get_model_info(model_name: str):
                 "error": "Failed to extract animation information"
             }
         
-        # Read the animation data
-        with open(temp_info_file, 'r') as f:
-            model_info = json.load(f)
-        
-        # Clean up the temporary file
-        os.remove(temp_info_file)
-        
         # Add basic file information
         model_info["filename"] = model_name
         model_info["format"] = os.path.splitext(model_name)[1][1:].upper()
         model_info["size_bytes"] = os.path.getsize(model_path)
+        try:
+            model_info["geometry"] = geometry_stats(model_path)
+        except (GLBError, KeyError, IndexError) as e:
+            model_info["geometry"] = {"error": str(e)}
         
+        model_info_cache.put(model_path, model_info)
         return model_info
     
     except Exception as e:
@@ -336,111 +1379,299 @@ async def get_model_info(model_name: str):
             "error": str(e)
         }
 
+def entity_filters(
+    platform_type: Optional[str] = None,
+    health_status: Optional[str] = None,
+    simulated: Optional[bool] = None,
+    exercise: Optional[bool] = None,
+    emergency: Optional[bool] = None,
+    is_live: Optional[bool] = None,
+    min_altitude: Optional[float] = None,
+    max_altitude: Optional[float] = None
+):
+    """
+    Entity filters shared by the /entities endpoints
+    platform_type and health_status take comma-separated values; the altitude
+    band is in meters HAE
+    """
+    try:
+        health_statuses = [int(value) for value in health_status.split(',')] if health_status else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid health_status")
+    indicators = {
+        flag: value
+        for flag, value in (("simulated", simulated), ("exercise", exercise), ("emergency", emergency))
+        if value is not None
+    }
+    return {
+        "platform_types": platform_type.split(',') if platform_type else None,
+        "health_statuses": health_statuses,
+        "indicators": indicators,
+        "is_live": is_live,
+        "altitude_range": (min_altitude, max_altitude)
+    }
+
+def entity_fields(fields: Optional[str] = None):
+    """Comma-separated dotted field paths to return"""
+    return [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+def parse_bbox(bbox):
+    """Parse 'west,south,east,north' in degrees; west > east crosses the antimeridian"""
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise HTTPException(status_code=400, detail="bbox is out of range")
+    return west, south, east, north
+
+def check_point(lat, lon):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat/lon out of range")
+
+def entity_page(request, filters, fields, cursor, limit, bbox=None):
+    try:
+        after = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    with profile_section('entities.query'):
+        entities, next_cursor = entity_store.query(
+            fields=fields,
+            cursor=after,
+            limit=max(1, min(limit, MAX_ENTITY_PAGE)),
+            bbox=parse_bbox(bbox) if bbox else None,
+            **filters
+        )
+    
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(content=entities, headers=headers)
+
 @app.get("/entities")
-def list_entities():
-    entities = [
-        {
-            "entity_id": "ent-001",
-            "description": "UAV Surveillance Drone",
-            "is_live": True,
-            "created_time": "2025-02-15T10:30:00Z",
-            "ontology": {
-                "platform_type": "UAV",
-                "specific_type": "Surveillance"
-            },
-            "health": {
-                "health_status": 1,
-                "connection_status": 2
-            },
-            "location": {
-                "position": {
-                    "latitude_degrees": 35.123456,
-                    "longitude_degrees": -117.654321,
-                    "altitude_hae_meters": {"__root__": 5000.0}
-                }
-            },
-            "sensors": {
-                "sensors": [
-                    {
-                        "sensor_id": "sens-001",
-                        "sensor_description": "EO/IR Camera",
-                        "sensor_type": "OPTICAL",
-                        "operational_state": 4
-                    },
-                    {
-                        "sensor_id": "sens-002",
-                        "sensor_description": "RADAR",
-                        "sensor_type": "ACTIVE",
-                        "operational_state": 3
-                    }
-                ]
-            },
-            "indicators": {
-                "simulated": True,
-                "exercise": True,
-                "emergency": False
-            }
-        },
-        {
-            "entity_id": "ent-002",
-            "description": "Ground Radar Station",
-            "is_live": True,
-            "created_time": "2025-02-10T08:15:00Z",
-            "ontology": {
-                "platform_type": "Fixed",
-                "specific_type": "Radar"
-            },
-            "health": {
-                "health_status": 1,
-                "connection_status": 2
-            },
-            "location": {
-                "position": {
-                    "latitude_degrees": 34.987654,
-                    "longitude_degrees": -118.123456,
-                    "altitude_hae_meters": {"__root__": 150.0}
-                }
-            },
-            "sensors": {
-                "sensors": [
-                    {
-                        "sensor_id": "sens-003",
-                        "sensor_description": "Long Range Radar",
-                        "sensor_type": "ACTIVE",
-                        "operational_state": 4
-                    }
-                ]
-            },
-            "indicators": {
-                "simulated": False,
-                "exercise": True,
-                "emergency": False
-            }
-        },
-        {
-            "entity_id": "ent-003",
-            "description": "Geospatial Alert Zone",
-            "is_live": True,
-            "created_time": "2025-02-20T14:45:00Z",
-            "ontology": {
-                "platform_type": "Geo",
-                "specific_type": "Alert"
-            },
-            "health": {
-                "health_status": 3,
-                "connection_status": 2
-            },
-            "location": None,
-            "sensors": None,
-            "indicators": {
-                "simulated": True,
-                "exercise": True,
-                "emergency": True
-            }
-        }
-    ]
+def list_entities(
+    request: Request,
+    bbox: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_ENTITY_PAGE,
+    filters: dict = Depends(entity_filters),
+    fields: Optional[list] = Depends(entity_fields)
+):
+    """
+    Filtered page of entities from the entity store
+    The next page's cursor is sent in the X-Next-Cursor header (and a Link
+    rel="next" header)
+    """
+    return entity_page(request, filters, fields, cursor, limit, bbox)
+
+@app.get("/entities/bbox")
+def entities_in_bbox(
+    request: Request,
+    bbox: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_ENTITY_PAGE,
+    filters: dict = Depends(entity_filters),
+    fields: Optional[list] = Depends(entity_fields)
+):
+    """Page of entities inside a west,south,east,north bounding box"""
+    return entity_page(request, filters, fields, cursor, limit, bbox)
+
+@app.get("/entities/radius")
+def entities_in_radius(
+    lat: float,
+    lon: float,
+    radius_meters: float,
+    limit: int = DEFAULT_ENTITY_PAGE,
+    filters: dict = Depends(entity_filters),
+    fields: Optional[list] = Depends(entity_fields)
+):
+    """Entities within a great-circle radius, nearest first, with distance_meters"""
+    check_point(lat, lon)
+    if radius_meters < 0:
+        raise HTTPException(status_code=400, detail="radius_meters must not be negative")
+    with profile_section('entities.within_radius'):
+        entities = entity_store.within_radius(
+            lat, lon, radius_meters, fields=fields, limit=max(1, min(limit, MAX_ENTITY_PAGE)), **filters
+        )
+    return JSONResponse(content=entities)
+
+@app.get("/entities/nearest")
+def nearest_entities(
+    lat: float,
+    lon: float,
+    k: int = 10,
+    filters: dict = Depends(entity_filters),
+    fields: Optional[list] = Depends(entity_fields)
+):
+    """The k entities nearest to a point, with distance_meters"""
+    check_point(lat, lon)
+    with profile_section('entities.nearest'):
+        entities = entity_store.nearest(lat, lon, k=max(1, min(k, MAX_ENTITY_PAGE)), fields=fields, **filters)
     return JSONResponse(content=entities)
 
+def run_ingest(ingest, body):
+    with profile_section(f"entities.{ingest.__name__}"):
+        return ingest(entity_store, body)
+
+@app.post("/entities/ingest")
+async def ingest_entities(request: Request):
+    """
+    Bulk entity updates for high-rate track feeds
+    application/octet-stream bodies are binary position/health frames for
+    existing entities; anything else is NDJSON, one entity per line
+    """
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        UPLOAD_BYTES.inc(len(chunk), source='entities')
+        if size > MAX_INGEST_BYTES:
+            raise HTTPException(status_code=413, detail=f"Ingest batch exceeds {MAX_INGEST_BYTES // (1024 * 1024)} MB")
+        chunks.append(chunk)
+    body = b''.join(chunks)
+
+    start = datetime.now()
+    if request.headers.get('content-type', '').startswith('application/octet-stream'):
+        try:
+            report = await run_in_threadpool(run_ingest, ingest_binary, body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="NDJSON body must be UTF-8")
+        report = await run_in_threadpool(run_ingest, ingest_ndjson, text)
+    report["seconds"] = (datetime.now() - start).total_seconds()
+    return JSONResponse(content=report)
+
+@app.get("/simulation")
+def simulation_status():
+    return JSONResponse(content=simulation_scheduler.status())
+
+@app.post("/simulation/start")
+def start_simulation(physics: Optional[str] = None, hz: Optional[float] = None):
+    """(Re)load simulated entities from the store and run the fixed-step scheduler"""
+    if physics is not None and physics not in PHYSICS_MODES:
+        raise HTTPException(status_code=400, detail=f"physics must be one of {', '.join(PHYSICS_MODES)}")
+    if hz is not None and not 0 < hz <= 120:
+        raise HTTPException(status_code=400, detail="hz must be in (0, 120]")
+    if physics:
+        simulation_engine.set_physics(physics)
+    simulation_engine.sync_from_store()
+    if hz and simulation_scheduler.running and hz != simulation_scheduler.hz:
+        simulation_scheduler.stop()
+    simulation_scheduler.start(hz)
+    return JSONResponse(content=simulation_scheduler.status())
+
+@app.post("/simulation/stop")
+def stop_simulation():
+    simulation_scheduler.stop()
+    return JSONResponse(content=simulation_scheduler.status())
+
+def optional_bool(value):
+    """Parse a boolean from a query string or JSON value"""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text in ('true', '1', 'yes'):
+        return True
+    if text in ('false', '0', 'no'):
+        return False
+    raise HTTPException(status_code=400, detail=f"Invalid boolean: {value}")
+
+def optional_float(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid number: {value}")
+
+def stream_subscription(params):
+    """Build an entity subscription from WebSocket query parameters or a subscribe message"""
+    filters = entity_filters(
+        platform_type=params.get('platform_type'),
+        health_status=params.get('health_status'),
+        simulated=optional_bool(params.get('simulated')),
+        exercise=optional_bool(params.get('exercise')),
+        emergency=optional_bool(params.get('emergency')),
+        is_live=optional_bool(params.get('is_live')),
+        min_altitude=optional_float(params.get('min_altitude')),
+        max_altitude=optional_float(params.get('max_altitude'))
+    )
+    if params.get('bbox'):
+        filters["bbox"] = parse_bbox(params['bbox'])
+    return EntitySubscription(entity_store, filters, entity_fields(params.get('fields')))
+
+@app.websocket("/entities/stream")
+async def entity_stream(websocket: WebSocket):
+    """
+    Live entity updates: a snapshot, then deltas at `rate` Hz
+    
+    Takes the /entities filters, bbox and fields as query parameters. Sending
+    {"type": "subscribe", ...same keys...} replaces the subscription with a new
+    snapshot. State changes arrive as JSON "upsert"/"remove" messages and
+    position-only changes as binary frames (entity_stream.encode_positions).
+    Deltas are computed against current state, so slow clients get conflated
+    updates instead of a growing queue.
+    """
+    await websocket.accept()
+    try:
+        subscription = stream_subscription(websocket.query_params)
+        rate = optional_float(websocket.query_params.get('rate')) or ENTITY_STREAM_HZ
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    interval = 1.0 / min(max(rate, 0.1), MAX_ENTITY_STREAM_HZ)
+    
+    replacements = []
+    
+    async def receive_subscriptions():
+        while True:
+            frame = await websocket.receive()
+            if frame['type'] == 'websocket.disconnect':
+                return
+            # Binary frames and malformed JSON are ignored
+            try:
+                message = json.loads(frame.get('text') or '')
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get('type') == 'subscribe':
+                try:
+                    replacements.append(stream_subscription(message))
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "detail": e.detail})
+    
+    receiver = asyncio.create_task(receive_subscriptions())
+    loop = asyncio.get_running_loop()
+    try:
+        messages = await run_in_threadpool(subscription.snapshot)
+        next_tick = loop.time()
+        while not receiver.done():
+            for message in messages:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_json(message)
+            
+            # Fixed rate; ticks missed while sending are skipped, not queued
+            next_tick = max(next_tick + interval, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+            
+            if replacements:
+                subscription = replacements[-1]
+                replacements.clear()
+                messages = await run_in_threadpool(subscription.snapshot)
+            else:
+                messages = await run_in_threadpool(subscription.poll)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        # Retrieve the receiver's outcome (cancellation or disconnect) so it is not logged as unhandled
+        await asyncio.gather(receiver, return_exceptions=True)
+
 if __name__ == "__main__":
     # Create necessary directories
     os.makedirs('static/models', exist_ok=True)
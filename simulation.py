@@ -0,0 +1,457 @@
+#!/usr/bin/env python
+"""
+Vectorized entity simulation
+Advances every simulated entity per tick with NumPy kinematics (speed and
+heading integration, waypoint following, altitude limits), writes positions
+back to the entity store, and runs on a fixed-step scheduler.
+
+Headless benchmark:
+    python simulation.py --entities 100000 --seconds 10 --physics complex
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from profiler import profile_section
+from spatial_index import EARTH_RADIUS_METERS
+
+PHYSICS_MODES = ('simple', 'complex')
+
+# Default kinematics per platform type:
+# (cruise speed m/s, turn rate deg/s, acceleration m/s^2, climb rate m/s)
+PLATFORM_KINEMATICS = {
+    'UAV': (60.0, 15.0, 3.0, 10.0),
+    'Aircraft': (220.0, 3.0, 5.0, 20.0),
+    'Helicopter': (70.0, 20.0, 4.0, 8.0),
+    'Vehicle': (15.0, 30.0, 2.0, 0.0),
+    'Ship': (10.0, 2.0, 0.2, 0.0),
+}
+STATIC_KINEMATICS = (0.0, 0.0, 0.0, 0.0)
+
+# Distance at which a waypoint counts as reached
+ARRIVAL_RADIUS_METERS = 200.0
+
+DEFAULT_HZ = 10.0
+
+# The scheduler stops after this many failed steps in a row
+MAX_CONSECUTIVE_STEP_ERRORS = 10
+
+# Numeric fields of an entity's "simulation" object
+SIMULATION_NUMBERS = ('speed_mps', 'heading_degrees', 'turn_rate_dps', 'acceleration_mps2', 'climb_rate_mps',
+                      'min_altitude', 'max_altitude')
+
+
+def _is_finite_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def check_simulation_config(config):
+    """
+    Validate an entity's "simulation" object
+    Returns an error message or None
+    """
+    if not isinstance(config, dict):
+        return "simulation must be an object"
+    for key in SIMULATION_NUMBERS:
+        if config.get(key) is not None and not _is_finite_number(config[key]):
+            return f"simulation.{key} must be a finite number"
+    waypoints = config.get('waypoints')
+    if waypoints is not None:
+        if not isinstance(waypoints, list) or not all(
+                isinstance(point, list) and 2 <= len(point) <= 3
+                and _is_finite_number(point[0]) and _is_finite_number(point[1])
+                and (len(point) == 2 or point[2] is None or _is_finite_number(point[2]))
+                for point in waypoints):
+            return "simulation.waypoints must be a list of [lat, lon] or [lat, lon, alt] numbers"
+    return None
+
+
+def _wrap_degrees(angles):
+    """Wrap angles to [-180, 180)"""
+    return (angles + 180.0) % 360.0 - 180.0
+
+
+class SimulationEngine:
+    """
+    Kinematic state of simulated entities as parallel arrays
+
+    Waypoints are a padded (entities, max_waypoints, 3) array of lat/lon/alt
+    with a per-entity count and current index; routes loop. "simple" physics
+    turns and changes speed instantly; "complex" limits turn rate and
+    acceleration and adds wind drift. Both limit climb rate and clamp
+    altitude to each entity's band.
+    """
+
+    def __init__(self, store=None, physics='simple', wind=(0.0, 0.0)):
+        if physics not in PHYSICS_MODES:
+            raise ValueError(f"Unknown physics mode: {physics}")
+        self.store = store
+        self.physics = physics
+        self.wind = np.asarray(wind, dtype=np.float64)  # east, north m/s
+        self.lock = threading.Lock()
+        self.steps = 0
+        self.sim_time = 0.0
+        self._empty()
+
+    def _empty(self):
+        self.rows = np.empty(0, dtype=np.int64)
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        self.alt = np.empty(0)
+        self.speed = np.empty(0)
+        self.heading = np.empty(0)
+        self.target_speed = np.empty(0)
+        self.turn_rate = np.empty(0)
+        self.acceleration = np.empty(0)
+        self.climb_rate = np.empty(0)
+        self.min_alt = np.empty(0)
+        self.max_alt = np.empty(0)
+        self.waypoints = np.empty((0, 0, 3))
+        self.waypoint_count = np.empty(0, dtype=np.int64)
+        self.waypoint_index = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set_physics(self, physics):
+        if physics not in PHYSICS_MODES:
+            raise ValueError(f"Unknown physics mode: {physics}")
+        self.physics = physics
+
+    def load(self, rows, lat, lon, alt, speed=None, heading=None, kinematics=None,
+             altitude_bands=None, waypoints=None):
+        """
+        Replace the simulated set with arrays of initial state
+
+        kinematics is (n, 4) of target speed, turn rate, acceleration and
+        climb rate; altitude_bands is (n, 2); waypoints is a list of
+        per-entity [[lat, lon, alt], ...] lists (alt may be None).
+        """
+        n = len(rows)
+        kinematics = np.tile(PLATFORM_KINEMATICS['UAV'], (n, 1)) if kinematics is None else np.asarray(kinematics, dtype=np.float64)
+        bands = np.tile([-np.inf, np.inf], (n, 1)) if altitude_bands is None else np.asarray(altitude_bands, dtype=np.float64)
+        waypoints = waypoints or [[] for _ in range(n)]
+        width = max([len(route) for route in waypoints] + [1])
+
+        padded = np.full((n, width, 3), np.nan)
+        counts = np.zeros(n, dtype=np.int64)
+        for i, route in enumerate(waypoints):
+            if route:
+                padded[i, :len(route)] = [[p[0], p[1], np.nan if len(p) < 3 or p[2] is None else p[2]] for p in route]
+                counts[i] = len(route)
+
+        with self.lock:
+            self.rows = np.asarray(rows, dtype=np.int64)
+            self.lat = np.asarray(lat, dtype=np.float64).copy()
+            self.lon = np.asarray(lon, dtype=np.float64).copy()
+            self.alt = np.nan_to_num(np.asarray(alt, dtype=np.float64), nan=0.0)
+            self.target_speed = kinematics[:, 0].copy()
+            self.turn_rate = kinematics[:, 1].copy()
+            self.acceleration = kinematics[:, 2].copy()
+            self.climb_rate = kinematics[:, 3].copy()
+            self.speed = self.target_speed.copy() if speed is None else np.asarray(speed, dtype=np.float64).copy()
+            self.heading = np.zeros(n) if heading is None else np.asarray(heading, dtype=np.float64).copy()
+            self.min_alt = bands[:, 0].copy()
+            self.max_alt = bands[:, 1].copy()
+            self.waypoints = padded
+            self.waypoint_count = counts
+            self.waypoint_index = np.zeros(n, dtype=np.int64)
+
+    def sync_from_store(self):
+        """
+        (Re)load every live, located entity flagged as simulated from the store
+
+        Kinematics come from the platform type, overridden by an optional
+        "simulation" object on the entity: speed_mps, heading_degrees,
+        turn_rate_dps, acceleration_mps2, climb_rate_mps, min_altitude,
+        max_altitude and waypoints ([[lat, lon, alt], ...]). An invalid
+        object is ignored, so the entity moves with its platform defaults.
+        """
+        store = self.store
+        with store.lock:
+            filters = store.compile_filters(indicators={'simulated': True})
+            rows = store.select_rows(filters)
+            rows = rows[store.columns['has_location'][rows]]
+            c = store.columns
+            lat, lon, alt = c['latitude'][rows].copy(), c['longitude'][rows].copy(), c['altitude'][rows].copy()
+            entities = [store.entity(int(row)) for row in rows]
+
+        kinematics = np.empty((len(rows), 4))
+        bands = np.tile([-np.inf, np.inf], (len(rows), 1))
+        heading = np.zeros(len(rows))
+        waypoints = []
+        for i, entity in enumerate(entities):
+            platform = (entity.get('ontology') or {}).get('platform_type')
+            kinematics[i] = PLATFORM_KINEMATICS.get(platform, STATIC_KINEMATICS)
+            config = entity.get('simulation') or {}
+            if check_simulation_config(config) is not None:
+                config = {}
+            for column, key in enumerate(('speed_mps', 'turn_rate_dps', 'acceleration_mps2', 'climb_rate_mps')):
+                if config.get(key) is not None:
+                    kinematics[i, column] = config[key]
+            if config.get('min_altitude') is not None:
+                bands[i, 0] = config['min_altitude']
+            if config.get('max_altitude') is not None:
+                bands[i, 1] = config['max_altitude']
+            heading[i] = config.get('heading_degrees') or 0.0
+            waypoints.append(config.get('waypoints') or [])
+
+        self.load(rows, lat, lon, alt, heading=heading, kinematics=kinematics,
+                  altitude_bands=bands, waypoints=waypoints)
+        return len(rows)
+
+    def _targets(self):
+        """Current waypoint of each entity (NaN rows for entities without a route)"""
+        index = np.minimum(self.waypoint_index, np.maximum(self.waypoint_count - 1, 0))
+        return self.waypoints[np.arange(len(self.rows)), index]
+
+    def _drop_removed(self):
+        """Stop simulating entities the store has removed since the last sync"""
+        alive = self.store.columns['alive'][self.rows]
+        if alive.all():
+            return
+        for name in ('rows', 'lat', 'lon', 'alt', 'speed', 'heading', 'target_speed', 'turn_rate', 'acceleration',
+                     'climb_rate', 'min_alt', 'max_alt', 'waypoints', 'waypoint_count', 'waypoint_index'):
+            setattr(self, name, getattr(self, name)[alive])
+
+    def step(self, dt):
+        """Advance every entity by dt seconds and write positions to the store"""
+        with self.lock:
+            if self.store is not None:
+                self._drop_removed()
+            if not len(self.rows):
+                self.steps += 1
+                self.sim_time += dt
+                return
+            cos_lat = np.cos(np.radians(self.lat))
+
+            # Waypoint following in a local tangent plane
+            targets = self._targets()
+            has_route = self.waypoint_count > 0
+            north = np.radians(targets[:, 0] - self.lat) * EARTH_RADIUS_METERS
+            east = np.radians(_wrap_degrees(targets[:, 1] - self.lon)) * EARTH_RADIUS_METERS * cos_lat
+            distance = np.hypot(east, north)
+            arrived = has_route & (distance < ARRIVAL_RADIUS_METERS)
+            if arrived.any():
+                self.waypoint_index[arrived] = (self.waypoint_index[arrived] + 1) % self.waypoint_count[arrived]
+                targets = self._targets()
+                north = np.radians(targets[:, 0] - self.lat) * EARTH_RADIUS_METERS
+                east = np.radians(_wrap_degrees(targets[:, 1] - self.lon)) * EARTH_RADIUS_METERS * cos_lat
+            desired_heading = np.where(has_route, np.degrees(np.arctan2(east, north)), self.heading)
+
+            if self.physics == 'simple':
+                self.heading = np.where(has_route, desired_heading, self.heading) % 360.0
+                self.speed = self.target_speed.copy()
+            else:
+                max_turn = self.turn_rate * dt
+                turn = np.clip(_wrap_degrees(desired_heading - self.heading), -max_turn, max_turn)
+                self.heading = (self.heading + turn) % 360.0
+                max_change = self.acceleration * dt
+                self.speed = self.speed + np.clip(self.target_speed - self.speed, -max_change, max_change)
+
+            # Horizontal integration (ground velocity = air velocity + wind in complex mode)
+            heading = np.radians(self.heading)
+            velocity_east = self.speed * np.sin(heading)
+            velocity_north = self.speed * np.cos(heading)
+            if self.physics == 'complex':
+                moving = self.speed > 0
+                velocity_east = velocity_east + self.wind[0] * moving
+                velocity_north = velocity_north + self.wind[1] * moving
+            self.lat = np.clip(self.lat + np.degrees(velocity_north * dt / EARTH_RADIUS_METERS), -89.9, 89.9)
+            self.lon = _wrap_degrees(
+                self.lon + np.degrees(velocity_east * dt / (EARTH_RADIUS_METERS * np.maximum(cos_lat, 1e-6)))
+            )
+
+            # Vertical: climb toward the waypoint altitude, then apply the altitude band
+            target_alt = np.where(np.isnan(targets[:, 2]), self.alt, targets[:, 2])
+            max_climb = self.climb_rate * dt
+            self.alt = np.clip(self.alt + np.clip(target_alt - self.alt, -max_climb, max_climb),
+                               self.min_alt, self.max_alt)
+
+            self.steps += 1
+            self.sim_time += dt
+            rows, lat, lon, alt = self.rows, self.lat, self.lon, self.alt
+
+        if self.store is not None:
+            self.store.move_rows(rows, lat, lon, alt)
+
+    def status(self):
+        return {
+            "physics": self.physics,
+            "entities": len(self.rows),
+            "steps": self.steps,
+            "sim_time_seconds": round(self.sim_time, 3)
+        }
+
+
+class FixedStepScheduler:
+    """
+    Runs engine.step(1 / hz) on a background thread at a fixed rate
+
+    When a step overruns its slot the missed ticks are dropped (counted in
+    `overruns`) rather than replayed in a burst. A step that raises is
+    logged and counted in `errors`; after MAX_CONSECUTIVE_STEP_ERRORS
+    failures in a row the scheduler stops.
+    """
+
+    def __init__(self, engine, hz=DEFAULT_HZ):
+        self.engine = engine
+        self.hz = hz
+        self.overruns = 0
+        self.errors = 0
+        self.last_error = None
+        self.step_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_steps = 0
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, hz=None):
+        if hz:
+            self.hz = hz
+        if self.running:
+            return
+        self._stop.clear()
+        self._started_steps = self.engine.steps
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.hz
+        next_tick = time.monotonic()
+        failures = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                with profile_section('simulation.step'):
+                    self.engine.step(interval)
+                failures = 0
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {str(e)}"
+                print(f"Simulation step failed: {self.last_error}")
+                failures += 1
+                if failures >= MAX_CONSECUTIVE_STEP_ERRORS:
+                    print(f"Stopping the simulation after {failures} failed steps in a row")
+                    return
+            self.step_seconds = time.monotonic() - started
+            next_tick += interval
+            now = time.monotonic()
+            if now > next_tick:
+                missed = int((now - next_tick) / interval) + 1
+                self.overruns += missed
+                next_tick += missed * interval
+            self._stop.wait(max(0.0, next_tick - time.monotonic()))
+
+    def status(self):
+        status = self.engine.status()
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        if self.running:
+            elapsed = max(elapsed, 1.0)
+        status.update({
+            "running": self.running,
+            "hz": self.hz,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_step_ms": round(self.step_seconds * 1000, 3),
+            "steps_per_second": round((self.engine.steps - self._started_steps) / elapsed, 2) if elapsed else 0.0
+        })
+        return status
+
+
+def synthetic_engine(count, physics, store=None, waypoints_per_entity=4, seed=0):
+    """Engine over `count` random UAVs flying loops, optionally backed by a store"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-60, 60, count)
+    lon = rng.uniform(-180, 180, count)
+    alt = rng.uniform(500, 10000, count)
+    routes = lat[:, None, None] + rng.uniform(-0.5, 0.5, (count, waypoints_per_entity, 1))
+    routes = np.concatenate([
+        routes,
+        lon[:, None, None] + rng.uniform(-0.5, 0.5, (count, waypoints_per_entity, 1)),
+        rng.uniform(500, 10000, (count, waypoints_per_entity, 1))
+    ], axis=2)
+
+    rows = np.arange(count)
+    if store is not None:
+        for i in range(count):
+            store.upsert({
+                "entity_id": f"sim-{i:06d}",
+                "is_live": True,
+                "ontology": {"platform_type": "UAV", "specific_type": "Synthetic"},
+                "location": {"position": {
+                    "latitude_degrees": float(lat[i]),
+                    "longitude_degrees": float(lon[i]),
+                    "altitude_hae_meters": {"__root__": float(alt[i])}
+                }},
+                "indicators": {"simulated": True, "exercise": True, "emergency": False}
+            })
+        rows = np.array([store.row_of(f"sim-{i:06d}") for i in range(count)])
+
+    engine = SimulationEngine(store, physics)
+    engine.load(rows, lat, lon, alt, heading=rng.uniform(0, 360, count),
+                altitude_bands=np.tile([100.0, 15000.0], (count, 1)), waypoints=routes.tolist())
+    return engine
+
+
+def benchmark(count, seconds, physics, hz=DEFAULT_HZ, with_store=True):
+    """Step as fast as possible for `seconds`; returns a JSON-ready report"""
+    store = None
+    if with_store:
+        from entity_store import EntityStore
+        store = EntityStore()
+    engine = synthetic_engine(count, physics, store)
+
+    dt = 1.0 / hz
+    steps = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        engine.step(dt)
+        steps += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "entities": count,
+        "physics": physics,
+        "with_store": with_store,
+        "steps": steps,
+        "seconds": round(elapsed, 3),
+        "steps_per_second": round(steps / elapsed, 2),
+        "entity_updates_per_second": round(steps * count / elapsed),
+        "realtime_factor_at_hz": round(steps / elapsed / hz, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless entity simulation benchmark")
+    parser.add_argument('--entities', type=int, default=100000)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--physics', choices=PHYSICS_MODES, default='complex')
+    parser.add_argument('--hz', type=float, default=DEFAULT_HZ, help="Tick rate used for the step size")
+    parser.add_argument('--no-store', action='store_true', help="Measure kinematics without the entity store")
+    args = parser.parse_args()
+
+    report = benchmark(args.entities, args.seconds, args.physics, args.hz, not args.no_store)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Spatial index over entity positions
+A fixed-size latitude/longitude cell grid (equivalent to a geohash at a
+fixed precision) mapping cells to sorted row numbers, plus vectorized
+great-circle helpers for exact filtering
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+# Default cell edge in degrees (about 28 km of latitude)
+DEFAULT_CELL_DEGREES = 0.25
+
+
+def haversine_meters(lat, lon, lats, lons):
+    """Great-circle distance in meters from one point to arrays of points"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def radius_bbox(lat, lon, radius_meters):
+    """
+    Bounding box (west, south, east, north) enclosing a circle
+    Longitudes may wrap (west > east across the antimeridian)
+    """
+    delta_lat = radius_meters / METERS_PER_DEGREE
+    south, north = max(-90.0, lat - delta_lat), min(90.0, lat + delta_lat)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if south <= -90.0 or north >= 90.0 or cos_lat < 1e-9 or delta_lat / cos_lat >= 180.0:
+        return -180.0, south, 180.0, north
+    delta_lon = delta_lat / cos_lat
+    west = (lon - delta_lon + 180.0) % 360.0 - 180.0
+    east = (lon + delta_lon + 180.0) % 360.0 - 180.0
+    return west, south, east, north
+
+
+def in_bbox(lats, lons, bbox):
+    """Vectorized bounding-box test; a bbox with west > east crosses the antimeridian"""
+    west, south, east, north = bbox
+    mask = (lats >= south) & (lats <= north)
+    if west <= east:
+        return mask & (lons >= west) & (lons <= east)
+    return mask & ((lons >= west) | (lons <= east))
+
+
+class SortedRows:
+    """Sorted, growable array of row numbers"""
+
+    def __init__(self):
+        self._rows = np.empty(4, dtype=np.int64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, row):
+        rows, size = self._rows, self._size
+        if size and rows[size - 1] < row:
+            # New rows are the largest yet, so this is the common case
+            pos = size
+        else:
+            pos = int(np.searchsorted(rows[:size], row))
+            if pos < size and rows[pos] == row:
+                return
+        if size == len(rows):
+            self._rows = rows = np.concatenate([rows, np.empty(len(rows), dtype=np.int64)])
+        rows[pos + 1:size + 1] = rows[pos:size]
+        rows[pos] = row
+        self._size += 1
+
+    def discard(self, row):
+        rows, size = self._rows, self._size
+        pos = int(np.searchsorted(rows[:size], row))
+        if pos < size and rows[pos] == row:
+            rows[pos:size - 1] = rows[pos + 1:size]
+            self._size -= 1
+
+    def rows(self):
+        return self._rows[:self._size]
+
+
+class GeoGrid:
+    """
+    Uniform latitude/longitude grid of row sets
+
+    Each non-empty cell holds a SortedRows set. Membership is
+    updated by add/discard as positions change; cell lookups return
+    candidates that still need an exact test.
+    """
+
+    def __init__(self, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lat_cells = int(math.ceil(180.0 / cell_degrees))
+        self.lon_cells = int(math.ceil(360.0 / cell_degrees))
+        self.cells = {}
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.cells.values())
+
+    def _lat_index(self, lat):
+        return min(self.lat_cells - 1, max(0, int((lat + 90.0) // self.cell_degrees)))
+
+    def _lon_index(self, lon):
+        return min(self.lon_cells - 1, max(0, int((lon + 180.0) // self.cell_degrees)))
+
+    def cell(self, lat, lon):
+        return self._lat_index(lat), self._lon_index(lon)
+
+    def cells_of(self, lats, lons):
+        """Vectorized flat cell numbers (lat_index * lon_cells + lon_index) of points"""
+        lat_index = np.clip(((np.asarray(lats) + 90.0) // self.cell_degrees), 0, self.lat_cells - 1)
+        lon_index = np.clip(((np.asarray(lons) + 180.0) // self.cell_degrees), 0, self.lon_cells - 1)
+        lat_index = np.nan_to_num(lat_index, nan=-1).astype(np.int64)
+        lon_index = np.nan_to_num(lon_index, nan=-1).astype(np.int64)
+        return lat_index * self.lon_cells + lon_index
+
+    def add(self, row, lat, lon):
+        key = self.cell(lat, lon)
+        rows = self.cells.get(key)
+        if rows is None:
+            rows = self.cells[key] = SortedRows()
+        rows.add(row)
+
+    def discard(self, row, lat, lon):
+        key = self.cell(lat, lon)
+        rows = self.cells.get(key)
+        if rows is None:
+            return
+        rows.discard(row)
+        if not len(rows):
+            del self.cells[key]
+
+    def _lon_ranges(self, west, east):
+        if west <= east:
+            return [(self._lon_index(west), self._lon_index(east))]
+        return [(self._lon_index(west), self.lon_cells - 1), (0, self._lon_index(east))]
+
+    def rows_in_bbox(self, bbox):
+        """Sorted candidate rows from every cell overlapping a (west, south, east, north) bbox"""
+        west, south, east, north = bbox
+        lat_lo, lat_hi = self._lat_index(south), self._lat_index(north)
+        lon_ranges = self._lon_ranges(west, east)
+        covered = (lat_hi - lat_lo + 1) * sum(hi - lo + 1 for lo, hi in lon_ranges)
+
+        if covered <= len(self.cells):
+            arrays = [
+                self.cells[(i, j)].rows()
+                for i in range(lat_lo, lat_hi + 1)
+                for lo, hi in lon_ranges
+                for j in range(lo, hi + 1)
+                if (i, j) in self.cells
+            ]
+        else:
+            # Large boxes: walk the occupied cells instead of the covered ones
+            arrays = [
+                rows.rows() for (i, j), rows in self.cells.items()
+                if lat_lo <= i <= lat_hi and any(lo <= j <= hi for lo, hi in lon_ranges)
+            ]
+
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        if len(arrays) == 1:
+            return arrays[0].copy()
+        rows = np.concatenate(arrays)
+        rows.sort()
+        return rows
@@ -1,8 +1,41 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+
+const ENTITY_PAGE_SIZE = 500;
+const WORLD_VIEW = { west: -180, south: -90, east: 180, north: 90 };
+const FOCUS_SPAN_DEGREES = 1;
+const STREAM_RATE_HZ = 5;
+
+// Binary position frame layout (see entity_stream.py)
+const POSITION_HEADER_BYTES = 16;
+const POSITION_RECORD_BYTES = 24;
+
+// Apply a binary position frame to a list of entities
+const applyPositionFrame = (entities, buffer, rowIds) => {
+  const data = new DataView(buffer);
+  const count = data.getUint32(4, true);
+  const positions = new Map();
+  for (let i = 0; i < count; i++) {
+    const offset = POSITION_HEADER_BYTES + i * POSITION_RECORD_BYTES;
+    const altitude = data.getFloat32(offset + 20, true);
+    positions.set(rowIds.get(data.getUint32(offset, true)), {
+      latitude_degrees: data.getFloat64(offset + 4, true),
+      longitude_degrees: data.getFloat64(offset + 12, true),
+      altitude_hae_meters: Number.isNaN(altitude) ? null : { __root__: altitude }
+    });
+  }
+  return entities.map(entity =>
+    positions.has(entity.entity_id)
+      ? { ...entity, location: { ...entity.location, position: positions.get(entity.entity_id) } }
+      : entity
+  );
+};
 
 const EntitySimulation = () => {
   const [entities, setEntities] = useState([]);
-  const [selectedEntity, setSelectedEntity] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [view, setView] = useState(WORLD_VIEW);
+  const [selectedId, setSelectedId] = useState(null);
+  const rowIds = useRef(new Map());
   const [activeTab, setActiveTab] = useState('overview');
   const [systemStatus] = useState({
     temperature: 36,
@@ -10,22 +43,93 @@ const EntitySimulation = () => {
     secure: true
   });
   
-  // Fetch entities from API
-  useEffect(() => {
-    fetch('/entities')
-      .then(response => response.json())
+  // Fetch the entities inside the current view one page at a time
+  // (the world view also lists entities without a location)
+  const loadEntities = (cursor) => {
+    const params = new URLSearchParams({ limit: ENTITY_PAGE_SIZE });
+    if (view !== WORLD_VIEW) params.set('bbox', [view.west, view.south, view.east, view.north].join(','));
+    if (cursor !== null && cursor !== undefined) params.set('cursor', cursor);
+    fetch(`/entities?${params}`)
+      .then(response => {
+        setNextCursor(response.headers.get('X-Next-Cursor'));
+        return response.json();
+      })
       .then(data => {
-        setEntities(data);
+        setEntities(previous => cursor ? previous.concat(data) : data);
       })
       .catch(error => {
         console.error("Failed to fetch entities:", error);
       });
-  }, []);
+  };
   
-  // Handle entity selection
+  // The world view is paged; a focused view follows the live entity stream
+  useEffect(() => {
+    if (view === WORLD_VIEW) {
+      loadEntities(null);
+      return undefined;
+    }
+    
+    const params = new URLSearchParams({
+      bbox: [view.west, view.south, view.east, view.north].join(','),
+      rate: STREAM_RATE_HZ
+    });
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/entities/stream?${params}`);
+    socket.binaryType = 'arraybuffer';
+    let snapshot = [];
+    setNextCursor(null);
+    
+    socket.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        setEntities(previous => applyPositionFrame(previous, event.data, rowIds.current));
+        return;
+      }
+      const message = JSON.parse(event.data);
+      if (message.type === 'snapshot' || message.type === 'upsert') {
+        message.rows.forEach((row, i) => rowIds.current.set(row, message.entities[i].entity_id));
+      }
+      if (message.type === 'snapshot') {
+        snapshot = snapshot.concat(message.entities);
+      } else if (message.type === 'snapshot_end') {
+        setEntities(snapshot);
+        snapshot = [];
+      } else if (message.type === 'upsert') {
+        const updated = new Map(message.entities.map(entity => [entity.entity_id, entity]));
+        setEntities(previous => {
+          const present = new Set(previous.map(entity => entity.entity_id));
+          return previous
+            .map(entity => updated.get(entity.entity_id) || entity)
+            .concat(message.entities.filter(entity => !present.has(entity.entity_id)));
+        });
+      } else if (message.type === 'remove') {
+        const removed = new Set(message.entity_ids);
+        setEntities(previous => previous.filter(entity => !removed.has(entity.entity_id)));
+      }
+    };
+    socket.onerror = (error) => {
+      console.error("Entity stream failed:", error);
+    };
+    return () => socket.close();
+  }, [view]);
+  
+  // Narrow the view to the area around an entity
+  const focusOn = (entity) => {
+    const position = entity.location?.position;
+    if (!position) return;
+    const half = FOCUS_SPAN_DEGREES / 2;
+    setView({
+      west: Math.max(-180, position.longitude_degrees - half),
+      south: Math.max(-90, position.latitude_degrees - half),
+      east: Math.min(180, position.longitude_degrees + half),
+      north: Math.min(90, position.latitude_degrees + half)
+    });
+  };
+  
+  // Handle entity selection; the selection follows live updates
   const handleSelectEntity = (entityId) => {
-    setSelectedEntity(entities.find(e => e.entity_id === entityId));
+    setSelectedId(entityId);
   };
+  const selectedEntity = entities.find(e => e.entity_id === selectedId) || null;
   
   // Format date for display
   const formatDate = (dateStr) => {
@@ -67,6 +171,14 @@ const EntitySimulation = () => {
           {/* Left Panel - Entity List */}
           <div className="w-64 bg-black bg-opacity-70 border border-amber-400 rounded p-4 overflow-y-auto">
             <h2 className="mb-4 border-b border-amber-400 pb-2">ENTITY CATALOG</h2>
+            {view !== WORLD_VIEW && (
+              <button
+                className="w-full mb-2 p-1 text-xs border border-amber-400 hover:bg-amber-900 hover:bg-opacity-20"
+                onClick={() => setView(WORLD_VIEW)}
+              >
+                RESET VIEW
+              </button>
+            )}
             
             {entities.map(entity => (
               <div 
@@ -89,6 +201,15 @@ const EntitySimulation = () => {
                 </div>
               </div>
             ))}
+            
+            {nextCursor && (
+              <button
+                className="w-full mt-2 p-2 border border-amber-400 hover:bg-amber-900 hover:bg-opacity-20"
+                onClick={() => loadEntities(nextCursor)}
+              >
+                LOAD MORE
+              </button>
+            )}
           </div>
           
           {/* Right Panel - Entity Details */}
@@ -184,6 +305,12 @@ const EntitySimulation = () => {
                   <div className="text-xl mb-4">Location Data</div>
                   {selectedEntity.location ? (
                     <div>
+                      <button
+                        className="px-3 py-1 mb-4 border border-amber-400 hover:bg-amber-900 hover:bg-opacity-20"
+                        onClick={() => focusOn(selectedEntity)}
+                      >
+                        FOCUS VIEW HERE
+                      </button>
                       <div className="mb-2">
                         <span className="opacity-70">LAT: </span>
                         {selectedEntity.location.position?.latitude_degrees?.toFixed(6) || 'N/A'}
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Texture downscaling and re-encoding for GLB files
+Embedded images are capped to a maximum resolution and re-encoded as WebP
+(EXT_texture_webp) or JPEG with Pillow on a process pool; results are
+cached by image content hash so shared textures are encoded once
+"""
+
+import io
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from glb_reader import GLBFile
+from gltf_arrays import GLBRepacker, add_extension
+from metrics import record_cache_lookup
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'textures')
+
+TEXTURE_FORMATS = ('webp', 'jpeg')
+DEFAULT_MAX_TEXTURE_SIZE = 2048
+DEFAULT_QUALITY = 85
+
+# Normal maps show lossy artifacts as lighting errors, so they keep more detail
+NORMAL_MAP_QUALITY = 95
+
+MIME_EXTENSIONS = {'image/webp': '.webp', 'image/jpeg': '.jpg', 'image/png': '.png'}
+EXTENSION_MIMES = {ext: mime for mime, ext in MIME_EXTENSIONS.items()}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def texture_support():
+    """Whether Pillow is installed (texture processing is skipped without it)"""
+    return Image is not None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the encoder processes (call on server shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def encode_image(data, image_format, max_size, quality):
+    """
+    Downscale an image to at most max_size pixels per side and re-encode it
+    Images with real transparency stay PNG when the target is JPEG. Returns
+    (data, mime_type, original_size, new_size)
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        original_size = image.size
+        if max(image.size) > max_size:
+            scale = max_size / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha:
+            image = image.convert('RGBA')
+            if image.getchannel('A').getextrema()[0] == 255:
+                has_alpha = False
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        output = io.BytesIO()
+        if image_format == 'webp':
+            image.save(output, format='WEBP', quality=quality, method=4)
+            mime_type = 'image/webp'
+        elif has_alpha:
+            image.save(output, format='PNG', optimize=True)
+            mime_type = 'image/png'
+        else:
+            image.save(output, format='JPEG', quality=quality, optimize=True)
+            mime_type = 'image/jpeg'
+        return output.getvalue(), mime_type, original_size, image.size
+
+
+def _image_size(data):
+    """Pixel size from an image's header, without decoding it"""
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def texture_key(data, image_format, max_size, quality):
+    """Cache key for an image's bytes and encoding options"""
+    digest = hashlib.sha256(data).hexdigest()
+    options = json.dumps({"format": image_format, "max_size": max_size, "quality": quality}, sort_keys=True)
+    return hashlib.sha256(f"{digest}:{options}".encode('utf-8')).hexdigest()
+
+
+def _cached(cache_dir, key):
+    """(data, mime_type) of a cached encoding, or None"""
+    for ext, mime_type in EXTENSION_MIMES.items():
+        path = os.path.join(cache_dir, f"{key}{ext}")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read(), mime_type
+    return None
+
+
+def _store(cache_dir, key, data, mime_type):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}{MIME_EXTENSIONS[mime_type]}")
+    temp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _normal_map_images(gltf):
+    """Image indices used as normal maps"""
+    textures = gltf.get('textures', [])
+    images = set()
+    for material in gltf.get('materials', []):
+        texture = material.get('normalTexture', {}).get('index')
+        if texture is not None and texture < len(textures) and 'source' in textures[texture]:
+            images.add(textures[texture]['source'])
+    return images
+
+
+def optimize_textures(input_path, output_path, image_format='webp', max_size=DEFAULT_MAX_TEXTURE_SIZE,
+                      quality=DEFAULT_QUALITY, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Downscale and re-encode the embedded images of a GLB file
+    An image is only replaced when it was downscaled or the new encoding is
+    smaller. Returns a report with before/after byte sizes
+    """
+    if image_format not in TEXTURE_FORMATS:
+        raise ValueError(f"image_format must be one of {', '.join(TEXTURE_FORMATS)}")
+    if not texture_support():
+        raise RuntimeError("Pillow is required for texture optimization")
+
+    bytes_before = os.path.getsize(input_path)
+    report = {
+        "bytes_before": bytes_before,
+        "images": 0,
+        "images_replaced": 0,
+        "images_downscaled": 0,
+        "cache_hits": 0,
+        "format": image_format
+    }
+
+    with GLBFile(input_path) as glb:
+        repacker = GLBRepacker(glb.json, glb.bin)
+        gltf = repacker.gltf
+        normal_maps = _normal_map_images(gltf)
+
+        # Embedded PNG/JPEG images, with their encoding options and cache keys;
+        # WebP images (from an earlier pass) can still be downscaled as WebP
+        sources = ('image/png', 'image/jpeg', 'image/webp') if image_format == 'webp' else ('image/png', 'image/jpeg')
+        jobs = {}
+        for index, image in enumerate(gltf.get('images', [])):
+            data = repacker.image_data(index)
+            if data is None or image.get('mimeType') not in sources:
+                continue
+            data = bytes(data)
+            image_quality = NORMAL_MAP_QUALITY if index in normal_maps else quality
+            jobs[index] = (data, image_quality, texture_key(data, image_format, max_size, image_quality))
+        report["images"] = len(jobs)
+
+        results = {}
+        misses = {}
+        for index, (data, image_quality, key) in jobs.items():
+            cached = _cached(cache_dir, key) if cache_dir else None
+            record_cache_lookup('texture', cached is not None)
+            if cached is not None:
+                results[index] = cached
+                report["cache_hits"] += 1
+            else:
+                misses.setdefault(key, []).append(index)
+
+        # Identical images are encoded once; several misses go to the process pool
+        encode_args = {key: (jobs[indices[0]][0], image_format, max_size, jobs[indices[0]][1])
+                       for key, indices in misses.items()}
+        if len(encode_args) > 1:
+            pool = _get_pool()
+            futures = {key: pool.submit(encode_image, *args) for key, args in encode_args.items()}
+            encoded = {key: future.result() for key, future in futures.items()}
+        else:
+            encoded = {key: encode_image(*args) for key, args in encode_args.items()}
+
+        for key, (data, mime_type, original_size, new_size) in encoded.items():
+            if new_size == original_size and len(data) >= len(encode_args[key][0]):
+                # Not worth replacing; cache the original so it is not re-encoded
+                data, mime_type = encode_args[key][0], gltf['images'][misses[key][0]]['mimeType']
+            if cache_dir:
+                _store(cache_dir, key, data, mime_type)
+            for index in misses[key]:
+                results[index] = (data, mime_type)
+
+        webp_images = set()
+        for index, (data, mime_type) in results.items():
+            if data == jobs[index][0]:
+                continue
+            repacker.set_image(index, data, mime_type)
+            report["images_replaced"] += 1
+            if _image_size(data) != _image_size(jobs[index][0]):
+                report["images_downscaled"] += 1
+            if mime_type == 'image/webp':
+                webp_images.add(index)
+
+        if webp_images:
+            # WebP sources are only valid through EXT_texture_webp
+            for texture in gltf.get('textures', []):
+                if texture.get('source') in webp_images:
+                    texture.setdefault('extensions', {})['EXT_texture_webp'] = {"source": texture.pop('source')}
+            add_extension(gltf, 'EXT_texture_webp', required=True)
+
+        repacker.write(output_path)
+
+    report["bytes_after"] = os.path.getsize(output_path)
+    report["bytes_saved"] = bytes_before - report["bytes_after"]
+    return report
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Line protocol between BlenderPool and its workers
+Jobs are JSON lines on the worker's stdin; results are marked JSON lines
+on its stdout. This module runs inside Blender, so it only uses the
+standard library
+"""
+
+import sys
+import json
+
+# Lines the worker prints with this prefix carry job results; everything
+# else on stdout is Blender's own logging
+RESULT_MARKER = '@@BLENDER_JOB_RESULT@@ '
+
+
+def encode_job(job):
+    """Serialize a job dictionary to a single protocol line"""
+    return json.dumps(job) + '\n'
+
+
+def decode_job(line):
+    """Parse a protocol line back into a job dictionary"""
+    return json.loads(line)
+
+
+def encode_result(result):
+    """Serialize a job result to a single marked protocol line"""
+    return RESULT_MARKER + json.dumps(result) + '\n'
+
+
+def decode_result(line):
+    """Parse a marked result line back into a result dictionary"""
+    return json.loads(line[len(RESULT_MARKER):])
+
+
+def handle_job(handlers, job):
+    """
+    Run a job with the handler registered for its operation
+    Exceptions are reported in the result instead of killing the worker
+    """
+    job_id = job.get('id')
+    handler = handlers.get(job.get('op'))
+    if handler is None:
+        return {"id": job_id, "ok": False, "error": f"Unknown operation: {job.get('op')}"}
+
+    try:
+        return {"id": job_id, "ok": True, "result": handler(**job.get('args', {}))}
+    except Exception as e:
+        return {"id": job_id, "ok": False, "error": f"{type(e).__name__}: {str(e)}"}
+
+
+def serve_jobs(handlers, infile=None, outfile=None, before_job=None):
+    """Job loop run inside a worker: read job lines, write result lines"""
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+
+    for line in infile:
+        if not line.strip():
+            continue
+        try:
+            job = decode_job(line)
+        except ValueError as e:
+            result = {"id": None, "ok": False, "error": f"Invalid job: {str(e)}"}
+        else:
+            if before_job is not None:
+                before_job()
+            result = handle_job(handlers, job)
+        outfile.write(encode_result(result))
+        outfile.flush()